@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Монте-Карло симулятор баланса ГовноМёт
+
+Векторизованная (NumPy) копия модели исходов process_throw / process_throw_at_target:
+синтетические чаты с ролями, жаром, комбо, сериями, фокусом и кулдаунами. Игроки
+бросают «раундами» — несколько операций NumPy на раунд вместо цикла по броскам,
+поэтому за секунду проходят миллионы бросков. Веса исходов и шанс попадания берутся
+из тех же OutcomeTables / HitChanceTable, что и в живой игре, но строятся по SimParams —
+правку баланса можно проверить, не запуская бота.
+
+    python balance_sim.py --throws 5000000 --chats 1000 --players 20
+    python balance_sim.py --parity  # сверка с GameLogic на фиксированном seed
+
+В модель не входят сообщения и публичные сигналы, редирект промаха на случайную цель
+(его делает bot.py) и дебафф саботажника (живая логика его пока не читает).
+"""
+
+import argparse
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только симулятору, боту он не требуется
+    np = None
+
+from config import OUTCOME_PROBABILITIES, HEAT_SETTINGS, COMEBACK_SETTINGS
+from game_logic import GameLogic, ROLES, ROLE_DURATION, MIN_THROW_INTERVAL
+from logger_config import quiet
+from outcome_tables import (OutcomeTables, HitChanceTable, HEAT_THRESHOLDS, COMBO_TIER_MIN, STREAK_TIER_MIN,
+                            MAX_HEAT, MAX_FOCUS_STACKS)
+from player_state import NEVER
+from roles import ROLE_STRATEGIES, role_strategy
+
+# Поправки точности ролей метателя из реестра roles.py; у снайпера, пьяного снайпера,
+# магнита и пиромана поправку по жару/фокусу применяет accuracy_rule роли, как в игре
+ROLE_ACCURACY = {s.key: s.accuracy for s in ROLE_STRATEGIES[1:] if s.accuracy}
+# Поправки точности по роли цели
+TARGET_ROLE_ACCURACY = {s.key: s.target_accuracy for s in ROLE_STRATEGIES[1:] if s.target_accuracy}
+
+# Очки и рост жара за бросок (см. process_throw / process_throw_at_target)
+RANDOM_SCORES = {'direct_hit': 10, 'miss': -5}
+TARGETED_SCORES = {'direct_hit': 15, 'miss': -10}
+COMBO_OUTCOMES = ('direct_hit', 'critical', 'combo')
+STREAK_OUTCOMES = ('direct_hit', 'critical', 'combo', 'legendary')
+
+@dataclass
+class SimParams:
+    """Параметры баланса; значения по умолчанию совпадают с живой игрой"""
+    base_weights: Dict[str, float] = field(default_factory=lambda: dict(OUTCOME_PROBABILITIES))
+    random_accuracy: float = 0.45         # базовая точность случайного броска
+    targeted_accuracy: float = 0.55       # базовая точность целевого броска
+    focus_bonus: float = 0.08             # +точность за стак фокуса (до MAX_FOCUS_STACKS)
+    heat_penalty_slope: float = 1.0       # п.п. штрафа точности за каждые 5 жара
+    heat_penalty_cap: float = 0.20        # потолок штрафа за жар
+    overheat_penalty: float = 0.10        # доп. штраф при жаре >= 80
+    role_accuracy: Dict[str, float] = field(default_factory=lambda: dict(ROLE_ACCURACY))
+    target_role_accuracy: Dict[str, float] = field(default_factory=lambda: dict(TARGET_ROLE_ACCURACY))
+    heat_per_throw: int = 2               # жар за случайный бросок
+    heat_per_targeted_throw: int = 3      # жар за целевой бросок
+    heat_half_life: float = HEAT_SETTINGS['half_life']  # остывание жара между бросками, с (inf — без остывания)
+    targeted_share: float = 0.3           # доля целевых бросков (/go@имя)
+    mean_throw_interval: float = 20.0     # среднее время между попытками игрока, с
+    cooldown: float = MIN_THROW_INTERVAL  # кулдаун между бросками, с
+    oracle_cooldown_factor: float = role_strategy('oracle').cooldown_factor  # оракул ждёт меньше
+    role_duration: float = ROLE_DURATION  # время жизни роли, с
+    comeback_enabled: bool = COMEBACK_SETTINGS['enabled']  # множитель камбэка на выигрыш отстающих
+    comeback_min_players: int = COMEBACK_SETTINGS['min_players']
+    comeback_tiers: tuple = COMEBACK_SETTINGS['tiers']  # (квантиль, множитель) по счёту чата
+    comeback_below_mean: float = COMEBACK_SETTINGS['below_mean']
+
+def hit_chance(params: SimParams, is_targeted: bool, role: Optional[str], target_role: Optional[str],
+               heat: int, stacks: int) -> float:
+    """GameLogic.hit_chance_formula с параметрами SimParams (при умолчаниях совпадает побитово)"""
+    accuracy = params.targeted_accuracy if is_targeted else params.random_accuracy
+    accuracy += min(stacks, MAX_FOCUS_STACKS) * params.focus_bonus
+    accuracy -= min(int(heat / 5) * params.heat_penalty_slope / 100.0, params.heat_penalty_cap)
+    if heat >= 80:
+        accuracy -= params.overheat_penalty
+
+    accuracy = role_strategy(role).accuracy_rule(accuracy, params.role_accuracy.get(role, 0.0), heat, stacks)
+    accuracy += params.target_role_accuracy.get(target_role, 0.0)
+    return max(0.05, min(0.95, accuracy))
+
+class BalanceSimulator:
+    """Скомпилированная под SimParams модель броска: таблицы исходов и шансов в массивах NumPy"""
+
+    def __init__(self, params: Optional[SimParams] = None, game: Optional[GameLogic] = None):
+        if np is None:
+            raise RuntimeError("Для симулятора нужен numpy: pip install numpy")
+        self.params = params or SimParams()
+        self.game = game or GameLogic()
+        self.outcomes = tuple(self.game.outcomes)
+        self.roles = tuple(strategy.key for strategy in ROLE_STRATEGIES)
+        self.role_ids = {role: i for i, role in enumerate(self.roles)}
+        code = {outcome: i for i, outcome in enumerate(self.outcomes)}
+        self.code = code
+
+        # Случайный бросок: CDF исходов по индексу состояния OutcomeTables
+        tables = OutcomeTables(self.outcomes, self.roles, self._weights_fn())
+        cdf = np.cumsum([table.probabilities for table in tables.tables], axis=1)
+        cdf[:, -1] = 1.0
+        self.outcome_cdf = cdf
+
+        # Целевой бросок: шанс попадания [целевой?, роль, класс роли цели, жар, стаки]
+        hit_table = HitChanceTable(self.roles, partial(hit_chance, self.params))
+        self.hit = np.frombuffer(hit_table.values, dtype=np.float64).reshape(
+            2, len(self.roles), hit_table.n_target_classes, MAX_HEAT + 1, MAX_FOCUS_STACKS + 1)
+        self.hit_values = hit_table.values
+        self.target_class = np.array(hit_table.target_class, dtype=np.int64)
+
+        n = len(self.outcomes)
+        self.random_scores = np.zeros(n, dtype=np.int64)
+        self.targeted_scores = np.zeros(n, dtype=np.int64)
+        for outcome, score in RANDOM_SCORES.items():
+            self.random_scores[code[outcome]] = score
+        for outcome, score in TARGETED_SCORES.items():
+            self.targeted_scores[code[outcome]] = score
+        self.combo_mask = np.isin(np.arange(n), [code[o] for o in COMBO_OUTCOMES])
+        self.streak_mask = np.isin(np.arange(n), [code[o] for o in STREAK_OUTCOMES])
+        # Спецэффекты целевого броска по role_id: шанс подменить исход и шанс промаха стать splash
+        self.forced_special_chance = np.array([s.forced_special_chance for s in ROLE_STRATEGIES])
+        self.miss_to_splash = np.array([s.miss_to_splash for s in ROLE_STRATEGIES])
+
+    def _weights_fn(self):
+        """Живые модификаторы весов (роль, жар, комбо, серия) поверх базовых весов из SimParams"""
+        live_base = self.game.weights
+        if min(live_base) <= 0:
+            raise ValueError("Веса OUTCOME_PROBABILITIES должны быть положительными")
+        base = [float(self.params.base_weights[outcome]) for outcome in self.outcomes]
+
+        def weights_fn(role, heat, combo_count, streak_count, collector_focus, snot_double):
+            live = self.game.compute_outcome_weights(role, heat, combo_count, streak_count,
+                                                     collector_focus, snot_double)
+            return [b * w / g for b, w, g in zip(base, live, live_base)]
+        return weights_fn
+
+    def run(self, throws: int, chats: int = 100, players_per_chat: int = 20, seed: int = 42) -> Dict:
+        """Прогоняет throws бросков по chats чатам и возвращает сводку баланса"""
+        if players_per_chat < 2:
+            raise ValueError("В чате нужно хотя бы два игрока")
+        p = self.params
+        c = self.code
+        rng = np.random.default_rng(seed)
+        n = chats * players_per_chat
+        n_roles = len(self.roles)
+        n_outcomes = len(self.outcomes)
+        oracle, magnet = self.role_ids['oracle'], self.role_ids['magnet']
+        heat_thresholds = np.array(HEAT_THRESHOLDS)
+
+        # Состояние игроков
+        clock = np.zeros(n)
+        last_throw = np.full(n, -np.inf)
+        role = np.zeros(n, dtype=np.int64)
+        role_expires = np.full(n, -np.inf)
+        heat = np.zeros(n, dtype=np.int64)
+        heat_at = np.zeros(n)  # момент последнего изменения жара
+        combo = np.zeros(n, dtype=np.int64)
+        streak = np.zeros(n, dtype=np.int64)
+        score = np.zeros(n, dtype=np.int64)
+        # Камбэк: позиции порогов квантилей в отсортированном счёте чата (как ScoreHistogram.cut)
+        cut_positions = [max(math.ceil(q * players_per_chat), 1) - 1 for q, _ in p.comeback_tiers]
+        focus = np.zeros((n, players_per_chat), dtype=np.int64)  # стаки фокуса на соседей по чату
+        local = np.arange(n) % players_per_chat
+        chat_base = np.arange(n) - local
+
+        random_counts = np.zeros(n_outcomes, dtype=np.int64)
+        targeted_counts = np.zeros(n_outcomes, dtype=np.int64)
+        role_throws = np.zeros(n_roles)
+        role_wins = np.zeros(n_roles)
+        role_score = np.zeros(n_roles)
+        done = blocked = comebacks = 0
+
+        started = time.perf_counter()
+        while done < throws:
+            clock += rng.exponential(p.mean_throw_interval, n)
+
+            # Кулдаун (у оракула короче) — по роли, активной до броска
+            active_role = np.where(clock <= role_expires, role, 0)
+            cooldown = np.where(active_role == oracle, p.cooldown * p.oracle_cooldown_factor, p.cooldown)
+            idx = np.flatnonzero(clock - last_throw >= cooldown)
+            blocked += n - idx.size
+            idx = idx[:throws - done]
+            if not idx.size:
+                continue
+            now = clock[idx]
+            last_throw[idx] = now
+            # Жар остыл с последнего броска (в игре — лениво при чтении, здесь — на броске)
+            heat[idx] = np.rint(heat[idx] * 0.5 ** ((now - heat_at[idx]) / p.heat_half_life)).astype(np.int64)
+            heat_at[idx] = now
+
+            # Роль выдаётся при броске, если прежняя истекла
+            expired = idx[active_role[idx] == 0]
+            role[expired] = rng.integers(1, n_roles, expired.size)
+            role_expires[expired] = clock[expired] + p.role_duration
+            thrower_role = role[idx]
+
+            targeted = rng.random(idx.size) < p.targeted_share
+            outcome = np.empty(idx.size, dtype=np.int64)
+
+            # Случайный бросок: поиск таблицы по состоянию и выборка по CDF
+            ri = idx[~targeted]
+            r_role = thrower_role[~targeted]
+            state = (((r_role * 4 + np.searchsorted(heat_thresholds, heat[ri], side='right')) * 2
+                      + (combo[ri] >= COMBO_TIER_MIN)) * 2 + (streak[ri] >= STREAK_TIER_MIN)) * 2
+            r_out = (self.outcome_cdf[state] > rng.random(ri.size)[:, None]).argmax(axis=1)
+            outcome[~targeted] = r_out
+            # Магнит: первый удар по новой цели сразу даёт стак фокуса
+            magnets = (r_role == magnet) & (r_out != c['miss'])
+            if magnets.any():
+                mi = ri[magnets]
+                mt = (local[mi] + rng.integers(1, players_per_chat, mi.size)) % players_per_chat
+                focus[mi, mt] = np.maximum(focus[mi, mt], 1)
+
+            # Целевой бросок: фокус +1, шанс попадания из таблицы, спецэффекты ролей
+            ti = idx[targeted]
+            t_role = thrower_role[targeted]
+            tt = (local[ti] + rng.integers(1, players_per_chat, ti.size)) % players_per_chat
+            target = chat_base[ti] + tt
+            stacks = np.minimum(focus[ti, tt] + 1, MAX_FOCUS_STACKS)
+            focus[ti, tt] = stacks
+            target_role = np.where(clock[ti] <= role_expires[target], role[target], 0)
+            chance = self.hit[1, t_role, self.target_class[target_role], heat[ti], stacks]
+            rolls = rng.random((3, ti.size))
+            special = rolls[1] < self.forced_special_chance[t_role]
+            splash = rolls[2] < self.miss_to_splash[t_role]
+            t_out = np.where(special, c['special'],
+                             np.where(rolls[0] < chance, c['direct_hit'],
+                                      np.where(splash, c['splash'], c['miss'])))
+            outcome[targeted] = t_out
+
+            # Счётчики, жар и счёт
+            delta = np.where(targeted, self.targeted_scores[outcome], self.random_scores[outcome])
+            if p.comeback_enabled and players_per_chat >= p.comeback_min_players:
+                # Место в чате — по счёту до раунда (в игре — до броска, пороги с отставанием до refresh)
+                gain = np.flatnonzero(delta > 0)
+                bonus = self._comeback(score, idx[gain] // players_per_chat, score[idx[gain]],
+                                       players_per_chat, cut_positions)
+                delta[gain] = np.rint(delta[gain] * bonus).astype(np.int64)
+                comebacks += int(np.count_nonzero(bonus > 1.0))
+            combo[idx] = np.where(self.combo_mask[outcome], combo[idx] + 1, 0)
+            streak[idx] = np.where(self.streak_mask[outcome], streak[idx] + 1, 0)
+            heat[idx] = np.minimum(heat[idx] + np.where(targeted, p.heat_per_targeted_throw, p.heat_per_throw),
+                                   MAX_HEAT)
+            score[idx] += delta
+
+            random_counts += np.bincount(r_out, minlength=n_outcomes)
+            targeted_counts += np.bincount(t_out, minlength=n_outcomes)
+            role_throws += np.bincount(thrower_role, minlength=n_roles)
+            role_wins += np.bincount(thrower_role[delta > 0], minlength=n_roles)
+            role_score += np.bincount(thrower_role, weights=delta, minlength=n_roles)
+            done += idx.size
+
+        elapsed = time.perf_counter() - started
+        return summarize(self.outcomes, random_counts, targeted_counts, role_throws, role_wins,
+                         role_score, score, heat, blocked, elapsed, comebacks)
+
+    def _comeback(self, score, chat, own, players_per_chat: int, cut_positions) -> 'np.ndarray':
+        """Множитель камбэка GameLogic._comeback_bonus для игроков чатов chat со счётом own"""
+        p = self.params
+        board = np.sort(score.reshape(-1, players_per_chat), axis=1)
+        mean = board.mean(axis=1)[chat]
+        bonus = np.where(own < mean, p.comeback_below_mean, 1.0)
+        # Первый подходящий порог побеждает: накладываем с последнего
+        for position, (_, multiplier) in reversed(list(zip(cut_positions, p.comeback_tiers))):
+            bonus = np.where((own < mean) & (own <= board[chat, position]), multiplier, bonus)
+        return bonus
+
+def summarize(outcomes, random_counts, targeted_counts, role_throws, role_wins, role_score,
+              score, heat, blocked: int, elapsed: float, comebacks: int = 0) -> Dict:
+    """Сводка прогона: доли исходов, дрейф счёта и результаты по ролям"""
+    n_random, n_targeted = int(sum(random_counts)), int(sum(targeted_counts))
+    total = n_random + n_targeted
+
+    def mix(counts, n):
+        return {outcome: int(k) / n if n else 0.0 for outcome, k in zip(outcomes, counts)}
+
+    return {
+        'throws': total,
+        'random_throws': n_random,
+        'targeted_throws': n_targeted,
+        'cooldown_blocked': int(blocked),
+        'seconds': elapsed,
+        'throws_per_sec': total / elapsed if elapsed else 0.0,
+        'outcome_mix': mix([a + b for a, b in zip(random_counts, targeted_counts)], total),
+        'random_mix': mix(random_counts, n_random),
+        'targeted_mix': mix(targeted_counts, n_targeted),
+        'score_drift': float(sum(role_score)) / total if total else 0.0,  # средний счёт за бросок
+        'comeback_share': comebacks / sum(role_wins) if sum(role_wins) else 0.0,  # доля выигрышей с камбэком
+        'score_std': float(np.std(score)),
+        'mean_heat': float(np.mean(heat)),
+        'roles': {
+            role: {
+                'throws': int(role_throws[i]),
+                'win_rate': role_wins[i] / role_throws[i] if role_throws[i] else 0.0,
+                'score_per_throw': role_score[i] / role_throws[i] if role_throws[i] else 0.0,
+            }
+            for i, role in enumerate(ROLES, start=1)
+        },
+    }
+
+def simulate(params: Optional[SimParams] = None, throws: int = 1_000_000, chats: int = 100,
+             players_per_chat: int = 20, seed: int = 42) -> Dict:
+    """Один прогон симулятора с параметрами params"""
+    return BalanceSimulator(params).run(throws, chats, players_per_chat, seed)
+
+def scalar_reference(throws: int, chats: int = 10, players_per_chat: int = 10, seed: int = 42,
+                     targeted_share: float = SimParams.targeted_share) -> Dict:
+    """Та же нагрузка через живой GameLogic (без кулдауна) — эталон для сверки симулятора"""
+    random.seed(seed)
+    game = GameLogic(seed=seed)
+    code = {outcome: i for i, outcome in enumerate(game.outcomes)}
+    role_ids = {role: i for i, role in enumerate(ROLES, start=1)}
+    n_outcomes, n_roles = len(code), len(ROLES) + 1
+    random_counts, targeted_counts = [0] * n_outcomes, [0] * n_outcomes
+    role_throws, role_wins, role_score = [0] * n_roles, [0] * n_roles, [0] * n_roles
+    chats_players = [[(chat * players_per_chat + i + 1, f"u{chat * players_per_chat + i + 1}")
+                      for i in range(players_per_chat)] for chat in range(chats)]
+    scores = {uid: 0 for players in chats_players for uid, _ in players}
+    comebacks = 0
+
+    started = time.perf_counter()
+    done = 0
+    while done < throws:
+        for chat, players in enumerate(chats_players):
+            for uid, name in players:
+                if done >= throws:
+                    break
+                game.get_player(uid, chat_id=chat).last_throw = NEVER
+                if random.random() < targeted_share:
+                    target_id, target_name = random.choice([p for p in players if p[0] != uid])
+                    result = game.process_throw_at_target(uid, name, target_id, target_name, chat)
+                    targeted_counts[code[result['outcome']]] += 1
+                else:
+                    result = game.process_throw(uid, name, players, chat)
+                    random_counts[code[result['outcome']]] += 1
+                delta = result['score_delta']
+                role_id = role_ids[result['role_used']]
+                role_throws[role_id] += 1
+                role_wins[role_id] += delta > 0
+                role_score[role_id] += delta
+                scores[uid] += delta
+                comebacks += delta > 0 and game.comeback_enabled and result['comeback_bonus'] > 1.0
+                done += 1
+    elapsed = time.perf_counter() - started
+    heat = [game.get_user_heat(uid, chat_id=chat) for chat, players in enumerate(chats_players) for uid, _ in players]
+    return summarize(game.outcomes, random_counts, targeted_counts, role_throws, role_wins, role_score,
+                     list(scores.values()), heat, 0, elapsed, comebacks)
+
+def check_parity(throws: int = 40_000, seed: int = 42, sigmas: float = 4.5) -> Dict:
+    """Сверка симулятора с GameLogic: таблица шансов побитово, доли исходов и счёт — статистически.
+
+    Для каждой доли исхода, каждого win rate роли и доли выигрышей с бонусом камбэка
+    расхождение должно укладываться в sigmas стандартных ошибок разности двух биномиальных долей.
+    """
+    # Эталон гоняет GameLogic без ожидания кулдауна: игровое время в нём не идёт, жар не остывает
+    params = SimParams(cooldown=0.0, heat_half_life=math.inf)
+    sim = BalanceSimulator(params)
+    if sim.hit_values != sim.game.hit_chance_table.values:
+        raise AssertionError("Таблица шансов попадания симулятора расходится с GameLogic")
+
+    # Векторный прогон в 10 раз больше за счёт числа чатов: бросков на игрока столько же,
+    # иначе разъедутся распределения жара, комбо и серий
+    chats, players = 50, 10
+    fast = sim.run(throws * 10, chats * 10, players, seed)
+    slow = scalar_reference(throws, chats, players, seed, params.targeted_share)
+
+    def compare(label, p_fast, n_fast, p_slow, n_slow):
+        p = (p_fast * n_fast + p_slow * n_slow) / (n_fast + n_slow)
+        se = math.sqrt(max(p * (1 - p), 1e-12) * (1 / n_fast + 1 / n_slow))
+        if abs(p_fast - p_slow) > sigmas * se + 1e-12:
+            raise AssertionError(f"{label}: симулятор {p_fast:.4f} против GameLogic {p_slow:.4f} (σ={se:.4f})")
+
+    for kind, n_key in (('random_mix', 'random_throws'), ('targeted_mix', 'targeted_throws')):
+        for outcome in sim.outcomes:
+            compare(f"{kind}.{outcome}", fast[kind][outcome], fast[n_key], slow[kind][outcome], slow[n_key])
+    for role in ROLES:
+        f, s = fast['roles'][role], slow['roles'][role]
+        compare(f"win_rate.{role}", f['win_rate'], f['throws'], s['win_rate'], s['throws'])
+    # Камбэк: доля выигрышей, получивших множитель (выигрышей — win rate на число бросков)
+    wins_fast = sum(r['win_rate'] * r['throws'] for r in fast['roles'].values())
+    wins_slow = sum(r['win_rate'] * r['throws'] for r in slow['roles'].values())
+    compare("comeback_share", fast['comeback_share'], wins_fast, slow['comeback_share'], wins_slow)
+    return {'fast': fast, 'slow': slow}
+
+def print_report(result: Dict):
+    """Печать сводки прогона"""
+    print(f"🎲 Бросков: {result['throws']} ({result['throws_per_sec']:,.0f}/с), "
+          f"целевых {result['targeted_throws']}, отбито кулдауном {result['cooldown_blocked']}")
+    print("📊 Исходы: " + ", ".join(f"{o} {p:.2%}" for o, p in result['outcome_mix'].items()))
+    print(f"📈 Дрейф счёта: {result['score_drift']:+.3f} за бросок, разброс {result['score_std']:.1f}, "
+          f"средний жар {result['mean_heat']:.1f}, выигрышей с камбэком {result['comeback_share']:.1%}")
+    print(f"{'роль':<14} {'бросков':>9} {'win rate':>9} {'очки/бросок':>12}")
+    for role, r in sorted(result['roles'].items(), key=lambda item: -item[1]['win_rate']):
+        print(f"{role:<14} {r['throws']:>9} {r['win_rate']:>9.2%} {r['score_per_throw']:>12.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Монте-Карло симулятор баланса")
+    parser.add_argument('--throws', type=int, default=2_000_000, help="Всего бросков")
+    parser.add_argument('--chats', type=int, default=500, help="Синтетических чатов")
+    parser.add_argument('--players', type=int, default=20, help="Игроков в чате")
+    parser.add_argument('--seed', type=int, default=42, help="Seed генератора")
+    parser.add_argument('--targeted-share', type=float, default=SimParams.targeted_share,
+                        help="Доля целевых бросков")
+    parser.add_argument('--parity', action='store_true', help="Сверить симулятор с GameLogic")
+    args = parser.parse_args()
+
+    quiet()  # INFO-логи на каждый бросок GameLogic исказят замер
+
+    if args.parity:
+        result = check_parity(seed=args.seed)
+        print(f"✅ Паритет с GameLogic: {result['slow']['throws']} скалярных бросков "
+              f"({result['slow']['throws_per_sec']:,.0f}/с) против {result['fast']['throws']} "
+              f"векторных ({result['fast']['throws_per_sec']:,.0f}/с)")
+        return
+
+    params = SimParams(targeted_share=args.targeted_share)
+    print_report(simulate(params, args.throws, args.chats, args.players, args.seed))
+
+if __name__ == "__main__":
+    main()
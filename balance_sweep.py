@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Параллельный перебор параметров баланса ГовноМёт
+
+Раскладывает точки сетки (или случайного поиска) по пулу процессов: каждый воркер
+строит BalanceSimulator под свои SimParams и прогоняет заданное число бросков.
+Результаты построчно дописываются в JSONL-файл по мере готовности, в конце печатается
+рейтинг конфигураций по справедливости — разбросу win rate между ролями.
+
+Параметры задаются как имя=значения; имена — поля SimParams, а также
+weight.<исход> (OUTCOME_PROBABILITIES), role.<роль> (поправка точности роли)
+и target.<роль> (поправка точности по роли цели):
+
+    python balance_sweep.py --grid heat_penalty_slope=0.5,1,1.5 focus_bonus=0.04,0.08,0.12
+    python balance_sweep.py --random 64 --range weight.direct_hit=20:40 role.sniper=0.05:0.2
+    python balance_sweep.py --summary sweep_results.jsonl --top 20
+
+Точки не зависят друг от друга, а каждая — чистая работа CPU без общих данных,
+поэтому перебор масштабируется почти линейно по ядрам. Все точки гоняются на одном
+seed (общие случайные числа), так что разница между ними — от параметров, а не от шума.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields, replace
+from typing import Dict, Iterator, List, Tuple
+
+from balance_sim import SimParams, simulate
+from logger_config import quiet
+
+# Префиксы словарных полей SimParams
+DICT_FIELDS = {'weight': 'base_weights', 'role': 'role_accuracy', 'target': 'target_role_accuracy'}
+
+def apply_overrides(params: SimParams, overrides: Dict[str, float]) -> SimParams:
+    """Копия params с заменёнными полями (имя поля или префикс.ключ)"""
+    scalar_fields = {f.name for f in fields(SimParams)} - set(DICT_FIELDS.values())
+    changes = {}
+    for name, value in overrides.items():
+        prefix, _, key = name.partition('.')
+        if key and prefix in DICT_FIELDS:
+            attr = DICT_FIELDS[prefix]
+            if attr not in changes:
+                changes[attr] = dict(getattr(params, attr))
+            if prefix == 'weight' and key not in changes[attr]:
+                raise ValueError(f"Неизвестный исход: {key}")
+            changes[attr][key] = value
+        elif name in scalar_fields:
+            changes[name] = value
+        else:
+            raise ValueError(f"Неизвестный параметр: {name}")
+    return replace(params, **changes)
+
+def parse_grid(specs: List[str]) -> Dict[str, List[float]]:
+    """heat_penalty_slope=0.5,1,1.5 -> {'heat_penalty_slope': [0.5, 1.0, 1.5]}"""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        grid[name] = [float(v) for v in values.split(',') if v]
+    return grid
+
+def parse_ranges(specs: List[str]) -> Dict[str, Tuple[float, float]]:
+    """focus_bonus=0.02:0.12 -> {'focus_bonus': (0.02, 0.12)}"""
+    ranges = {}
+    for spec in specs:
+        name, _, bounds = spec.partition('=')
+        low, _, high = bounds.partition(':')
+        ranges[name] = (float(low), float(high))
+    return ranges
+
+def grid_points(grid: Dict[str, List[float]]) -> Iterator[Dict[str, float]]:
+    """Все сочетания значений сетки"""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+def random_points(ranges: Dict[str, Tuple[float, float]], count: int, seed: int) -> Iterator[Dict[str, float]]:
+    """count равномерных точек из диапазонов"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {name: rng.uniform(low, high) for name, (low, high) in ranges.items()}
+
+def fairness(result: Dict) -> float:
+    """Целевая функция: стандартное отклонение win rate по ролям (меньше — справедливее)"""
+    return statistics.pstdev(r['win_rate'] for r in result['roles'].values() if r['throws'])
+
+def run_point(task: Tuple[int, Dict[str, float], int, int, int, int]) -> Dict:
+    """Воркер: один прогон симулятора, компактная запись результата"""
+    point, overrides, throws, chats, players, seed = task
+    params = apply_overrides(SimParams(), overrides)
+    result = simulate(params, throws, chats, players, seed)
+    win_rates = {role: r['win_rate'] for role, r in result['roles'].items()}
+    return {
+        'point': point,
+        'params': overrides,
+        'fairness': round(fairness(result), 6),
+        'win_rate_spread': round(max(win_rates.values()) - min(win_rates.values()), 6),
+        'score_drift': round(result['score_drift'], 4),
+        'outcome_mix': {o: round(p, 5) for o, p in result['outcome_mix'].items()},
+        'win_rates': {role: round(rate, 5) for role, rate in win_rates.items()},
+        'throws': result['throws'],
+        'seconds': round(result['seconds'], 3),
+    }
+
+def _init_worker():
+    quiet()  # INFO-логи инициализации GameLogic в каждом процессе только мешают
+
+def run_sweep(points: List[Dict[str, float]], output: str, throws: int, chats: int, players: int,
+              seed: int, workers: int) -> List[Dict]:
+    """Раздаёт точки пулу процессов и дописывает результаты в output по мере готовности"""
+    for overrides in points:
+        apply_overrides(SimParams(), overrides)  # опечатки в именах ловим до запуска пула
+    tasks = [(i, overrides, throws, chats, players, seed) for i, overrides in enumerate(points)]
+    results = []
+    started = time.perf_counter()
+    with open(output, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(run_point, task) for task in tasks]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            results.append(record)
+            print(f"✅ [{len(results)}/{len(tasks)}] точка {record['point']}: "
+                  f"fairness={record['fairness']:.4f} drift={record['score_drift']:+.3f}")
+    elapsed = time.perf_counter() - started
+    total = sum(r['throws'] for r in results)
+    print(f"⏱️ {len(results)} точек за {elapsed:.1f}с, {total / elapsed:,.0f} бросков/с на {workers} процессах")
+    return results
+
+def load_results(path: str) -> List[Dict]:
+    """Читает JSONL с результатами перебора"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def print_summary(results: List[Dict], top: int = 10):
+    """Рейтинг конфигураций по справедливости"""
+    ranked = sorted(results, key=lambda r: r['fairness'])
+    print(f"\n🏆 Лучшие {min(top, len(ranked))} из {len(ranked)} конфигураций (σ win rate по ролям):")
+    for place, record in enumerate(ranked[:top], 1):
+        params = ", ".join(f"{k}={v:g}" for k, v in record['params'].items()) or "по умолчанию"
+        print(f"{place:>3}. σ={record['fairness']:.4f} размах={record['win_rate_spread']:.4f} "
+              f"дрейф={record['score_drift']:+.3f}  {params}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельный перебор параметров баланса")
+    parser.add_argument('--grid', nargs='*', default=[], help="Сетка: имя=v1,v2,...")
+    parser.add_argument('--random', type=int, default=0, help="Число точек случайного поиска")
+    parser.add_argument('--range', nargs='*', default=[], dest='ranges', help="Диапазоны: имя=низ:верх")
+    parser.add_argument('--throws', type=int, default=500_000, help="Бросков на точку")
+    parser.add_argument('--chats', type=int, default=200, help="Синтетических чатов")
+    parser.add_argument('--players', type=int, default=20, help="Игроков в чате")
+    parser.add_argument('--seed', type=int, default=42, help="Seed симуляции и случайного поиска")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Процессов в пуле")
+    parser.add_argument('--output', default='sweep_results.jsonl', help="Куда дописывать результаты")
+    parser.add_argument('--summary', help="Только напечатать рейтинг по готовому файлу")
+    parser.add_argument('--top', type=int, default=10, help="Сколько конфигураций показать")
+    args = parser.parse_args()
+
+    if args.summary:
+        print_summary(load_results(args.summary), args.top)
+        return
+
+    if args.random:
+        points = list(random_points(parse_ranges(args.ranges), args.random, args.seed))
+    else:
+        points = list(grid_points(parse_grid(args.grid)))
+    print(f"🔍 Перебор: {len(points)} точек по {args.throws} бросков, {args.workers} процессов -> {args.output}")
+    results = run_sweep(points, args.output, args.throws, args.chats, args.players, args.seed, args.workers)
+    print_summary(results, args.top)
+
+if __name__ == "__main__":
+    main()
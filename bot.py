@@ -1,5 +1,4 @@
 import asyncio
-import random
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import List, Tuple
@@ -9,10 +8,14 @@ from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from config import BOT_TOKEN, GAME_SETTINGS, LOGGING_SETTINGS
+from config import ADMIN_ID, BOT_TOKEN, GAME_SETTINGS, LOGGING_SETTINGS, RECONCILE_SETTINGS, SHARDING_SETTINGS
+from chat_state import ChatRouter
 from database import Database
-from game_logic import GameLogic
+from counters_reconciler import CountersReconciler
+from focus_cache import FocusPairCache
+from game_logic import GameLogic, ROLES
 from logger_config import setup_logging, get_logger
+from participant_index import ParticipantIndex
 
 # Настройка логирования
 logger = setup_logging(
@@ -27,6 +30,20 @@ dp = Dispatcher()
 # Инициализация компонентов
 db = Database()
 game_logic = GameLogic()
+reconciler = CountersReconciler(db)
+focus_cache = FocusPairCache(db, game_logic)
+
+# Чаты делятся между процессами бота: этот обрабатывает только те, владелец которых — он.
+# Состояние игры чата (game_logic) живёт в одном процессе; с одним процессом — все чаты его
+chat_router = ChatRouter(SHARDING_SETTINGS['workers'])
+WORKER_INDEX = SHARDING_SETTINGS['worker_index']
+
+def _owns_chat(chat_id: int) -> bool:
+    return chat_router.owner(chat_id) == WORKER_INDEX
+
+dp.message.filter(lambda message: _owns_chat(message.chat.id))
+dp.callback_query.filter(lambda callback: _owns_chat(
+    callback.message.chat.id if callback.message else callback.from_user.id))
 
 # Кэш участников чатов (в реальности лучше получать через Telegram API)
 chat_participants_cache = {}
@@ -36,6 +53,13 @@ chat_participants_cache = {}
 chat_seen_users: dict[int, dict[int, str]] = {}
 """chat_id -> { user_id: display_name }"""
 
+# Индекс участников для выбора целей: O(1) выборка «кроме метателя» (см. participant_index.py)
+chat_participant_indexes: dict[int, ParticipantIndex] = {}
+"""chat_id -> ParticipantIndex; сверяется со списком из кэша при его обновлении,
+между обновлениями — пополняется увиденными и теряет вышедших"""
+chat_participant_sources: dict[int, list] = {}
+"""chat_id -> список из кэша, с которым индекс сверен последним"""
+
 def _display_name_from_user(user: types.User) -> str:
     """Возвращает идентификатор для упоминаний: только username или user{id}."""
     return user.username or f"user{user.id}"
@@ -44,6 +68,28 @@ def _record_seen_user(chat_id: int, user: types.User) -> None:
     if chat_id not in chat_seen_users:
         chat_seen_users[chat_id] = {}
     chat_seen_users[chat_id][user.id] = _display_name_from_user(user)
+    # Написавший — участник: сразу доступен как цель, не дожидаясь обновления кэша
+    index = chat_participant_indexes.get(chat_id)
+    if index is not None and not user.is_bot:
+        index.add(user.id, _display_name_from_user(user))
+
+def _forget_user(chat_id: int, user_id: int) -> None:
+    """Вышедший из чата больше не цель: O(1) удаление из индекса и seen"""
+    chat_seen_users.get(chat_id, {}).pop(user_id, None)
+    index = chat_participant_indexes.get(chat_id)
+    if index is not None and index.remove(user_id):
+        logger.info(f"🚪 Участник {user_id} вышел из чата {chat_id}, убран из целей")
+
+def _participant_index(chat_id: int, participants: List[Tuple[int, str]]) -> ParticipantIndex:
+    """Индекс участников чата; со списком из кэша сверяется, только когда тот сменился"""
+    index = chat_participant_indexes.get(chat_id)
+    if index is None:
+        index = chat_participant_indexes[chat_id] = ParticipantIndex()
+    if chat_participant_sources.get(chat_id) is not participants:
+        added, removed = index.sync(participants)
+        chat_participant_sources[chat_id] = participants
+        logger.info(f"🗂️ Индекс участников чата {chat_id}: +{added}/-{removed}, всего {len(index)}")
+    return index
 
 def _virtual_user_id_from_username(username: str) -> int:
     """Генерирует стабильный виртуальный user_id по username (отрицательный ID)."""
@@ -99,8 +145,8 @@ def schedule_auto_delete(msg: types.Message, delay: int = 5):
     except Exception:
         pass
 
-async def get_chat_participants(chat_id: int) -> List[Tuple[int, str]]:
-    """Получение участников чата через Telegram API"""
+async def get_chat_participants(chat_id: int) -> ParticipantIndex:
+    """Получение участников чата через Telegram API (индекс для выбора целей)"""
     try:
         # Используем кэш для оптимизации (обновляем каждые 5 минут)
         cache_key = f"{chat_id}_{datetime.now().strftime('%Y%m%d_%H%M')[:-1]}"  # Округляем до 10 минут
@@ -155,14 +201,15 @@ async def get_chat_participants(chat_id: int) -> List[Tuple[int, str]]:
         # Проверяем, есть ли участники
         if not participants:
             logger.warning(f"⚠️ В чате {chat_id} нет участников для игры")
-            return []
+            return ParticipantIndex()
         
-        logger.info(f"👥 Используем {len(participants)} участников чата {chat_id}")
-        return participants
+        index = _participant_index(chat_id, participants)
+        logger.info(f"👥 Используем {len(index)} участников чата {chat_id}")
+        return index
     
     except Exception as e:
         logger.error(f"❌ Ошибка получения участников чата {chat_id}: {e}")
-        return []
+        return ParticipantIndex()
 
 # Обработчик команды /go (должен быть первым!)
 @dp.message(Command("go"))
@@ -204,9 +251,9 @@ async def cmd_go(message: types.Message):
         # Если промах с редиректом на случайную цель — конвертируем результат
         if game_result.get('outcome') == 'miss' and game_result.get('redirect_random'):
             participants = await get_chat_participants(chat_id)
-            available_targets = [p for p in participants if p[0] != user.id]
-            if available_targets:
-                rnd_id, rnd_username = random.choice(available_targets)
+            random_target = game_logic.choose_target(chat_id, participants, exclude_id=user.id)
+            if random_target:
+                rnd_id, rnd_username = random_target
                 reroll = game_logic.process_throw_at_target(
                     initiator_id=user.id,
                     initiator_username=user.username or f"user{user.id}",
@@ -237,16 +284,14 @@ async def cmd_go(message: types.Message):
                 pass
             return
 
-        for target in game_result['targets']:
-            await db.add_event(
-                initiator_id=user.id,
-                target_id=target[0],
-                outcome=game_result['outcome'],
-                chat_id=chat_id
-            )
-        await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-        for target in game_result['targets']:
-            await db.update_user_stats(target[0], game_result['outcome'], is_target=True)
+        await db.add_throw(
+            initiator_id=user.id,
+            target_ids=[target[0] for target in game_result['targets']],
+            outcome=game_result['outcome'],
+            chat_id=chat_id,
+            rng_seed=game_result.get('rng_seed'),
+            rng_seq=game_result.get('rng_seq')
+        )
         emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
         result_message = f"{emoji} {game_result['message']}"
         # Добавляем роль к результату
@@ -302,9 +347,9 @@ async def cmd_go(message: types.Message):
             logger.info("🧩 Нет участников — используем инициатора как единственную цель для случайного броска")
 
         # Пытаемся выбрать рандомную цель (не инициатора). Если никого, оставим текущую механику
-        available_targets = [p for p in participants if p[0] != user.id]
-        if available_targets:
-            random_target_id, random_target_username = random.choice(available_targets)
+        random_target = game_logic.choose_target(chat_id, participants, exclude_id=user.id)
+        if random_target:
+            random_target_id, random_target_username = random_target
             logger.info(f"🎯 /go без аргумента: выбран случайный таргет @{random_target_username} ({random_target_id})")
             game_result = game_logic.process_throw_at_target(
                 initiator_id=user.id,
@@ -336,19 +381,15 @@ async def cmd_go(message: types.Message):
                 pass
             return
         
-        # Сохраняем событие(я)
-        for target in game_result['targets']:
-            await db.add_event(
-                initiator_id=user.id,
-                target_id=target[0],
-                outcome=game_result['outcome'],
-                chat_id=chat_id
-            )
-        
-        # Обновляем статистику
-        await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-        for target in game_result['targets']:
-            await db.update_user_stats(target[0], game_result['outcome'], is_target=True)
+        # Сохраняем событие(я) и статистику одной транзакцией
+        await db.add_throw(
+            initiator_id=user.id,
+            target_ids=[target[0] for target in game_result['targets']],
+            outcome=game_result['outcome'],
+            chat_id=chat_id,
+            rng_seed=game_result.get('rng_seed'),
+            rng_seq=game_result.get('rng_seq')
+        )
         
         # Сообщение результата
         emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
@@ -430,9 +471,9 @@ async def cmd_go(message: types.Message):
         if not participants:
             initiator_name = user.username or f"user{user.id}"
             participants = [(user.id, initiator_name)]
-        available_targets = [p for p in participants if p[0] != user.id]
-        if available_targets:
-            random_target_id, random_target_username = random.choice(available_targets)
+        random_target = game_logic.choose_target(chat_id, participants, exclude_id=user.id)
+        if random_target:
+            random_target_id, random_target_username = random_target
             game_result = game_logic.process_throw_at_target(
                 initiator_id=user.id,
                 initiator_username=user.username or f"user{user.id}",
@@ -454,16 +495,14 @@ async def cmd_go(message: types.Message):
             except Exception:
                 pass
             return
-        for target in game_result['targets']:
-            await db.add_event(
-                initiator_id=user.id,
-                target_id=target[0],
-                outcome=game_result['outcome'],
-                chat_id=chat_id
-            )
-        await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-        for target in game_result['targets']:
-            await db.update_user_stats(target[0], game_result['outcome'], is_target=True)
+        await db.add_throw(
+            initiator_id=user.id,
+            target_ids=[target[0] for target in game_result['targets']],
+            outcome=game_result['outcome'],
+            chat_id=chat_id,
+            rng_seed=game_result.get('rng_seed'),
+            rng_seq=game_result.get('rng_seq')
+        )
         emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
         result_message = f"{emoji} {game_result['message']}"
         
@@ -563,6 +602,9 @@ async def cmd_go(message: types.Message):
         
         return
     
+    # Подтягиваем сохранённый фокус на цель (из БД — только при первом обращении после рестарта)
+    await focus_cache.load(user.id, target_user[0], chat_id)
+    
     # Обрабатываем бросок в конкретную цель
     game_result = game_logic.process_throw_at_target(
         initiator_id=user.id,
@@ -574,9 +616,9 @@ async def cmd_go(message: types.Message):
     # Редирект при промахе и защита от накладок с кулдауном
     if game_result.get('outcome') == 'miss' and game_result.get('redirect_random'):
         participants = await get_chat_participants(chat_id)
-        available_targets = [p for p in participants if p[0] != user.id]
-        if available_targets:
-            rnd_id, rnd_username = random.choice(available_targets)
+        random_target = game_logic.choose_target(chat_id, participants, exclude_id=user.id)
+        if random_target:
+            rnd_id, rnd_username = random_target
             reroll = game_logic.process_throw_at_target(
                 initiator_id=user.id,
                 initiator_username=user.username or f"user{user.id}",
@@ -595,9 +637,9 @@ async def cmd_go(message: types.Message):
     # Редирект при промахе: сразу метаем в случайного и склеиваем сообщения
     if game_result.get('outcome') == 'miss' and game_result.get('redirect_random'):
         participants = await get_chat_participants(chat_id)
-        available_targets = [p for p in participants if p[0] != user.id]
-        if available_targets:
-            rnd_id, rnd_username = random.choice(available_targets)
+        random_target = game_logic.choose_target(chat_id, participants, exclude_id=user.id)
+        if random_target:
+            rnd_id, rnd_username = random_target
             reroll = game_logic.process_throw_at_target(
                 initiator_id=user.id,
                 initiator_username=user.username or f"user{user.id}",
@@ -636,36 +678,29 @@ async def cmd_go(message: types.Message):
         return
     
     # Обновляем расширенные данные пользователя в БД
-    await db.update_user_heat(user.id, game_result.get('heat_at_throw', 0))
+    # heat_at_throw — уже итоговый жар (остывший плюс прирост за бросок), а не прирост
+    await db.set_user_heat(user.id, chat_id, game_result.get('heat_at_throw', 0))
     await db.update_score(user.id, game_result.get('score_delta', 0))
     if game_result.get('role_used'):
         expires_at = datetime.now() + timedelta(seconds=3600)  # 1 час
         await db.update_user_role(user.id, game_result['role_used'], expires_at.isoformat())
     await db.update_user_last_throw(user.id)
     
-    # Добавляем событие в базу с новыми полями
-    await db.add_event(
+    # Добавляем событие и статистику в базу одной транзакцией
+    await db.add_throw(
         initiator_id=user.id,
-        target_id=target_user[0],
+        target_ids=[target_user[0]],
         outcome=game_result['outcome'],
         chat_id=chat_id,
         role_used=game_result.get('role_used'),
         stacks_at_hit=game_result.get('focus_stacks', 0),
         heat_at_hit=game_result.get('heat_at_throw', 0),
         was_reflect=0,  # TODO: реализовать отражение
-        targets_json=str(game_result['targets'])
+        targets_json=str(game_result['targets']),
+        rng_seed=game_result.get('rng_seed'),
+        rng_seq=game_result.get('rng_seq')
     )
-    
-    # Обновляем фокус в БД
-    focus_stacks = game_result.get('focus_stacks', 0)
-    penalty_until = None
-    if focus_stacks > 3:  # Штраф за фокус
-        penalty_until = (datetime.now() + timedelta(seconds=300)).isoformat()  # 5 минут
-    await db.set_focus(user.id, target_user[0], chat_id, focus_stacks, penalty_until)
-    
-    # Обновляем базовую статистику
-    await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-    await db.update_user_stats(target_user[0], game_result['outcome'], is_target=True)
+    # Фокус уже обновлён в игре; в БД изменённые пары уйдут пачкой по таймеру (focus_cache)
     
     # Формируем сообщение с результатом
     emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
@@ -697,7 +732,11 @@ async def cmd_go(message: types.Message):
     
     if game_result.get('heat_at_throw', 0) > 50:
         result_message += f"\n🔥 Репутация агрессора: {game_result['heat_at_throw']}/100"
-    
+
+    if (game_logic.comeback_enabled and game_result.get('score_delta', 0) > 0
+            and game_result.get('comeback_bonus', 1.0) > 1.0):
+        result_message += f"\n📈 Камбэк: очки x{game_result['comeback_bonus']:g}"
+
     # Добавляем публичные сигналы в то же сообщение
     if game_result.get('public_signals'):
         extras = _format_public_signals(game_result['public_signals'])
@@ -730,6 +769,24 @@ async def _collect_seen_users(message: types.Message):
     except Exception:
         pass
 
+@dp.message(F.new_chat_members)
+async def _collect_joined_users(message: types.Message):
+    """Вошедшие в чат — сразу участники"""
+    try:
+        for member in message.new_chat_members:
+            if not member.is_bot:
+                _record_seen_user(message.chat.id, member)
+    except Exception:
+        pass
+
+@dp.message(F.left_chat_member)
+async def _forget_left_user(message: types.Message):
+    """Вышедшие из чата — больше не цели"""
+    try:
+        _forget_user(message.chat.id, message.left_chat_member.id)
+    except Exception:
+        pass
+
 
 
 @dp.message(Command("start"))
@@ -810,9 +867,11 @@ async def cmd_stats(message: types.Message):
     
     logger.info(f"📊 Команда /stats от пользователя {user.username} (ID: {user.id}) в чате {chat_id}")
     
-    # Получаем всю статистику
-    chat_stats = await db.get_chat_stats(chat_id, days=30)
-    game_stats = await db.get_game_stats(chat_id, days=30)
+    # Получаем всю статистику (параллельно; одинаковые запросы из разных /stats склеиваются в БД-слое)
+    chat_stats, game_stats = await asyncio.gather(
+        db.get_chat_stats(chat_id, days=30),
+        db.get_game_stats(chat_id, days=30)
+    )
     
     if not chat_stats:
         stats_text = "📊 Пока нет данных для статистики. Начните играть!"
@@ -1028,19 +1087,15 @@ async def process_throw_shit(callback: types.CallbackQuery):
                 pass
             return
         
-        # Добавляем событие в базу
-        for target in game_result['targets']:
-            await db.add_event(
-                initiator_id=user.id,
-                target_id=target[0],
-                outcome=game_result['outcome'],
-                chat_id=chat_id
-            )
-        
-        # Обновляем статистику
-        await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-        for target in game_result['targets']:
-            await db.update_user_stats(target[0], game_result['outcome'], is_target=True)
+        # Добавляем события и статистику в базу одной транзакцией
+        await db.add_throw(
+            initiator_id=user.id,
+            target_ids=[target[0] for target in game_result['targets']],
+            outcome=game_result['outcome'],
+            chat_id=chat_id,
+            rng_seed=game_result.get('rng_seed'),
+            rng_seq=game_result.get('rng_seq')
+        )
         
         # Формируем сообщение с результатом
         emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
@@ -1149,19 +1204,15 @@ async def handle_manual_throw(message: types.Message):
                         pass
                     return
                 
-                # Добавляем событие в базу
-                for target in game_result['targets']:
-                    await db.add_event(
-                        initiator_id=user.id,
-                        target_id=target[0],
-                        outcome=game_result['outcome'],
-                        chat_id=chat_id
-                    )
-                
-                # Обновляем статистику
-                await db.update_user_stats(user.id, game_result['outcome'], is_target=False)
-                for target in game_result['targets']:
-                    await db.update_user_stats(target[0], game_result['outcome'], is_target=True)
+                # Добавляем события и статистику в базу одной транзакцией
+                await db.add_throw(
+                    initiator_id=user.id,
+                    target_ids=[target[0] for target in game_result['targets']],
+                    outcome=game_result['outcome'],
+                    chat_id=chat_id,
+                    rng_seed=game_result.get('rng_seed'),
+                    rng_seq=game_result.get('rng_seq')
+                )
                 
                 # Формируем сообщение с результатом
                 emoji = game_logic.get_emoji_for_outcome(game_result['outcome'])
@@ -1300,13 +1351,79 @@ async def cmd_participants(message: types.Message):
 async def cmd_participants_alias(message: types.Message):
     return await cmd_participants(message)
 
+# Параметры /odds: ключ команды -> (аргумент outcome_distribution, преобразование)
+ODDS_ARGS = {
+    'role': ('role', str),
+    'heat': ('heat', int),
+    'combo': ('combo_count', int),
+    'streak': ('streak_count', int),
+    'target': ('target_role', str),
+    'stacks': ('focus_stacks', int),
+    'targeted': ('targeted', lambda v: v.lower() in ('1', 'yes', 'true', 'да')),
+    'n': ('available_targets', int),
+}
+
+@dp.message(Command("odds"))
+async def cmd_odds(message: types.Message):
+    """Точные шансы исходов для гипотетического броска (только для администратора)"""
+    schedule_auto_delete(message, 3)
+    user = message.from_user
+    chat_id = message.chat.id
+
+    if not ADMIN_ID or user.id != ADMIN_ID:
+        logger.warning(f"⚠️ /odds от не-администратора {user.username} (ID: {user.id})")
+        return
+
+    logger.info(f"🎲 Команда /odds от администратора {user.username} в чате {chat_id}")
+
+    kwargs = {}
+    for token in message.text.split()[1:]:
+        key, _, value = token.partition('=')
+        if key not in ODDS_ARGS or not value:
+            await message.answer(f"❌ Неизвестный параметр: {token}\n"
+                                 f"Доступны: {', '.join(f'{k}=' for k in ODDS_ARGS)}")
+            return
+        name, convert = ODDS_ARGS[key]
+        try:
+            kwargs[name] = convert(value)
+        except ValueError:
+            await message.answer(f"❌ Некорректное значение: {token}")
+            return
+    for name in ('role', 'target_role'):
+        if name in kwargs and kwargs[name] not in ROLES:
+            await message.answer(f"❌ Неизвестная роль: {kwargs[name]}")
+            return
+
+    dist = game_logic.outcome_distribution(**kwargs)
+    lines = [f"🎲 <b>Шансы броска</b> ({', '.join(f'{k}={v}' for k, v in kwargs.items()) or 'по умолчанию'})\n"]
+    if dist['hit_chance'] is not None:
+        lines.append(f"🎯 Шанс попадания: {dist['hit_chance']:.1%}\n")
+    for outcome, p in sorted(dist['outcomes'].items(), key=lambda item: -item[1]):
+        lines.append(f"• {outcome}: {p:.2%}")
+    lines.append("\n👥 <b>Число целей:</b>")
+    for count, p in sorted(dist['target_counts'].items()):
+        lines.append(f"• {count}: {p:.2%}")
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+@dp.message(F.text.regexp(r"^/odds(?:@[A-Za-z0-9_]+)?(?:\s|$)"))
+async def cmd_odds_alias(message: types.Message):
+    return await cmd_odds(message)
+
 # Убрали отдельный алиас для /go@user, чтобы избежать двойных срабатываний
 
 async def main():
     """Главная функция"""
     logger.log_startup()
+    if chat_router.workers > 1:
+        logger.info(f"🧩 Воркер {WORKER_INDEX + 1} из {chat_router.workers}: обрабатываются только свои чаты")
     max_retries = 5
     retry_delay = 10
+    reconciler_task = None
+    if RECONCILE_SETTINGS['enabled']:
+        reconciler_task = asyncio.create_task(reconciler.start_reconciler())
+    focus_task = asyncio.create_task(focus_cache.start_flusher())
+    timer_task = asyncio.create_task(game_logic.start_timer_task())
     
     try:
         for attempt in range(max_retries):
@@ -1325,6 +1442,14 @@ async def main():
                     logger.error("❌ Все попытки запуска исчерпаны. Бот не может быть запущен.")
                     break
     finally:
+        if reconciler_task:
+            await reconciler.stop_reconciler()
+            reconciler_task.cancel()
+        focus_task.cancel()
+        await focus_cache.stop_flusher()
+        game_logic.stop_timer_task()
+        timer_task.cancel()
+        db.close()
         logger.log_shutdown()
         try:
             await bot.session.close()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Состояние игры по чатам ГовноМёт: раздел на чат и маршрутизация чатов по воркерам
+
+Раньше GameLogic держал одну карту игроков на все чаты: роль, жар, кулдаун и комбо
+пользователя были общими для всех его чатов. Два процесса с такой картой разошлись бы:
+кулдаун, набранный в одном, не виден другому. Здесь всё, что игра помнит, делится по
+чатам: ChatState — игроки чата (запись на пользователя в этом чате), стаки фокуса,
+поток случайных чисел и штрафы за фокус. Раздел принадлежит одному воркеру и целиком
+переезжает к другому: to_dict() даёт JSON-совместимый снимок, где моменты времени
+записаны относительно «сейчас» (монотонные часы разных процессов несравнимы), а
+load_dict() раскладывает его на часах принимающего воркера.
+
+ChatRouter решает, какой воркер владеет чатом (rendezvous-хеширование): у каждого чата
+свой порядок воркеров, владелец — первый. При добавлении воркера переезжает только
+доля чатов ~1/N — ровно те, что он у кого-то «перехватил». Передачу чатов между
+двумя GameLogic проверяет tests/test_chat_state.py.
+
+    python chat_state.py  # раскладка чатов по воркерам
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+from config import COMEBACK_SETTINGS
+from player_state import PlayerState, ChatFocus, StateMap, NEVER
+from rng_streams import ChatStream, mix64, GAMMA, MASK64
+from roles import role_strategy
+from score_stats import ScoreHistogram
+
+def _ago(now: float, moment: float) -> Optional[float]:
+    """Сколько секунд назад был moment (None — «ещё не было»)"""
+    return None if moment == NEVER else now - moment
+
+def _at(now: float, ago: Optional[float]) -> float:
+    return NEVER if ago is None else now - ago
+
+def _left(now: float, moment: float) -> Optional[float]:
+    """Сколько секунд до moment (None — срока нет)"""
+    return None if moment == NEVER else moment - now
+
+def _until(now: float, left: Optional[float]) -> float:
+    return NEVER if left is None else now + left
+
+class ChatState:
+    """Всё состояние игры одного чата — раздел, которым владеет один воркер.
+
+    players — записи игроков в этом чате (LRU и TTL простоя, как раньше у общей карты),
+    focus — стаки фокуса пар, stream — поток SplitMix64 чата,
+    focus_penalties — (initiator_id, target_id) -> конец штрафа по часам игры,
+    scores — гистограмма счёта игроков чата (ведётся при создании, изменении счёта и вытеснении).
+    """
+
+    __slots__ = ('chat_id', 'players', 'focus', 'stream', 'focus_penalties', 'scores', 'last_seen')
+
+    def __init__(self, max_players: int, player_ttl: float, max_focus_pairs: int,
+                 player_evictions: Optional[Dict[str, int]] = None,
+                 focus_evictions: Optional[Dict[str, int]] = None):
+        self.chat_id: Optional[int] = None  # задаёт GameLogic при создании
+        self.scores = ScoreHistogram(tuple(quantile for quantile, _ in COMEBACK_SETTINGS['tiers']),
+                                     COMEBACK_SETTINGS['refresh_updates'])
+        self.players = StateMap(self._new_player, max_players, player_ttl)
+        self.players.on_evict = self._forget_player
+        if player_evictions is not None:
+            self.players.evictions = player_evictions  # счётчики общие на все чаты
+        self.focus = ChatFocus(max_focus_pairs, focus_evictions)
+        self.stream = ChatStream()
+        self.focus_penalties: Dict[Tuple[int, int], float] = {}
+        self.last_seen = NEVER
+
+    def _new_player(self) -> PlayerState:
+        self.scores.add(0)
+        return PlayerState()
+
+    def _forget_player(self, user_id: int, player: PlayerState):
+        self.scores.remove(player.score)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        """JSON-совместимый снимок чата; времена — относительно now.
+        Порядок игроков и пар сохраняется: от него зависит, кого вытеснят первым"""
+        players = []
+        for user_id, player in self.players.items.items():
+            players.append([user_id, player.role, _left(now, player.role_expires),
+                            player.heat, _ago(now, player.heat_at), player.score,
+                            _ago(now, player.last_throw), player.combo, player.streak,
+                            player.debuff_miss_bonus, _left(now, player.debuff_expires),
+                            _ago(now, player.last_seen)])
+        return {
+            'chat_id': self.chat_id,
+            'rng': [self.stream.seed, self.stream.state],
+            'players': players,
+            'focus': [[initiator_id, target_id, stacks]
+                      for (initiator_id, target_id), stacks in self.focus.stacks.items()],
+            # Ещё не сохранённые в БД пары сохранит новый владелец
+            'focus_dirty': [[initiator_id, target_id, stacks]
+                            for (initiator_id, target_id), stacks in self.focus.dirty.items()],
+            'focus_penalties': [[initiator_id, target_id, until - now]
+                                for (initiator_id, target_id), until in self.focus_penalties.items()],
+            'score_cuts': [self.scores.cuts, self.scores.stale],
+        }
+
+    def load_dict(self, data: Dict[str, Any], now: float):
+        """Раскладывает снимок to_dict() на часах этого процесса (now — «сейчас» здесь)"""
+        self.chat_id = data['chat_id']
+        self.stream.seed, self.stream.state = data['rng']
+        items = self.players.items
+        items.clear()
+        for (user_id, role, role_left, heat, heat_ago, score, throw_ago, combo, streak,
+             debuff_bonus, debuff_left, seen_ago) in data['players']:
+            player = PlayerState()
+            strategy = role_strategy(role)
+            player.role, player.role_id = strategy.key, strategy.role_id  # role_id — по реестру этого процесса
+            player.role_expires = _until(now, role_left) if strategy.key else NEVER
+            player.heat = heat
+            player.heat_at = _at(now, heat_ago)
+            player.score = score
+            player.last_throw = _at(now, throw_ago)
+            player.combo = combo
+            player.streak = streak
+            player.debuff_miss_bonus = debuff_bonus
+            player.debuff_expires = _until(now, debuff_left)
+            player.last_seen = _at(now, seen_ago)
+            items[user_id] = player
+        self.focus.stacks = {(initiator_id, target_id): stacks for initiator_id, target_id, stacks in data['focus']}
+        self.focus.dirty = {(initiator_id, target_id): stacks
+                            for initiator_id, target_id, stacks in data['focus_dirty']}
+        self.focus_penalties = {(initiator_id, target_id): now + left
+                                for initiator_id, target_id, left in data['focus_penalties']}
+        # Гистограмма выводится из игроков; готовые пороги и их возраст — как у отправителя
+        self.scores.reset(player.score for player in items.values())
+        self.scores.cuts, self.scores.stale = data['score_cuts']
+        self.last_seen = now
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __repr__(self) -> str:
+        return f"ChatState(chat={self.chat_id}, игроков={len(self.players)}, пар фокуса={len(self.focus)})"
+
+class ChatRouter:
+    """Владелец чата среди воркеров — rendezvous (HRW) хеширование.
+
+    Вес пары (чат, воркер) — mix64 от обоих; владелец — воркер с наибольшим весом.
+    Решение не зависит от других чатов и одинаково во всех процессах.
+    """
+
+    def __init__(self, workers: int, seed: int = 0):
+        if workers < 1:
+            raise ValueError("Нужен хотя бы один воркер")
+        self.workers = workers
+        self.seed = seed
+
+    def _weight(self, chat_id: int, worker: int) -> int:
+        return mix64((self.seed + (chat_id & MASK64) * GAMMA + mix64(worker + 1)) & MASK64)
+
+    def owner(self, chat_id: int) -> int:
+        """Номер воркера (0..workers-1), который владеет чатом"""
+        if self.workers == 1:
+            return 0
+        return max(range(self.workers), key=lambda worker: self._weight(chat_id, worker))
+
+    def handoffs(self, chat_ids: Iterable[int], new_router: 'ChatRouter') -> Dict[int, Tuple[int, int]]:
+        """Чаты, меняющие владельца при переходе на new_router: chat_id -> (старый, новый)"""
+        moves = {}
+        for chat_id in chat_ids:
+            old, new = self.owner(chat_id), new_router.owner(chat_id)
+            if old != new:
+                moves[chat_id] = (old, new)
+        return moves
+
+    def __repr__(self) -> str:
+        return f"ChatRouter(workers={self.workers})"
+
+if __name__ == "__main__":
+    # Раскладка: как делятся чаты и сколько переезжает при добавлении воркера
+    chat_ids = range(1, 100001)
+    for workers_count in (4, 8):
+        router = ChatRouter(workers_count)
+        load = [0] * workers_count
+        for chat_id in chat_ids:
+            load[router.owner(chat_id)] += 1
+        moves = router.handoffs(chat_ids, ChatRouter(workers_count + 1))
+        print(f"{workers_count} воркеров: чатов на воркер {min(load)}..{max(load)}; "
+              f"+1 воркер — переезжают {len(moves) / len(chat_ids):.1%} (идеал {1 / (workers_count + 1):.1%})")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Часы ГовноМёт: источник времени для GameLogic
+
+Кулдауны, роли, дебаффы и колесо таймеров считают время в секундах-float от
+переданных часов. Бот работает на MonotonicClock; симуляции и нагрузочные тесты —
+на VirtualClock, которую можно проматывать: час игры проигрывается за доли секунды,
+а замеры кулдаунов не зависят от реального времени.
+
+    clock = VirtualClock()
+    game = GameLogic(clock=clock)
+    clock.advance(ROLE_DURATION)  # роли истекут на следующем броске
+"""
+
+import time
+
+class MonotonicClock:
+    """Монотонное время процесса (по умолчанию): не прыгает при переводе системных часов."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+class WallClock:
+    """Unix-время: отметки сравнимы между процессами, но могут прыгнуть при синхронизации часов."""
+
+    def now(self) -> float:
+        return time.time()
+
+class VirtualClock:
+    """Виртуальное время: стоит на месте, пока его не промотают."""
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def now(self) -> float:
+        return self.current
+
+    def advance(self, seconds: float) -> float:
+        """Промотать вперёд на seconds; возвращает новое время"""
+        if seconds < 0:
+            raise ValueError("Виртуальное время не идёт назад")
+        self.current += seconds
+        return self.current
+
+    def set(self, moment: float):
+        """Перевести на момент moment (не раньше текущего)"""
+        if moment < self.current:
+            raise ValueError("Виртуальное время не идёт назад")
+        self.current = moment
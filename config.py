@@ -29,6 +29,108 @@ LOGGING_SETTINGS = {
     'enable_error_logging': True,     # Включить отдельное логирование ошибок
 }
 
+# Профили хранения SQLite: применяются к каждому соединению с БД
+# journal_mode ставится один раз при инициализации, остальное — на каждое соединение.
+# cache_size < 0 — размер в КиБ, mmap_size — в байтах.
+STORAGE_PROFILES = {
+    'durable': {                      # Поведение SQLite по умолчанию: максимум надёжности
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'wal_autocheckpoint': 1000,
+        'checkpoint_on_close': None,
+    },
+    'balanced': {                     # WAL + NORMAL: теряем максимум последние транзакции при сбое ОС
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,
+        'checkpoint_on_close': 'PASSIVE',
+    },
+    'throughput': {                   # Без fsync: быстрее всего, но сбой ОС может повредить хвост БД
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 10000,
+        'checkpoint_on_close': 'TRUNCATE',
+    },
+}
+
+# Настройки базы данных
+DATABASE_SETTINGS = {
+    'path': os.getenv('DB_PATH', 'govnomet.db'),                     # Файл SQLite
+    'storage_profile': os.getenv('DB_STORAGE_PROFILE', 'durable'),  # Ключ из STORAGE_PROFILES; быстрые — по выбору
+    'read_connections': 4,            # Соединений только для чтения у запросов статистики из asyncio.to_thread
+}
+
+# Пакетная запись изменённых пар фокуса (инициатор -> цель) из GameLogic в focus_pairs
+FOCUS_CACHE_SETTINGS = {
+    'flush_interval': 30,             # Период сброса изменённых пар в БД, секунды
+}
+
+# Лимиты игрового состояния GameLogic в памяти (вытесняются только давно неактивные)
+GAME_STATE_LIMITS = {
+    'max_players_per_chat': 20000,    # Записей игроков в одном чате; сверх лимита вытесняется самый давний (LRU)
+    'player_ttl': 6 * 3600,           # Забыть игрока после стольких секунд простоя (не меньше срока роли)
+    'max_chats': 20000,               # Чатов с состоянием игры (игроки, фокус, поток случайных чисел)
+    'chat_ttl': 24 * 3600,            # Забыть состояние чата после простоя, секунды
+    'max_focus_pairs_per_chat': 5000, # Пар фокуса в одном чате; сверх лимита отбрасывается старшая половина
+}
+
+# Остывание жара: экспоненциальное, считается при чтении (без фоновых проходов по игрокам)
+HEAT_SETTINGS = {
+    'half_life': 900,                 # За столько секунд без бросков жар падает вдвое
+}
+
+# Бонус камбэка отстающим: счёт игрока против распределения счёта в чате (score_stats.py)
+COMEBACK_SETTINGS = {
+    'enabled': True,                  # Множитель камбэка применяется к выигрышу очков (False — только в результате броска)
+    'min_players': 5,                 # Меньше игроков в чате — без бонуса
+    'tiers': ((0.10, 1.5), (0.25, 1.25)),  # (квантиль, множитель): счёт не выше порога квантиля и ниже среднего
+    'below_mean': 1.1,                # Ниже среднего, но выше порогов квантилей
+    'refresh_updates': 64,            # Пороги квантилей пересчитываются раз в столько изменений счёта
+}
+
+# Массовые исходы (легендарный, лавина, дождь) в больших чатах
+MASS_OUTCOME_SETTINGS = {
+    'render_limit': 20,               # Сколько @упоминаний показать в сообщении, остальные — «и ещё N»
+    'aggregate_min_targets': 10,      # С такого числа целей бросок пишется в events одной строкой
+}
+
+# Случайность GameLogic: у каждого чата свой поток, seed и позиция пишутся в events
+RNG_SETTINGS = {
+    'seed': int(os.getenv('GAME_RNG_SEED')) if os.getenv('GAME_RNG_SEED') else None,  # None — seed из os.urandom
+}
+
+# Несколько процессов бота: каждый ведёт только свои чаты (владелец чата — chat_state.ChatRouter)
+SHARDING_SETTINGS = {
+    'workers': int(os.getenv('WORKERS', '1')),            # Сколько процессов делят чаты
+    'worker_index': int(os.getenv('WORKER_INDEX', '0')),  # Номер этого процесса (0..workers-1)
+}
+
+# Колесо таймеров GameLogic: истечение ролей, дебаффов и штрафов за фокус
+TIMER_SETTINGS = {
+    'resolution': 1.0,                # Длина тика колеса, секунды (точность срабатывания)
+    'slots': 64,                      # Слотов на уровень (степень двойки)
+    'levels': 4,                      # Уровней: 64^4 тиков ≈ 194 дня без overflow
+    'tick_interval': 1.0,             # Период фонового тика, секунды
+    'state_sweep_interval': 300,      # Раз в столько секунд тик вытесняет простаивающее состояние
+}
+
+# Фоновая сверка счётчиков users с журналом events
+RECONCILE_SETTINGS = {
+    'enabled': True,                  # Запускать сверку вместе с ботом
+    'batch_size': 200,                # Событий за одну пачку (одна короткая транзакция)
+    'batch_pause': 0.5,               # Пауза между пачками в секундах
+    'idle_interval': 60,              # Пауза, когда журнал дочитан до конца
+}
+
 # Вероятности исходов (в процентах)
 OUTCOME_PROBABILITIES = {
     'direct_hit': 30,      # Прямое попадание
@@ -254,3 +356,64 @@ GAME_MESSAGES = {
     ]
 }
 
+
+# Фразы публичных сигналов и промаха по цели (шаблоны str.format, компилирует rendering.py)
+PUBLIC_SIGNAL_PHRASES = {
+    # Пул агрессивных ироничных саркастичных фраз для ответки метателю
+    'retaliate': [
+        "метай в /go@{reply_to} а ну покажи что ты умеешь, трус!",
+        "метай в /go@{reply_to} верни говно обратно, если не боишься!",
+        "метай в /go@{reply_to} ты это видел? докажи что ты не тряпка!",
+        "метай в /go@{reply_to} месть подана холодной, но ты же не замерзнешь?",
+        "метай в /go@{reply_to} пора показать кто тут главный, а не прятаться!",
+        "метай в /go@{reply_to} не держи в себе, выплесни всю злость!",
+        "метай в /go@{reply_to} проведи воспитательную работу, если хватит смелости!",
+        "метай в /go@{reply_to} твоя очередь сиять, или ты предпочитаешь молчать?",
+        "метай в /go@{reply_to} джентльмены не промахиваются, а ты кто?",
+        "метай в /go@{reply_to} возьми перчатку… и кинь обратно, если не струсишь!",
+        "метай в /go@{reply_to} покажи что ты не просто болтун!",
+        "метай в /go@{reply_to} докажи что у тебя есть яйца!",
+        "метай в /go@{reply_to} не будь тряпкой, ответь как мужчина!",
+        "метай в /go@{reply_to} ты же не будешь терпеть такое унижение?",
+        "метай в /go@{reply_to} покажи что ты не просто пустозвон!",
+        "метай в /go@{reply_to} докажи что ты не трус и не подкаблучник!",
+        "метай в /go@{reply_to} не прячься за спинами, ответь!",
+        "метай в /go@{reply_to} ты же не будешь молчать как рыба?",
+        "метай в /go@{reply_to} покажи что у тебя есть характер!",
+        "метай в /go@{reply_to} докажи что ты не просто болтун и хвастун!",
+    ],
+    # Пул всратых фраз вместо "может ответить!"
+    'response': [
+        "готов к ответке?",
+        "может дать сдачи?",
+        "готов к реваншу?",
+        "может отомстить?",
+        "готов к контратаке?",
+        "может дать по рогам?",
+        "готов к дуэли?",
+        "может показать кузькину мать?",
+        "готов к разборкам?",
+        "может дать по шапке?",
+        "готов к выяснению отношений?",
+        "может показать кто тут главный?",
+        "готов к разбору полетов?",
+        "может дать по мозгам?",
+        "готов к выяснению кто прав?",
+        "может показать мастер-класс?",
+        "готов к уроку вежливости?",
+        "может дать по зубам?",
+        "готов к воспитательному процессу?",
+        "может показать как надо?",
+    ],
+    # Перегретый агрессор (жар от 20)
+    'heat': [
+        "Агрессор перегрелся ({heat}/100). Остуди его: /go@{reply_to}",
+        "Воняет от смелости ({heat}/100). Пора умыть: /go@{reply_to}",
+    ],
+    # Промах целевого броска без ролевого текста
+    'targeted_miss': [
+        "😬 Промах по @{target}. Говно шмякнулось мимо.",
+        "💨 Не долетело до @{target}. Пыль столбом, толку — ноль.",
+        "🤏 Чуть‑чуть не хватило до @{target}.",
+    ],
+}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Модуль фоновой сверки счётчиков пользователей с журналом событий ГовноМёт
+
+    python counters_reconciler.py govnomet.db          # досверить от сохранённого курсора
+    python counters_reconciler.py govnomet.db --reset  # пересверить весь журнал
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+from database import Database
+from config import RECONCILE_SETTINGS
+from logger_config import get_logger
+
+logger = get_logger('reconciler')
+
+CURSOR_NAME = 'counters_reconciler'
+
+class CountersReconciler:
+    """Идёт по таблице events от сохранённого курсора небольшими пачками.
+
+    Для каждой пачки пересчитывает счётчики затронутых пользователей по журналу,
+    чинит расхождения и копит статистику дрейфа. Каждая пачка — отдельная короткая
+    транзакция, между пачками делается пауза, поэтому бот не блокируется.
+    """
+
+    def __init__(self, database: Database,
+                 batch_size: int = RECONCILE_SETTINGS['batch_size'],
+                 batch_pause: float = RECONCILE_SETTINGS['batch_pause'],
+                 idle_interval: float = RECONCILE_SETTINGS['idle_interval']):
+        self.db = database
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.idle_interval = idle_interval
+        self.is_running = False
+        self.stats = {
+            'batches': 0,
+            'events_scanned': 0,
+            'users_checked': 0,
+            'users_repaired': 0,
+            'drift': {'direct_hits': 0, 'misses': 0, 'self_hits': 0, 'times_hit': 0},
+            'last_batch_at': None,
+        }
+        logger.info("🧮 Сверка счётчиков ГовноМёт инициализирована")
+
+    async def start_reconciler(self):
+        """Запуск фоновой сверки"""
+        if self.is_running:
+            logger.warning("⚠️ Сверка счётчиков уже запущена")
+            return
+
+        self.is_running = True
+        logger.info("🚀 Запуск сверки счётчиков")
+
+        try:
+            while self.is_running:
+                scanned = await self.run_batch()
+                # Догнали хвост журнала — ждём новых событий, иначе идём дальше с небольшой паузой
+                await asyncio.sleep(self.batch_pause if scanned >= self.batch_size else self.idle_interval)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("❌ Ошибка в сверке счётчиков: %s", e)
+        finally:
+            self.is_running = False
+
+    async def stop_reconciler(self):
+        """Остановка фоновой сверки"""
+        self.is_running = False
+        logger.info("🛑 Сверка счётчиков остановлена")
+
+    async def run_batch(self) -> int:
+        """Обрабатывает одну пачку событий после курсора. Возвращает число просмотренных событий."""
+        position = await self.db.get_cursor(CURSOR_NAME)
+        last_id, scanned, user_ids = await self.db.get_event_users_after(position, self.batch_size)
+        if not scanned:
+            return 0
+
+        drift = await self.db.reconcile_user_counters(user_ids)
+        await self.db.set_cursor(CURSOR_NAME, last_id)
+
+        repaired = {d['user_id'] for d in drift}
+        self.stats['batches'] += 1
+        self.stats['events_scanned'] += scanned
+        self.stats['users_checked'] += len(user_ids)
+        self.stats['users_repaired'] += len(repaired)
+        for d in drift:
+            self.stats['drift'][d['field']] += abs(d['expected'] - d['stored'])
+        self.stats['last_batch_at'] = datetime.now().isoformat()
+
+        if drift:
+            logger.warning("⚠️ Дрейф счётчиков в событиях %s..%s: исправлено %s пользователей",
+                           position + 1, last_id, len(repaired))
+            for d in drift:
+                logger.debug("🧮 %s.%s: %s -> %s", d['user_id'], d['field'], d['stored'], d['expected'])
+        else:
+            logger.debug("🧮 События %s..%s сверены, расхождений нет", position + 1, last_id)
+        return scanned
+
+    async def reset_cursor(self):
+        """Сбрасывает курсор — следующий проход начнётся с начала журнала."""
+        await self.db.set_cursor(CURSOR_NAME, 0)
+        logger.info("🔄 Курсор сверки счётчиков сброшен")
+
+    async def get_reconciler_status(self) -> Dict:
+        """Получение статуса сверки и накопленного дрейфа"""
+        status = {
+            'is_running': self.is_running,
+            'cursor': await self.db.get_cursor(CURSOR_NAME),
+            **self.stats,
+        }
+        logger.debug("📊 Статус сверки счётчиков: %s", status)
+        return status
+
+# Пример использования
+async def main():
+    """Проход по журналу событий указанной БД (путь обязателен: сверка чинит счётчики)"""
+    parser = argparse.ArgumentParser(description="Сверка счётчиков пользователей с журналом событий")
+    parser.add_argument('db_path', help="Файл SQLite, счётчики которого сверяются и исправляются")
+    parser.add_argument('--reset', action='store_true',
+                        help="Сбросить курсор и пройти журнал с начала (иначе — от сохранённого курсора)")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        parser.error(f"нет файла БД {args.db_path}")
+    logger.info("🧪 Сверка счётчиков %s%s", args.db_path, " с начала журнала" if args.reset else "")
+
+    db = Database(args.db_path)
+    reconciler = CountersReconciler(db)
+    if args.reset:
+        await reconciler.reset_cursor()
+    while await reconciler.run_batch():
+        pass
+
+    status = await reconciler.get_reconciler_status()
+    logger.info("📊 Итог сверки: %s", status)
+    db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,21 +1,187 @@
 import sqlite3
 import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import List, Tuple, Optional
+from config import DATABASE_SETTINGS, STORAGE_PROFILES, MASS_OUTCOME_SETTINGS, HEAT_SETTINGS
+from player_state import cooled_heat
 from logger_config import get_logger
 
 logger = get_logger('database')
 
+# Исходы, после которых цель считается пострадавшей (times_hit)
+HIT_OUTCOMES = ('direct_hit', 'splash', 'special')
+
+def counter_deltas(initiator_id: int, target_ids: List[int], outcome: str) -> dict[int, list[int]]:
+    """Приращения [direct_hits, misses, self_hits, times_hit] по пользователям для одного броска.
+
+    Правила те же, по которым reconcile_user_counters пересчитывает счётчики из events:
+    каждая цель — отдельная строка события.
+    """
+    deltas: dict[int, list[int]] = {initiator_id: [0, 0, 0, 0]}
+    for target_id in target_ids:
+        if outcome == 'direct_hit':
+            deltas[initiator_id][0] += 1
+        elif outcome == 'miss':
+            deltas[initiator_id][1] += 1
+            deltas[initiator_id][2] += 1
+        elif outcome == 'special' and target_id == initiator_id:
+            deltas[initiator_id][2] += 1
+        if target_id != initiator_id and outcome in HIT_OUTCOMES:
+            deltas.setdefault(target_id, [0, 0, 0, 0])[3] += 1
+    return deltas
+
+def mass_counter_deltas(initiator_id: int, target_ids: List[int], outcome: str) -> Tuple[list[int], int]:
+    """counter_deltas для агрегированного события без цикла по целям.
+
+    Возвращает (приращения метателя, +times_hit каждой жертве кроме метателя) —
+    жертвам хватает одного UPDATE по множеству.
+    """
+    count = len(target_ids)
+    initiator = [0, 0, 0, 0]
+    if outcome == 'direct_hit':
+        initiator[0] = count
+    elif outcome == 'miss':
+        initiator[1] = initiator[2] = count
+    elif outcome == 'special':
+        initiator[2] = target_ids.count(initiator_id)
+    return initiator, 1 if outcome in HIT_OUTCOMES else 0
+
+def single_flight(func):
+    """Склеивает одновременные одинаковые чтения в один запрос к БД.
+
+    Ключ — имя метода и аргументы (с подставленными значениями по умолчанию).
+    Пока запрос выполняется, повторные вызовы с тем же ключом ждут его результат
+    и получают тот же объект, поэтому результат нельзя изменять на месте.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, tuple(bound.arguments.values())[1:])
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(self, *args, **kwargs))
+            self._inflight[key] = task
+
+            def _forget(done, key=key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_forget)
+        else:
+            logger.debug("🔗 Запрос %s%s присоединён к уже выполняющемуся", func.__name__, key[1])
+        # shield: отмена одного ожидающего не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    return wrapper
+
 class Database:
-    def __init__(self, db_path: str = "govnomet.db"):
+    def __init__(self, db_path: str = DATABASE_SETTINGS['path'],
+                 storage_profile: str = DATABASE_SETTINGS['storage_profile']):
         self.db_path = db_path
+        if storage_profile not in STORAGE_PROFILES:
+            logger.warning(f"⚠️ Неизвестный профиль хранения {storage_profile}, используем durable")
+            storage_profile = 'durable'
+        self.storage_profile = storage_profile
+        self.profile = STORAGE_PROFILES[storage_profile]
+        self._inflight: dict[tuple, asyncio.Future] = {}  # ключ чтения -> выполняющийся запрос
+        # Одно пишущее соединение на Database: PRAGMA профиля (кэш страниц, mmap) живут, пока оно
+        # открыто. Операции из цикла событий идут к нему по очереди под замком
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # Запросы статистики из asyncio.to_thread читают через свои соединения только для чтения
+        # и не держат замок пишущего: запись бросков в цикле событий их не ждёт
+        self._readers: queue.LifoQueue = queue.LifoQueue(maxsize=DATABASE_SETTINGS['read_connections'])
         self.init_database()
+
+    def _open(self, readonly: bool = False) -> sqlite3.Connection:
+        """Открывает соединение и применяет PRAGMA выбранного профиля хранения."""
+        if readonly:
+            conn = sqlite3.connect(f"{Path(self.db_path).absolute().as_uri()}?mode=ro", uri=True,
+                                   check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        profile = self.profile
+        conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(profile['wal_autocheckpoint'])}")
+        logger.debug("💾 Соединение с %s открыто (профиль %s%s)", self.db_path, self.storage_profile,
+                     ", только чтение" if readonly else "")
+        return conn
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Общее соединение на время операции: замок держится до выхода, транзакция
+        фиксируется при выходе и откатывается при исключении (как with sqlite3.connect())."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            with self._conn as conn:
+                yield conn
+
+    @contextlib.contextmanager
+    def _reader(self):
+        """Соединение только для чтения из пула (для запросов в asyncio.to_thread); без замка
+        пишущего соединения. Лишние сверх read_connections закрываются по возврату."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open(readonly=True)
+        try:
+            yield conn
+        finally:
+            conn.rollback()  # не держим снимок чтения между запросами
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Чекпоинт по политике профиля и закрытие соединений (вызывается при остановке бота)."""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self.checkpoint()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def checkpoint(self):
+        """Чекпоинт WAL по политике профиля (из close() при остановке бота)."""
+        mode = self.profile.get('checkpoint_on_close')
+        if not mode or self.profile['journal_mode'].upper() != 'WAL':
+            return
+        try:
+            with self._connect() as conn:
+                busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+                logger.info("💾 Чекпоинт WAL (%s): %s/%s страниц, busy=%s", mode, checkpointed, log_frames, busy)
+        except Exception as e:
+            logger.error(f"❌ Ошибка чекпоинта WAL: {e}")
     
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
+                # Режим журнала хранится в файле БД, поэтому достаточно выставить его один раз
+                journal_mode = cursor.execute(f"PRAGMA journal_mode = {self.profile['journal_mode']}").fetchone()[0]
+                logger.info("💾 Профиль хранения %s: journal_mode=%s", self.storage_profile, journal_mode)
                 
                 # Таблица пользователей
                 cursor.execute('''
@@ -31,7 +197,6 @@ class Database:
                         last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         -- Новые поля для расширенной механики
                         score INTEGER DEFAULT 0,
-                        heat INTEGER DEFAULT 0,
                         last_role TEXT,
                         role_expires_at TIMESTAMP,
                         last_throw_ts TIMESTAMP
@@ -40,7 +205,6 @@ class Database:
                 # Альтернативно добавляем недостающие колонки (если таблица уже существовала)
                 for col, ddl in [
                     ("score", "ALTER TABLE users ADD COLUMN score INTEGER DEFAULT 0"),
-                    ("heat", "ALTER TABLE users ADD COLUMN heat INTEGER DEFAULT 0"),
                     ("last_role", "ALTER TABLE users ADD COLUMN last_role TEXT"),
                     ("role_expires_at", "ALTER TABLE users ADD COLUMN role_expires_at TIMESTAMP"),
                     ("last_throw_ts", "ALTER TABLE users ADD COLUMN last_throw_ts TIMESTAMP"),
@@ -65,6 +229,12 @@ class Database:
                         heat_at_hit INTEGER,
                         was_reflect INTEGER DEFAULT 0,
                         targets_json TEXT,
+                        rng_seed INTEGER,
+                        rng_seq INTEGER,
+                        -- Агрегированное событие массового исхода: target_id = NULL,
+                        -- жертвы — JSON-массив user_id, target_count — их число
+                        target_count INTEGER,
+                        victims_json TEXT,
                         FOREIGN KEY (initiator_id) REFERENCES users (user_id),
                         FOREIGN KEY (target_id) REFERENCES users (user_id)
                     )
@@ -76,6 +246,10 @@ class Database:
                     "ALTER TABLE events ADD COLUMN heat_at_hit INTEGER",
                     "ALTER TABLE events ADD COLUMN was_reflect INTEGER DEFAULT 0",
                     "ALTER TABLE events ADD COLUMN targets_json TEXT",
+                    "ALTER TABLE events ADD COLUMN rng_seed INTEGER",
+                    "ALTER TABLE events ADD COLUMN rng_seq INTEGER",
+                    "ALTER TABLE events ADD COLUMN target_count INTEGER",
+                    "ALTER TABLE events ADD COLUMN victims_json TEXT",
                 ]:
                     try:
                         cursor.execute(ddl)
@@ -117,7 +291,45 @@ class Database:
                         PRIMARY KEY (initiator_id, target_id, chat_id)
                     )
                 ''')
-                
+
+                # Жар игрока по чатам (как в GameLogic): значение и Unix-время записи,
+                # от которого жар остывает при чтении
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS chat_heat (
+                        user_id INTEGER,
+                        chat_id INTEGER,
+                        heat INTEGER DEFAULT 0,
+                        updated_at REAL,
+                        PRIMARY KEY (user_id, chat_id)
+                    )
+                ''')
+
+                # Курсоры фоновых задач (например, сверки счётчиков)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS sync_cursors (
+                        name TEXT PRIMARY KEY,
+                        position INTEGER DEFAULT 0,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+
+                # Индексы для пересчёта счётчиков по конкретному пользователю
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_initiator ON events (initiator_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_target ON events (target_id)")
+                # Агрегированных событий мало — частичный индекс, чтобы не сканировать весь журнал
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_mass ON events (initiator_id) "
+                               "WHERE victims_json IS NOT NULL")
+                # События по одной строке на цель: агрегированные разворачиваются через json_each.
+                # Статистика и сверка читают отсюда и видят то же, что при записи строки на жертву.
+                cursor.execute('''
+                    CREATE VIEW IF NOT EXISTS event_targets AS
+                    SELECT id, initiator_id, target_id, outcome, chat_id, timestamp, role_used, targets_json
+                    FROM events WHERE victims_json IS NULL
+                    UNION ALL
+                    SELECT e.id, e.initiator_id, v.value, e.outcome, e.chat_id, e.timestamp, e.role_used, e.targets_json
+                    FROM events e, json_each(e.victims_json) v WHERE e.victims_json IS NOT NULL
+                ''')
+
                 conn.commit()
                 logger.info("✅ База данных инициализирована успешно")
                 
@@ -131,7 +343,7 @@ class Database:
                       first_name: str = None, last_name: str = None) -> bool:
         """Добавление нового пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO users 
@@ -139,7 +351,7 @@ class Database:
                     VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
                 ''', (user_id, username, first_name, last_name))
                 conn.commit()
-                logger.info(f"👤 Пользователь {user_id} (@{username}) добавлен/обновлен в БД")
+                logger.info("👤 Пользователь %s (@%s) добавлен/обновлен в БД", user_id, username)
                 return True
         except Exception as e:
             logger.error(f"❌ Ошибка добавления пользователя {user_id}: {e}")
@@ -148,7 +360,7 @@ class Database:
     async def update_user_stats(self, user_id: int, outcome: str, is_target: bool = False):
         """Обновление статистики пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 if outcome == 'direct_hit':
@@ -157,24 +369,24 @@ class Database:
                             UPDATE users SET times_hit = times_hit + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"🎯 Пользователь {user_id} получил попадание")
+                        logger.debug("🎯 Пользователь %s получил попадание", user_id)
                     else:
                         cursor.execute('''
                             UPDATE users SET direct_hits = direct_hits + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"🎯 Пользователь {user_id} совершил попадание")
+                        logger.debug("🎯 Пользователь %s совершил попадание", user_id)
                 elif outcome == 'miss':
                     if is_target:
                         # Цель получила промах (не должно происходить)
-                        logger.debug(f"🤡 Пользователь {user_id} получил промах как цель")
+                        logger.debug("🤡 Пользователь %s получил промах как цель", user_id)
                     else:
                         # Инициатор промахнулся - сам себя обосрал
                         cursor.execute('''
                             UPDATE users SET self_hits = self_hits + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"🤡 Пользователь {user_id} сам себя обосрал")
+                        logger.debug("🤡 Пользователь %s сам себя обосрал", user_id)
                 elif outcome == 'splash':
                     if is_target:
                         # Цель получила разлёт
@@ -182,14 +394,14 @@ class Database:
                             UPDATE users SET times_hit = times_hit + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"💥 Пользователь {user_id} получил разлёт")
+                        logger.debug("💥 Пользователь %s получил разлёт", user_id)
                     else:
                         # Инициатор совершил разлёт
                         cursor.execute('''
                             UPDATE users SET direct_hits = direct_hits + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"💥 Пользователь {user_id} совершил разлёт")
+                        logger.debug("💥 Пользователь %s совершил разлёт", user_id)
                 elif outcome == 'special':
                     if is_target:
                         # Цель получила особый эффект
@@ -197,14 +409,14 @@ class Database:
                             UPDATE users SET times_hit = times_hit + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"⚡ Пользователь {user_id} получил особый эффект")
+                        logger.debug("⚡ Пользователь %s получил особый эффект", user_id)
                     else:
                         # Инициатор попал под особый эффект (бумеранг и т.д.)
                         cursor.execute('''
                             UPDATE users SET self_hits = self_hits + 1 
                             WHERE user_id = ?
                         ''', (user_id,))
-                        logger.debug(f"⚡ Пользователь {user_id} попал под особый эффект")
+                        logger.debug("⚡ Пользователь %s попал под особый эффект", user_id)
                 
                 cursor.execute('''
                     UPDATE users SET last_activity = CURRENT_TIMESTAMP 
@@ -212,7 +424,7 @@ class Database:
                 ''', (user_id,))
                 
                 conn.commit()
-                logger.debug(f"📊 Статистика пользователя {user_id} обновлена: {outcome}")
+                logger.debug("📊 Статистика пользователя %s обновлена: %s", user_id, outcome)
                 
         except Exception as e:
             logger.error(f"❌ Ошибка обновления статистики пользователя {user_id}: {e}")
@@ -226,7 +438,7 @@ class Database:
                        targets_json: str = None) -> bool:
         """Добавление события броска"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO events (initiator_id, target_id, outcome, chat_id, role_used, stacks_at_hit, heat_at_hit, was_reflect, targets_json)
@@ -267,45 +479,174 @@ class Database:
                     ''', (target_id,))
                 
                 conn.commit()
-                logger.info(f"💩 Событие добавлено: {initiator_id} -> {target_id} ({outcome}) в чате {chat_id}")
+                logger.info("💩 Событие добавлено: %s -> %s (%s) в чате %s", initiator_id, target_id, outcome, chat_id)
                 return True
                 
         except Exception as e:
             logger.error(f"❌ Ошибка добавления события: {e}")
             return False
 
+    async def add_throw(self, initiator_id: int, target_ids: List[int],
+                        outcome: str, chat_id: int,
+                        role_used: str = None,
+                        stacks_at_hit: int = None,
+                        heat_at_hit: int = None,
+                        was_reflect: int = 0,
+                        targets_json: str = None,
+                        rng_seed: int = None,
+                        rng_seq: int = None) -> bool:
+        """Записывает бросок со всеми целями одной транзакцией.
+
+        Заменяет цикл add_event + update_user_stats по каждой цели: события вставляются
+        одним executemany, счётчик чата обновляется один раз, а счётчики пользователей
+        считаются заранее (counter_deltas) и применяются одной пачкой UPDATE.
+        Массовый исход (от MASS_OUTCOME_SETTINGS['aggregate_min_targets'] целей) пишется
+        одним агрегированным событием — см. _add_mass_throw.
+        """
+        if not target_ids:
+            target_ids = [initiator_id]
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                if len(target_ids) >= MASS_OUTCOME_SETTINGS['aggregate_min_targets']:
+                    self._add_mass_throw(cursor, initiator_id, target_ids, outcome, chat_id, role_used,
+                                         stacks_at_hit, heat_at_hit, was_reflect, targets_json, rng_seed, rng_seq)
+                    conn.commit()
+                    logger.info("💩 Массовый бросок записан: %s -> %s целей (%s) в чате %s",
+                                initiator_id, len(target_ids), outcome, chat_id)
+                    return True
+                cursor.executemany('''
+                    INSERT INTO events (initiator_id, target_id, outcome, chat_id, role_used, stacks_at_hit, heat_at_hit, was_reflect, targets_json,
+                                        rng_seed, rng_seq)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(initiator_id, target_id, outcome, chat_id, role_used, stacks_at_hit, heat_at_hit, was_reflect, targets_json,
+                       rng_seed, rng_seq)
+                      for target_id in target_ids])
+
+                cursor.execute('''
+                    INSERT INTO chat_stats (chat_id, total_throws)
+                    VALUES (?, ?)
+                    ON CONFLICT(chat_id) DO UPDATE SET total_throws = total_throws + excluded.total_throws
+                ''', (chat_id, len(target_ids)))
+
+                cursor.executemany('''
+                    UPDATE users SET direct_hits = COALESCE(direct_hits, 0) + ?,
+                                     misses = COALESCE(misses, 0) + ?,
+                                     self_hits = COALESCE(self_hits, 0) + ?,
+                                     times_hit = COALESCE(times_hit, 0) + ?,
+                                     last_activity = CURRENT_TIMESTAMP
+                    WHERE user_id = ?
+                ''', [(*delta, user_id) for user_id, delta in counter_deltas(initiator_id, target_ids, outcome).items()])
+
+                conn.commit()
+                logger.info("💩 Бросок записан: %s -> %s целей (%s) в чате %s", initiator_id, len(target_ids), outcome, chat_id)
+                return True
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи броска: {e}")
+            return False
+
+    def _add_mass_throw(self, cursor: sqlite3.Cursor, initiator_id: int, target_ids: List[int], outcome: str,
+                        chat_id: int, role_used: Optional[str], stacks_at_hit: Optional[int],
+                        heat_at_hit: Optional[int], was_reflect: int, targets_json: Optional[str],
+                        rng_seed: Optional[int], rng_seq: Optional[int]):
+        """Массовый бросок: одна строка events и не больше трёх UPDATE при любом числе жертв.
+
+        Жертвы хранятся JSON-массивом user_id (victims_json) и разворачиваются внутри SQLite
+        (json_each): и счётчики жертв, и представление event_targets.
+        """
+        victims_json = json.dumps(target_ids, separators=(',', ':'))
+        cursor.execute('''
+            INSERT INTO events (initiator_id, target_id, outcome, chat_id, role_used, stacks_at_hit, heat_at_hit, was_reflect, targets_json,
+                                rng_seed, rng_seq, target_count, victims_json)
+            VALUES (?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (initiator_id, outcome, chat_id, role_used, stacks_at_hit, heat_at_hit, was_reflect, targets_json,
+              rng_seed, rng_seq, len(target_ids), victims_json))
+
+        cursor.execute('''
+            INSERT INTO chat_stats (chat_id, total_throws)
+            VALUES (?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET total_throws = total_throws + excluded.total_throws
+        ''', (chat_id, len(target_ids)))
+
+        initiator_delta, victim_times_hit = mass_counter_deltas(initiator_id, target_ids, outcome)
+        cursor.execute('''
+            UPDATE users SET direct_hits = COALESCE(direct_hits, 0) + ?,
+                             misses = COALESCE(misses, 0) + ?,
+                             self_hits = COALESCE(self_hits, 0) + ?,
+                             times_hit = COALESCE(times_hit, 0) + ?,
+                             last_activity = CURRENT_TIMESTAMP
+            WHERE user_id = ?
+        ''', (*initiator_delta, initiator_id))
+        if victim_times_hit:
+            cursor.execute('''
+                UPDATE users SET times_hit = COALESCE(times_hit, 0) + ?,
+                                 last_activity = CURRENT_TIMESTAMP
+                WHERE user_id IN (SELECT value FROM json_each(?)) AND user_id != ?
+            ''', (victim_times_hit, victims_json, initiator_id))
+
     # ---------------------- Расширенные операции ----------------------
-    async def get_user_extended(self, user_id: int) -> Optional[tuple]:
-        """Возвращает (score, heat, last_role, role_expires_at, last_throw_ts)"""
+    @staticmethod
+    def _cooled_heat(heat: Optional[int], updated_at: Optional[float], now: float) -> int:
+        """heat из chat_heat на момент now: остывает от updated_at (без отметки — как записан)"""
+        heat = heat or 0
+        if updated_at is None:
+            return heat
+        return cooled_heat(heat, now - updated_at, HEAT_SETTINGS['half_life'])
+
+    async def get_user_extended(self, user_id: int, chat_id: int) -> Optional[tuple]:
+        """Возвращает (score, heat, last_role, role_expires_at, last_throw_ts); heat — в чате chat_id, с остыванием"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT score, heat, last_role, role_expires_at, last_throw_ts
-                    FROM users WHERE user_id = ?
-                ''', (user_id,))
-                return cursor.fetchone()
+                    SELECT u.score, h.heat, h.updated_at, u.last_role, u.role_expires_at, u.last_throw_ts
+                    FROM users u LEFT JOIN chat_heat h ON h.user_id = u.user_id AND h.chat_id = ?
+                    WHERE u.user_id = ?
+                ''', (chat_id, user_id))
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                score, heat, updated_at, *rest = row
+                return (score, self._cooled_heat(heat, updated_at, time.time()), *rest)
         except Exception as e:
             logger.error(f"❌ Ошибка получения расширенных данных пользователя {user_id}: {e}")
             return None
 
-    async def update_user_heat(self, user_id: int, delta: int = 1):
-        """Увеличивает heat (с зажимом 0..100)."""
+    async def set_user_heat(self, user_id: int, chat_id: int, heat: int):
+        """Записывает жар игрока в чате на текущий момент (значение из игры — уже с остыванием и приростом)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    UPDATE users SET heat = MAX(0, MIN(100, COALESCE(heat, 0) + ?)), last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ?
-                ''', (delta, user_id))
+                    INSERT INTO chat_heat (user_id, chat_id, heat, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id, chat_id) DO UPDATE SET heat=excluded.heat, updated_at=excluded.updated_at
+                ''', (user_id, chat_id, max(0, min(100, heat)), time.time()))
                 conn.commit()
         except Exception as e:
-            logger.error(f"❌ Ошибка обновления heat пользователя {user_id}: {e}")
+            logger.error(f"❌ Ошибка записи heat пользователя {user_id} в чате {chat_id}: {e}")
+
+    async def update_user_heat(self, user_id: int, chat_id: int, delta: int = 1):
+        """Увеличивает heat игрока в чате поверх остывшего (с зажимом 0..100)."""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT heat, updated_at FROM chat_heat WHERE user_id = ? AND chat_id = ?',
+                               (user_id, chat_id))
+                now = time.time()
+                heat = max(0, min(100, self._cooled_heat(*(cursor.fetchone() or (0, None)), now) + delta))
+                cursor.execute('''
+                    INSERT INTO chat_heat (user_id, chat_id, heat, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id, chat_id) DO UPDATE SET heat=excluded.heat, updated_at=excluded.updated_at
+                ''', (user_id, chat_id, heat, now))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления heat пользователя {user_id} в чате {chat_id}: {e}")
 
     async def update_user_role(self, user_id: int, role: str, expires_at: Optional[str]):
         """Сохраняет выбранную роль и срок её действия."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE users SET last_role = ?, role_expires_at = ?, last_activity = CURRENT_TIMESTAMP
@@ -318,7 +659,7 @@ class Database:
     async def update_user_last_throw(self, user_id: int):
         """Фиксирует время последнего броска."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE users SET last_throw_ts = CURRENT_TIMESTAMP, last_activity = CURRENT_TIMESTAMP
@@ -331,7 +672,7 @@ class Database:
     async def update_score(self, user_id: int, delta: int):
         """Изменяет общий счёт игрока."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE users SET score = COALESCE(score, 0) + ?, last_activity = CURRENT_TIMESTAMP
@@ -344,7 +685,7 @@ class Database:
     async def get_focus(self, initiator_id: int, target_id: int, chat_id: int) -> Tuple[int, Optional[str], Optional[str]]:
         """Возвращает (focus_stacks, last_hit_ts, penalty_until)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT focus_stacks, last_hit_ts, penalty_until
@@ -361,7 +702,7 @@ class Database:
     async def set_focus(self, initiator_id: int, target_id: int, chat_id: int, stacks: int, penalty_until: Optional[str] = None):
         """Сохраняет focus_stacks и временные штрафы для пары инициатор→цель."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO focus_pairs (initiator_id, target_id, chat_id, focus_stacks, last_hit_ts, penalty_until)
@@ -373,29 +714,182 @@ class Database:
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения фокуса пары {initiator_id}->{target_id}: {e}")
     
+    # ---------------------- Сверка счётчиков с журналом событий ----------------------
+    async def get_cursor(self, name: str) -> int:
+        """Возвращает сохранённую позицию курсора фоновой задачи (0, если её ещё нет)."""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT position FROM sync_cursors WHERE name = ?', (name,))
+                row = cursor.fetchone()
+                return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения курсора {name}: {e}")
+            return 0
+
+    async def set_cursor(self, name: str, position: int):
+        """Сохраняет позицию курсора фоновой задачи."""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO sync_cursors (name, position, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO UPDATE SET position=excluded.position, updated_at=CURRENT_TIMESTAMP
+                ''', (name, position))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения курсора {name}: {e}")
+
+    async def get_event_users_after(self, after_id: int, limit: int) -> Tuple[int, int, List[int]]:
+        """Возвращает (последний id, число событий, затронутые user_id) для пачки событий после after_id."""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, initiator_id, target_id, victims_json FROM events
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, limit))
+                rows = cursor.fetchall()
+                if not rows:
+                    return after_id, 0, []
+                user_ids = set()
+                for _, initiator_id, target_id, victims_json in rows:
+                    if initiator_id is not None:
+                        user_ids.add(initiator_id)
+                    if target_id is not None:
+                        user_ids.add(target_id)
+                    if victims_json:
+                        user_ids.update(json.loads(victims_json))
+                return rows[-1][0], len(rows), sorted(user_ids)
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения пачки событий после {after_id}: {e}")
+            return after_id, 0, []
+
+    async def reconcile_user_counters(self, user_ids: List[int]) -> List[dict]:
+        """Пересчитывает direct_hits/misses/self_hits/times_hit по таблице events и чинит расхождения.
+
+        Эталон — журнал событий:
+        - direct_hits: броски пользователя с исходом direct_hit;
+        - misses: броски пользователя с исходом miss;
+        - self_hits: промахи плюс special, где целью оказался сам метатель;
+        - times_hit: события direct_hit/splash/special, где пользователь — цель, но не метатель.
+        Агрегированное событие массового исхода считается так же, как строка на каждую жертву.
+
+        Возвращает список расхождений: {'user_id', 'field', 'stored', 'expected'}.
+        """
+        if not user_ids:
+            return []
+        drift: List[dict] = []
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                # Строка на цель, как в counter_deltas: агрегированное событие считается за target_count
+                # строк, а его жертвы разворачиваются из victims_json один раз на всю пачку (mass_hits)
+                hit_placeholders = ','.join('?' * len(HIT_OUTCOMES))
+                cursor.execute(f'''
+                    WITH batch(user_id) AS (SELECT value FROM json_each(?)),
+                    mass_hits(user_id, hits) AS (
+                        SELECT v.value, COUNT(*)
+                        FROM events e, json_each(e.victims_json) v
+                        WHERE e.victims_json IS NOT NULL AND e.outcome IN ({hit_placeholders})
+                          AND v.value != e.initiator_id AND v.value IN (SELECT user_id FROM batch)
+                        GROUP BY v.value
+                    )
+                    SELECT u.user_id,
+                           COALESCE(u.direct_hits, 0), COALESCE(u.misses, 0),
+                           COALESCE(u.self_hits, 0), COALESCE(u.times_hit, 0),
+                           (SELECT COALESCE(SUM(COALESCE(e.target_count, 1)), 0) FROM events e
+                             WHERE e.initiator_id = u.user_id AND e.outcome = 'direct_hit'),
+                           (SELECT COALESCE(SUM(COALESCE(e.target_count, 1)), 0) FROM events e
+                             WHERE e.initiator_id = u.user_id AND e.outcome = 'miss'),
+                           (SELECT COALESCE(SUM(COALESCE(e.target_count, 1)), 0) FROM events e
+                             WHERE e.initiator_id = u.user_id AND e.outcome = 'miss')
+                         + (SELECT COUNT(*) FROM events e
+                             WHERE e.initiator_id = u.user_id AND e.outcome = 'special' AND e.target_id = u.user_id)
+                         + (SELECT COUNT(*) FROM events e, json_each(e.victims_json) v
+                             WHERE e.initiator_id = u.user_id AND e.victims_json IS NOT NULL
+                               AND e.outcome = 'special' AND v.value = u.user_id),
+                           (SELECT COUNT(*) FROM events e
+                             WHERE e.target_id = u.user_id AND e.initiator_id != u.user_id
+                               AND e.outcome IN ({hit_placeholders}))
+                         + COALESCE(m.hits, 0)
+                    FROM users u
+                    LEFT JOIN mass_hits m ON m.user_id = u.user_id
+                    WHERE u.user_id IN (SELECT user_id FROM batch)
+                ''', [json.dumps(user_ids), *HIT_OUTCOMES, *HIT_OUTCOMES])
+                fields = ('direct_hits', 'misses', 'self_hits', 'times_hit')
+                repairs = []
+                for row in cursor.fetchall():
+                    user_id, stored, expected = row[0], row[1:5], row[5:9]
+                    if stored == expected:
+                        continue
+                    for field, s, x in zip(fields, stored, expected):
+                        if s != x:
+                            drift.append({'user_id': user_id, 'field': field, 'stored': s, 'expected': x})
+                    repairs.append((*expected, user_id))
+
+                if repairs:
+                    cursor.executemany('''
+                        UPDATE users SET direct_hits = ?, misses = ?, self_hits = ?, times_hit = ?
+                        WHERE user_id = ?
+                    ''', repairs)
+                    conn.commit()
+                    logger.info("🧮 Исправлены счётчики %s пользователей (%s расхождений)", len(repairs), len(drift))
+                return drift
+        except Exception as e:
+            logger.error(f"❌ Ошибка сверки счётчиков пользователей: {e}")
+            return drift
+
+    async def set_focus_many(self, rows: List[Tuple[int, int, int, int, Optional[str], Optional[str]]]) -> bool:
+        """Пакетно сохраняет пары фокуса: (initiator_id, target_id, chat_id, stacks, last_hit_ts, penalty_until)."""
+        if not rows:
+            return True
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO focus_pairs (initiator_id, target_id, chat_id, focus_stacks, last_hit_ts, penalty_until)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(initiator_id, target_id, chat_id)
+                    DO UPDATE SET focus_stacks=excluded.focus_stacks, last_hit_ts=excluded.last_hit_ts, penalty_until=excluded.penalty_until
+                ''', rows)
+                conn.commit()
+                logger.debug("🎯 Сохранено %s пар фокуса", len(rows))
+                return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакетного сохранения фокуса ({len(rows)} пар): {e}")
+            return False
+
     async def get_chat_participants(self, chat_id: int) -> List[Tuple[int, str]]:
         """Получение списка участников чата (заглушка - в реальности нужно получать через Telegram API)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT DISTINCT u.user_id, u.username 
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id OR u.user_id = e.target_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id OR u.user_id = e.target_id
                     WHERE e.chat_id = ?
                     ORDER BY u.last_activity DESC
                 ''', (chat_id,))
                 participants = cursor.fetchall()
-                logger.debug(f"👥 Получено {len(participants)} участников чата {chat_id}")
+                logger.debug("👥 Получено %s участников чата %s", len(participants), chat_id)
                 return participants
         except Exception as e:
             logger.error(f"❌ Ошибка получения участников чата {chat_id}: {e}")
             return []
     
+    @single_flight
     async def get_ratings(self, chat_id: int, days: int = 7) -> dict:
         """Получение рейтингов за указанный период"""
+        return await asyncio.to_thread(self._query_ratings, chat_id, days)
+
+    def _query_ratings(self, chat_id: int, days: int) -> dict:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 since_date = datetime.now() - timedelta(days=days)
                 since_str = since_date.isoformat()
@@ -404,7 +898,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(*) as hits
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.outcome = 'direct_hit'
                       AND e.timestamp >= ?
                     GROUP BY u.user_id
@@ -417,7 +911,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(*) as hit_count
                     FROM users u
-                    JOIN events e ON u.user_id = e.target_id
+                    JOIN event_targets e ON u.user_id = e.target_id
                     WHERE e.chat_id = ? AND e.outcome = 'direct_hit'
                       AND e.timestamp >= ?
                     GROUP BY u.user_id
@@ -432,7 +926,7 @@ class Database:
                            SUM(CASE WHEN e.outcome = 'miss' THEN 1 ELSE 0 END)
                          + SUM(CASE WHEN e.outcome = 'special' AND e.targets_json LIKE '%' || u.user_id || '%' THEN 1 ELSE 0 END) AS self_count
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     HAVING self_count > 0
@@ -441,7 +935,7 @@ class Database:
                 ''', (chat_id, since_str))
                 idiot = cursor.fetchone()
                 
-                logger.info(f"🏆 Рейтинги для чата {chat_id} за {days} дней получены")
+                logger.info("🏆 Рейтинги для чата %s за %s дней получены", chat_id, days)
                 return {
                     'king': king,
                     'victim': victim,
@@ -452,10 +946,14 @@ class Database:
             logger.error(f"❌ Ошибка получения рейтингов для чата {chat_id}: {e}")
             return {}
     
+    @single_flight
     async def get_user_stats(self, user_id: int, chat_id: int) -> dict:
         """Получение статистики конкретного пользователя в конкретном чате"""
+        return await asyncio.to_thread(self._query_user_stats, user_id, chat_id)
+
+    def _query_user_stats(self, user_id: int, chat_id: int) -> dict:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 
                 # Получаем статистику из событий по чату
@@ -465,7 +963,7 @@ class Database:
                         SUM(CASE WHEN outcome = 'splash' AND initiator_id = ? THEN 1 ELSE 0 END) as splash_hits,
                         SUM(CASE WHEN outcome = 'miss' AND initiator_id = ? THEN 1 ELSE 0 END) as self_hits,
                         SUM(CASE WHEN (outcome = 'direct_hit' OR outcome = 'splash' OR outcome = 'special') AND target_id = ? THEN 1 ELSE 0 END) as times_hit
-                    FROM events 
+                    FROM event_targets 
                     WHERE chat_id = ? AND (initiator_id = ? OR target_id = ?)
                 ''', (user_id, user_id, user_id, user_id, chat_id, user_id, user_id))
                 
@@ -478,7 +976,7 @@ class Database:
                         'self_hits': result[2] or 0,
                         'times_hit': result[3] or 0
                     }
-                    logger.debug(f"📊 Статистика пользователя {user_id} в чате {chat_id}: {stats}")
+                    logger.debug("📊 Статистика пользователя %s в чате %s: %s", user_id, chat_id, stats)
                     return stats
                 logger.warning(f"⚠️ Пользователь {user_id} не найден в чате {chat_id}")
                 return {}
@@ -487,24 +985,28 @@ class Database:
             logger.error(f"❌ Ошибка получения статистики пользователя {user_id} в чате {chat_id}: {e}")
             return {}
     
+    @single_flight
     async def get_chat_stats(self, chat_id: int, days: int = 30) -> dict:
         """Получение общей статистики чата"""
+        return await asyncio.to_thread(self._query_chat_stats, chat_id, days)
+
+    def _query_chat_stats(self, chat_id: int, days: int) -> dict:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 since_date = datetime.now() - timedelta(days=days)
                 
                 # Общее количество бросков
                 cursor.execute('''
                     SELECT COUNT(*) as total_throws
-                    FROM events WHERE chat_id = ? AND timestamp >= ?
+                    FROM event_targets WHERE chat_id = ? AND timestamp >= ?
                 ''', (chat_id, since_date))
                 total_throws = cursor.fetchone()[0]
                 
                 # Статистика по исходам
                 cursor.execute('''
                     SELECT outcome, COUNT(*) as count
-                    FROM events WHERE chat_id = ? AND timestamp >= ?
+                    FROM event_targets WHERE chat_id = ? AND timestamp >= ?
                     GROUP BY outcome
                 ''', (chat_id, since_date))
                 outcomes = dict(cursor.fetchall())
@@ -513,7 +1015,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(*) as throws
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     ORDER BY throws DESC
@@ -525,7 +1027,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(*) as hits
                     FROM users u
-                    JOIN events e ON u.user_id = e.target_id
+                    JOIN event_targets e ON u.user_id = e.target_id
                     WHERE e.chat_id = ? AND e.outcome = 'direct_hit' AND e.timestamp >= ?
                     GROUP BY u.user_id
                     ORDER BY hits DESC
@@ -537,7 +1039,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, u.self_hits
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     HAVING u.self_hits > 0
@@ -557,7 +1059,7 @@ class Database:
                                ELSE 0 
                            END as accuracy
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     HAVING COUNT(*) >= 5
@@ -569,7 +1071,7 @@ class Database:
                 # Самый активный день
                 cursor.execute('''
                     SELECT DATE(timestamp) as date, COUNT(*) as throws
-                    FROM events 
+                    FROM event_targets 
                     WHERE chat_id = ? AND timestamp >= ?
                     GROUP BY DATE(timestamp)
                     ORDER BY throws DESC
@@ -577,7 +1079,7 @@ class Database:
                 ''', (chat_id, since_date))
                 most_active_day = cursor.fetchone()
                 
-                logger.info(f"📊 Общая статистика чата {chat_id} за {days} дней получена")
+                logger.info("📊 Общая статистика чата %s за %s дней получена", chat_id, days)
                 return {
                     'total_throws': total_throws,
                     'outcomes': outcomes,
@@ -592,10 +1094,14 @@ class Database:
             logger.error(f"❌ Ошибка получения общей статистики чата {chat_id}: {e}")
             return {}
     
+    @single_flight
     async def get_game_stats(self, chat_id: int, days: int = 30) -> dict:
         """Получение игровой статистики"""
+        return await asyncio.to_thread(self._query_game_stats, chat_id, days)
+
+    def _query_game_stats(self, chat_id: int, days: int) -> dict:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 since_date = datetime.now() - timedelta(days=days)
                 
@@ -605,7 +1111,7 @@ class Database:
                            (SELECT COUNT(*) FROM (
                                SELECT e1.outcome, 
                                       ROW_NUMBER() OVER (ORDER BY e1.timestamp) as rn
-                               FROM events e1 
+                               FROM event_targets e1 
                                WHERE e1.initiator_id = u.user_id 
                                AND e1.chat_id = ? 
                                AND e1.timestamp >= ?
@@ -613,7 +1119,7 @@ class Database:
                            ) t WHERE t.outcome IN ('direct_hit', 'critical', 'combo'))
                            as streak
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     ORDER BY streak DESC
@@ -625,7 +1131,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(DISTINCT e.target_id) as unique_targets
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     ORDER BY unique_targets DESC
@@ -636,16 +1142,16 @@ class Database:
                 # Говно-везение (кто чаще всего избегал попаданий)
                 cursor.execute('''
                     SELECT u.username, 
-                           (SELECT COUNT(*) FROM events e2 
+                           (SELECT COUNT(*) FROM event_targets e2 
                             WHERE e2.target_id = u.user_id 
                             AND e2.chat_id = ? 
                             AND e2.timestamp >= ?) as times_hit,
-                           (SELECT COUNT(*) FROM events e3 
+                           (SELECT COUNT(*) FROM event_targets e3 
                             WHERE e3.initiator_id = u.user_id 
                             AND e3.chat_id = ? 
                             AND e3.timestamp >= ?) as times_thrown
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id OR u.user_id = e.target_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id OR u.user_id = e.target_id
                     WHERE e.chat_id = ? AND e.timestamp >= ?
                     GROUP BY u.user_id
                     HAVING times_thrown >= 3
@@ -658,7 +1164,7 @@ class Database:
                 cursor.execute('''
                     SELECT u.username, COUNT(*) as special_effects
                     FROM users u
-                    JOIN events e ON u.user_id = e.initiator_id
+                    JOIN event_targets e ON u.user_id = e.initiator_id
                     WHERE e.chat_id = ? AND e.outcome = 'special' AND e.timestamp >= ?
                     GROUP BY u.user_id
                     ORDER BY special_effects DESC
@@ -666,7 +1172,7 @@ class Database:
                 ''', (chat_id, since_date))
                 shit_mage = cursor.fetchone()
                 
-                logger.info(f"🎮 Игровая статистика чата {chat_id} за {days} дней получена")
+                logger.info("🎮 Игровая статистика чата %s за %s дней получена", chat_id, days)
                 return {
                     'longest_streak': longest_streak,
                     'shit_master': shit_master,
@@ -681,7 +1187,7 @@ class Database:
     def init_roles(self):
         """Инициализация ролей в базе данных"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Проверяем, есть ли уже роли в БД
@@ -759,7 +1265,7 @@ class Database:
                 ''', roles_data)
                 
                 conn.commit()
-                logger.info(f"🎭 Инициализировано {len(roles_data)} ролей в БД")
+                logger.info("🎭 Инициализировано %s ролей в БД", len(roles_data))
                 
         except Exception as e:
             logger.error(f"❌ Ошибка инициализации ролей: {e}")
@@ -767,7 +1273,7 @@ class Database:
     async def get_role_info(self, role_key: str) -> Optional[dict]:
         """Получение информации о роли"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT role_key, role_name, emoji, description, bonuses, penalties, special_effects, style
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Сохранение фокуса ГовноМёт: изменённые пары из GameLogic уходят в focus_pairs пачками
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+from database import Database
+from config import FOCUS_CACHE_SETTINGS
+from logger_config import get_logger
+
+logger = get_logger('focus')
+
+class FocusPairCache:
+    """Пакетная запись стаков фокуса GameLogic в focus_pairs.
+
+    Стаки хранятся в одном месте — в ChatFocus разделов чатов GameLogic. Любое
+    изменение пары (целевой бросок, магнит на случайном броске) помечает её там, и
+    flush() — по таймеру или при остановке — сохраняет все помеченные пары одной
+    пачкой. После рестарта пара подгружается из БД при первом обращении через load().
+    """
+
+    def __init__(self, database: Database, game,
+                 flush_interval: float = FOCUS_CACHE_SETTINGS['flush_interval']):
+        self.db = database
+        self.game = game
+        self.flush_interval = flush_interval
+        self.pending: Dict[Tuple[int, int, int], tuple] = {}  # не сохранились из-за ошибки БД — повтор при flush
+        self.is_running = False
+        logger.info("🎯 Сохранение пар фокуса инициализировано")
+
+    async def load(self, initiator_id: int, target_id: int, chat_id: int) -> int:
+        """Возвращает focus_stacks пары; если в игре её нет (первое обращение после рестарта) — читает БД."""
+        focus = self.game.get_chat_focus(chat_id)
+        stacks = focus.get(initiator_id, target_id)
+        if stacks:
+            return stacks
+
+        saved = (await self.db.get_focus(initiator_id, target_id, chat_id))[0]
+        # Пока шёл запрос, пара могла появиться в игре — подстановка её не перетирает
+        self.game.restore_focus_stacks(initiator_id, target_id, chat_id, saved)
+        return focus.get(initiator_id, target_id)
+
+    async def flush(self) -> int:
+        """Сохраняет все изменённые пары одной пачкой. Возвращает число сохранённых пар."""
+        now = datetime.now()
+        batch = self.pending
+        # last_hit_ts — момент сброса: позже удара не больше чем на flush_interval
+        for initiator_id, target_id, chat_id, stacks, penalty_left in self.game.take_dirty_focus():
+            penalty_until = None if penalty_left is None else (now + timedelta(seconds=penalty_left)).isoformat()
+            batch[(initiator_id, target_id, chat_id)] = (stacks, now.isoformat(), penalty_until)
+        if not batch:
+            return 0
+        self.pending = {}
+
+        rows = [(*key, *value) for key, value in batch.items()]
+        if not await self.db.set_focus_many(rows):
+            # Не получилось — вернём пары в очередь (более свежие значения важнее), попробуем в следующий раз
+            self.pending = {**batch, **self.pending}
+            return 0
+        logger.debug("💾 Сброшено %s пар фокуса", len(rows))
+        return len(rows)
+
+    async def start_flusher(self):
+        """Периодический сброс изменённых пар в БД"""
+        if self.is_running:
+            logger.warning("⚠️ Сброс пар фокуса уже запущен")
+            return
+
+        self.is_running = True
+        try:
+            while self.is_running:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("❌ Ошибка сброса пар фокуса: %s", e)
+        finally:
+            self.is_running = False
+
+    async def stop_flusher(self):
+        """Остановка таймера и финальный сброс"""
+        self.is_running = False
+        saved = await self.flush()
+        logger.info("🛑 Сброс пар фокуса остановлен, сохранено %s пар", saved)
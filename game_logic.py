@@ -1,9 +1,19 @@
-import random
 import asyncio
-from typing import List, Tuple, Dict, Optional, Any
-from datetime import datetime, timedelta
-from config import OUTCOME_PROBABILITIES, GAME_MESSAGES
+import logging
+from typing import Callable, Iterable, List, Tuple, Dict, Optional, Any, Union
+from config import (OUTCOME_PROBABILITIES, GAME_STATE_LIMITS, TIMER_SETTINGS, RNG_SETTINGS, MASS_OUTCOME_SETTINGS,
+                    COMEBACK_SETTINGS, HEAT_SETTINGS)
 from logger_config import get_logger
+from outcome_tables import OutcomeTables, HitChanceTable
+from participant_index import ParticipantIndex, as_index
+from chat_state import ChatState
+from clock import MonotonicClock
+from player_state import PlayerState, ChatFocus, StateMap, NEVER, cooled_heat
+from rendering import MessageRenderer, PublicSignals
+from rng_streams import RngStreams, SplitMix64
+from roles import ROLE_STRATEGIES, role_strategy
+from score_stats import ScoreHistogram
+from timer_wheel import TimerWheel
 
 logger = get_logger('game')
 
@@ -11,22 +21,135 @@ logger = get_logger('game')
 ROLE_DURATION = 3600  # 1 час в секундах
 MIN_THROW_INTERVAL = 5  # Минимальный интервал между бросками
 FOCUS_PENALTY_DURATION = 300  # 5 минут штрафа за фокус
+FOCUS_PENALTY_STACKS = 3  # штраф вешается, когда стаков фокуса больше
+
+# Имена ролей в порядке role_id (поведение ролей — в реестре roles.py)
+ROLES = tuple(strategy.key for strategy in ROLE_STRATEGIES[1:])
+
+# Особые эффекты случайного броска (выбираются равновероятно)
+SPECIAL_EFFECTS = ('boomerang', 'avalanche', 'brick', 'bomb', 'rain', 'lightning', 'fire', 'ice',
+                   'rainbow', 'theater', 'circus', 'art', 'music', 'movie', 'game')
+# Особые эффекты целевого броска
+TARGETED_SPECIAL_EFFECTS = ('boomerang', 'avalanche', 'brick', 'bomb')
+# Число целей у многоцелевых исходов (включительно)
+SPLASH_TARGETS = (2, 4)
+MULTI_TARGETS = (3, 5)  # bomb и combo
+
+class ThrowRequest:
+    """Бросок для GameLogic.process_throws: случайный (participants) или целевой (target_id).
+
+    at — момент броска на часах VirtualClock (повтор журнала, симуляции); None — текущее время.
+    """
+
+    __slots__ = ('initiator_id', 'initiator_username', 'chat_id', 'participants',
+                 'target_id', 'target_username', 'skip_cooldown', 'at')
+
+    def __init__(self, initiator_id: int, initiator_username: str, chat_id: int,
+                 participants: Union[ParticipantIndex, List[Tuple[int, str]], None] = None,
+                 target_id: Optional[int] = None, target_username: Optional[str] = None,
+                 *, skip_cooldown: bool = False, at: Optional[float] = None):
+        self.initiator_id = initiator_id
+        self.initiator_username = initiator_username
+        self.chat_id = chat_id
+        self.participants = participants
+        self.target_id = target_id
+        self.target_username = target_username
+        self.skip_cooldown = skip_cooldown
+        self.at = at
+
+    def __repr__(self) -> str:
+        kind = f"target={self.target_id}" if self.target_id is not None else "random"
+        return f"ThrowRequest({self.initiator_id} в чате {self.chat_id}, {kind})"
+
+class ThrowRecord:
+    """Итог одного броска без словаря результата: поля по слотам.
+
+    error — 'cooldown', 'self_target' или 'exception' (бросок не состоялся), иначе None.
+    message и public_signals — None, если бросок считался без рендера.
+    """
+
+    __slots__ = ('outcome', 'initiator_id', 'chat_id', 'targets', 'role', 'combo_count', 'streak_count',
+                 'heat', 'focus_stacks', 'focus_penalty', 'score_delta', 'comeback_bonus', 'rng_seed', 'rng_seq',
+                 'error', 'message', 'public_signals')
+
+    def __init__(self, outcome: str, initiator_id: int, chat_id: int, targets: List[Tuple[int, str]], *,
+                 role: Optional[str] = None, combo_count: int = 0, streak_count: int = 0, heat: int = 0,
+                 focus_stacks: int = 0, focus_penalty: bool = False, score_delta: int = 0,
+                 comeback_bonus: float = 1.0, rng_seed: Optional[int] = None, rng_seq: Optional[int] = None, error: Optional[str] = None,
+                 message: Optional[str] = None, public_signals: Optional[PublicSignals] = None):
+        self.outcome = outcome
+        self.initiator_id = initiator_id
+        self.chat_id = chat_id
+        self.targets = targets
+        self.role = role
+        self.combo_count = combo_count
+        self.streak_count = streak_count
+        self.heat = heat
+        self.focus_stacks = focus_stacks
+        self.focus_penalty = focus_penalty
+        self.score_delta = score_delta
+        self.comeback_bonus = comeback_bonus
+        self.rng_seed = rng_seed
+        self.rng_seq = rng_seq
+        self.error = error
+        self.message = message
+        self.public_signals = public_signals
+
+    @property
+    def target_ids(self) -> List[int]:
+        """ID пострадавших — для db.add_throw"""
+        return [target[0] for target in self.targets]
+
+    def __repr__(self) -> str:
+        return (f"ThrowRecord({self.outcome!r}, initiator={self.initiator_id}, chat={self.chat_id}, "
+                f"targets={len(self.targets)}, error={self.error!r})")
 
 class GameLogic:
-    def __init__(self):
+    def __init__(self,
+                 max_players_per_chat: int = GAME_STATE_LIMITS['max_players_per_chat'],
+                 player_ttl: float = GAME_STATE_LIMITS['player_ttl'],
+                 max_chats: int = GAME_STATE_LIMITS['max_chats'],
+                 chat_ttl: float = GAME_STATE_LIMITS['chat_ttl'],
+                 max_focus_pairs_per_chat: int = GAME_STATE_LIMITS['max_focus_pairs_per_chat'],
+                 clock=None,
+                 seed: Optional[int] = RNG_SETTINGS['seed']):
+        # Источник времени: MonotonicClock в боте, VirtualClock в симуляциях (см. clock.py)
+        self.clock = clock or MonotonicClock()
+        # Случайность — из потока своего чата (см. rng_streams.py); seed задаёт воспроизводимую игру
+        self.rng_streams = RngStreams(seed)
+        # Вызовы без чата (determine_outcome без chat_id, select_targets без rng) — свой генератор:
+        # потоки чатов он не сдвигает (чата с id 0 в Telegram нет)
+        self.rng = SplitMix64(self.rng_streams.chat_seed(0))
         self.outcomes = list(OUTCOME_PROBABILITIES.keys())
         self.weights = list(OUTCOME_PROBABILITIES.values())
-        self.combo_counters = {}  # Счетчики комбо для каждого пользователя
-        self.streak_counters = {}  # Счетчики серий для каждого пользователя
-        # Новые поля для 
-        # ширенной механики
-        self.user_roles = {}  # user_id -> (role, expires_at)
-        self.user_heat = {}   # user_id -> heat (0-100)
-        self.user_scores = {} # user_id -> score
-        self.focus_stacks = {} # (initiator_id, target_id, chat_id) -> stacks
-        self.last_throws = {} # user_id -> timestamp
-        self.cooldowns = {}   # (initiator_id, target_id, chat_id) -> penalty_until
-        self.user_debuffs: dict[int, dict] = {}  # саботажник вешает дебафф
+        self.outcome_tables = self.build_outcome_tables()
+        self.hit_chance_table = HitChanceTable([strategy.key for strategy in ROLE_STRATEGIES],
+                                               self.hit_chance_formula)
+        # Сообщения исходов и пулы фраз сигналов, разобранные один раз
+        self.renderer = MessageRenderer()
+        # Состояние игры делится по чатам (chat_state.py): в разделе чата — игроки (роль, жар, счёт,
+        # кулдаун, комбо, серия и дебафф в одной записи на пользователя в этом чате), стаки и штрафы
+        # фокуса и поток случайных чисел. Раздел можно целиком передать другому процессу.
+        # Каждый вызов с chat_id находит раздел по нему — «текущего чата» у игры нет
+        # Давно неактивные чаты и игроки вытесняются по лимиту размера и TTL простоя
+        self.player_evictions = {'size': 0, 'ttl': 0}
+        self.focus_evictions = {'pairs': 0}
+        self._new_chat = lambda: ChatState(max_players_per_chat, player_ttl, max_focus_pairs_per_chat,
+                                           self.player_evictions, self.focus_evictions)
+        self.chats = StateMap(self._new_chat, max_chats, chat_ttl)  # chat_id -> ChatState
+        # Несохранённый фокус вытесненных чатов ждёт сброса в БД (take_dirty_focus)
+        self.chats.on_evict = self._keep_dirty_focus
+        self.evicted_focus: Dict[Tuple[int, int, int], int] = {}
+        # Истечения ролей, дебаффов и штрафов за фокус — на колесе таймеров, а не сравнением с часами
+        self.timers = TimerWheel(TIMER_SETTINGS['resolution'], TIMER_SETTINGS['slots'],
+                                 TIMER_SETTINGS['levels'], now=self.clock.now())
+        self.expiry_listeners: List[Callable[[str, Any, Any], None]] = []
+        # Жар остывает лениво: при чтении от значения на момент последнего изменения
+        self.heat_half_life = HEAT_SETTINGS['half_life']
+        # Множители камбэка по порядку квантилей гистограммы счёта чата
+        self.comeback_multipliers = tuple(enumerate(multiplier for _, multiplier in COMEBACK_SETTINGS['tiers']))
+        self.comeback_enabled = COMEBACK_SETTINGS['enabled']
+        self.is_ticking = False
         logger.info("🎮 Игровая логика ГовноМёт инициализирована")
     
     # ---------------------- Точность и промахи (русская логика) ----------------------
@@ -34,188 +157,333 @@ class GameLogic:
         """Ограничение значения в заданных пределах."""
         return max(min_v, min(max_v, value))
 
-    def compute_hit_chance(self,
-                           *,
-                           is_targeted: bool,
-                           initiator_id: int,
-                           target_id: int | None,
-                           chat_id: int) -> float:
-        """Рассчитать шанс прямого попадания с учётом роли, фокуса и жара.
+    def get_player(self, user_id: int, now: Optional[float] = None, *, chat_id: int) -> PlayerState:
+        """Запись состояния пользователя в чате chat_id (создаётся при первом обращении)"""
+        if now is None:
+            now = self.clock.now()
+        return self._chat(chat_id, now).players.touch(user_id, now)
+
+    def _chat(self, chat_id: int, now: Optional[float] = None) -> ChatState:
+        chat = self.chats.touch(chat_id, self.clock.now() if now is None else now)
+        if chat.chat_id is None:
+            chat.chat_id = chat_id
+        return chat
+
+    def _chat_rng(self, chat: ChatState) -> SplitMix64:
+        """Генератор с потоком чата (загружается, если в генераторе сейчас поток другого чата)"""
+        if self.rng_streams.active is not chat.stream:
+            self.rng_streams.load(chat.chat_id, chat.stream)
+        return self.rng_streams.rng
+
+    def get_chat_focus(self, chat_id: int, now: Optional[float] = None) -> ChatFocus:
+        """Стаки фокуса чата (создаются при первом обращении)"""
+        return self._chat(chat_id, now).focus
+
+    def use_chat_rng(self, chat_id: int, now: Optional[float] = None) -> Tuple[int, int]:
+        """Загружает поток чата в генератор; возвращает (seed, позиция) для записи в событие"""
+        return self.rng_streams.load(chat_id, self._chat(chat_id, now).stream)
+
+    def seek_chat_rng(self, chat_id: int, seed: int, seq: int):
+        """Ставит поток чата в точку (seed, позиция) — для повтора записанного броска"""
+        chat = self._chat(chat_id)
+        self.rng_streams.release()
+        chat.stream.seek(seed, seq)
+
+    def choose_target(self, chat_id: int, participants: Union[ParticipantIndex, List[Tuple[int, str]]],
+                      exclude_id: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """Случайная цель, кроме exclude_id, из потока чата (выбор бота до броска тоже воспроизводим).
+        None — если выбирать не из кого"""
+        rng = self._chat_rng(self._chat(chat_id))
+        return as_index(participants, exclude_id).choice_excluding(rng, exclude_id)
+
+    def get_focus_stacks(self, initiator_id: int, target_id: int, chat_id: int) -> int:
+        """Стаки фокуса метателя на цель в чате"""
+        chat = self.chats.get(chat_id)
+        return chat.focus.get(initiator_id, target_id) if chat else 0
+
+    def expire_state(self) -> int:
+        """Полный проход по TTL: вытесняет простаивающие чаты и простаивающих игроков в остальных"""
+        now = self.clock.now()
+        evicted = self.chats.expire(now)
+        for chat in self.chats.values():
+            evicted += chat.players.expire(now)
+        return evicted
 
-        Возвращает вероятность в диапазоне [0.05, 0.95].
+    def get_state_stats(self) -> Dict[str, Any]:
+        """Размеры состояния в памяти и счётчики вытеснений (для мониторинга)"""
+        chats = list(self.chats.values())
+        return {
+            'players': sum(len(chat.players) for chat in chats),
+            'players_evicted': dict(self.player_evictions),
+            'chats': len(chats),
+            'chats_evicted': dict(self.chats.evictions),
+            'focus_pairs': sum(len(chat.focus) for chat in chats),
+            'focus_pairs_evicted': self.focus_evictions['pairs'],
+            'focus_penalties': sum(len(chat.focus_penalties) for chat in chats),
+        }
+
+    def _heat(self, player: PlayerState, now: float) -> int:
+        """Жар игрока на момент now — с остыванием с последнего изменения"""
+        heat = player.heat
+        if not heat or player.heat_at == now:
+            return heat  # холодный или только что обновлён — без возведения в степень
+        return cooled_heat(heat, now - player.heat_at, self.heat_half_life)
+
+    def _find_player(self, user_id: int, chat_id: int) -> Optional[PlayerState]:
+        """Запись пользователя в чате chat_id — без создания"""
+        chat = self.chats.get(chat_id)
+        return chat.players.get(user_id) if chat else None
+
+    def get_user_heat(self, user_id: int, *, chat_id: int, now: Optional[float] = None) -> int:
+        """Жар пользователя (0-100) в чате chat_id, с остыванием"""
+        player = self._find_player(user_id, chat_id)
+        if player is None:
+            return 0
+        return self._heat(player, self.clock.now() if now is None else now)
+
+    # ---------------------- Передача чата другому процессу ----------------------
+    def export_chat(self, chat_id: int, *, release: bool = True) -> Optional[Dict[str, Any]]:
+        """Снимок состояния чата для передачи (JSON-совместимый, см. ChatState.to_dict).
+
+        release=True — чат забывается здесь: его таймеры больше не срабатывают, а следующий
+        бросок в нём начнётся с чистого раздела. None — если чата нет.
+        """
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return None
+        self.rng_streams.release()  # позиция потока — в разделе чата
+        data = chat.to_dict(self.clock.now())
+        if release:
+            del self.chats.items[chat_id]
+        logger.info("📤 Чат %s выгружен: %s игроков", chat_id, len(data['players']))
+        return data
+
+    def import_chat(self, data: Dict[str, Any]) -> ChatState:
+        """Принимает снимок export_chat (замещая прежнее состояние чата) и заново ставит таймеры
+        истечения его ролей, дебаффов и штрафов за фокус на часах этого процесса"""
+        now = self.clock.now()
+        chat = self._new_chat()
+        chat.load_dict(data, now)
+        self.rng_streams.release()  # в генераторе мог остаться поток замещаемого раздела
+        self.chats.put(chat.chat_id, chat, now)
+        schedule = self.timers.schedule
+        for user_id, player in chat.players.items.items():
+            if player.role is not None:
+                schedule(player.role_expires, self._expire_role, chat, user_id, player, player.role_expires)
+            if player.debuff_miss_bonus:
+                schedule(player.debuff_expires, self._expire_debuff, chat, user_id, player, player.debuff_expires)
+        for key, until in chat.focus_penalties.items():
+            schedule(until, self._expire_focus_penalty, chat, key, until)
+        logger.info("📥 Чат %s принят: %s игроков", chat.chat_id, len(chat.players))
+        return chat
+
+    # ---------------------- Таймеры истечения ----------------------
+    def advance_timers(self, now: Optional[float] = None) -> int:
+        """Срабатывание всех истёкших таймеров. Возвращает их число."""
+        return self.timers.advance(self.clock.now() if now is None else now)
+
+    def add_expiry_listener(self, callback: Callable[[str, Any, Any], None]):
+        """Подписка на истечения: callback(kind, key, value).
+
+        kind — 'role' (key=(user_id, chat_id), value=роль), 'debuff' (key=(user_id, chat_id),
+        value=бонус промаха) или 'focus_penalty' (key=(initiator_id, target_id, chat_id), value=стаки фокуса).
+        Таймеры чата, переданного другому процессу или вытесненного, не срабатывают.
         """
+        self.expiry_listeners.append(callback)
+
+    def _notify_expired(self, kind: str, key: Any, value: Any):
+        for callback in self.expiry_listeners:
+            try:
+                callback(kind, key, value)
+            except Exception as e:
+                logger.error(f"❌ Ошибка в подписчике истечения {kind}: {e}")
+
+    def _expire_role(self, chat: ChatState, user_id: int, player: PlayerState, expires: float):
+        if player.role is None or player.role_expires != expires or self.chats.get(chat.chat_id) is not chat:
+            return  # роль уже сменилась или чат ушёл — таймер устарел
+        role, player.role, player.role_id = player.role, None, 0
+        logger.info("⌛ Роль %s пользователя %s в чате %s истекла", role, user_id, chat.chat_id)
+        self._notify_expired('role', (user_id, chat.chat_id), role)
+
+    def apply_miss_debuff(self, user_id: int, bonus: float, duration: float, now: Optional[float] = None, *,
+                          chat_id: int):
+        """Дебафф промаха на пользователя в чате chat_id (снимает колесо таймеров)"""
+        if now is None:
+            now = self.clock.now()
+        chat = self._chat(chat_id, now)
+        player = chat.players.touch(user_id, now)
+        player.debuff_miss_bonus = bonus
+        player.debuff_expires = now + duration
+        self.timers.schedule(player.debuff_expires, self._expire_debuff, chat, user_id, player,
+                             player.debuff_expires)
+
+    def _expire_debuff(self, chat: ChatState, user_id: int, player: PlayerState, expires: float):
+        if player.debuff_expires != expires or self.chats.get(chat.chat_id) is not chat:
+            return
+        bonus, player.debuff_miss_bonus = player.debuff_miss_bonus, 0.0
+        logger.debug("⌛ Дебафф с пользователя %s в чате %s снят", user_id, chat.chat_id)
+        self._notify_expired('debuff', (user_id, chat.chat_id), bonus)
+
+    def start_focus_penalty(self, initiator_id: int, target_id: int, chat_id: int,
+                            now: Optional[float] = None) -> float:
+        """Вешает (или продлевает) штраф за фокус на пару. Возвращает время окончания по часам игры."""
+        chat = self._chat(chat_id, now)
+        key = (initiator_id, target_id)
+        until = (self.clock.now() if now is None else now) + FOCUS_PENALTY_DURATION
+        chat.focus_penalties[key] = until
+        self.timers.schedule(until, self._expire_focus_penalty, chat, key, until)
+        logger.debug("⏳ Штраф за фокус %s->%s на %s с", initiator_id, target_id, FOCUS_PENALTY_DURATION)
+        return until
+
+    def _expire_focus_penalty(self, chat: ChatState, key: Tuple[int, int], until: float):
+        if chat.focus_penalties.get(key) != until or self.chats.get(chat.chat_id) is not chat:
+            return  # штраф продлён (сработает следующий таймер) или чат ушёл
+        del chat.focus_penalties[key]
+        self._notify_expired('focus_penalty', (*key, chat.chat_id), chat.focus.get(*key))
+
+    def has_focus_penalty(self, initiator_id: int, target_id: int, chat_id: int) -> bool:
+        """Действует ли штраф за фокус на пару (без обращения к часам)"""
+        chat = self.chats.get(chat_id)
+        return chat is not None and (initiator_id, target_id) in chat.focus_penalties
+
+    async def start_timer_task(self, interval: float = TIMER_SETTINGS['tick_interval'],
+                               sweep_interval: float = TIMER_SETTINGS['state_sweep_interval']):
+        """Фоновый тик: срабатывание таймеров и периодическое вытеснение простаивающего состояния"""
+        if self.is_ticking:
+            logger.warning("⚠️ Тик таймеров уже запущен")
+            return
+
+        self.is_ticking = True
+        last_sweep = self.clock.now()
+        try:
+            while self.is_ticking:
+                now = self.clock.now()
+                self.advance_timers(now)
+                if now - last_sweep >= sweep_interval:
+                    last_sweep = now
+                    evicted = self.expire_state()
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("🧹 Вытеснено %s записей состояния: %s", evicted, self.get_state_stats())
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Ошибка тика таймеров: {e}")
+        finally:
+            self.is_ticking = False
+
+    def stop_timer_task(self):
+        """Остановка фонового тика"""
+        self.is_ticking = False
+        logger.info("🛑 Тик таймеров остановлен")
+
+    def hit_chance_formula(self, is_targeted: bool, role: Optional[str], target_role: Optional[str],
+                           heat: int, stacks: int) -> float:
+        """Скалярная формула шанса попадания (по ней строится и проверяется HitChanceTable)."""
         # База
         accuracy = 0.55 if is_targeted else 0.45
 
         # Фокус (бонус метателю за накапливание прицела на цели)
-        if target_id is not None:
-            stacks = self.focus_stacks.get((initiator_id, target_id, chat_id), 0)
-            focus_bonus = min(stacks, 3) * 0.08  # до +24%
-            accuracy += focus_bonus
-        else:
-            stacks = 0
+        focus_bonus = min(stacks, 3) * 0.08  # до +24%
+        accuracy += focus_bonus
 
         # Жар метателя
-        heat = self.user_heat.get(initiator_id, 0)
         heat_penalty = min(int(heat / 5) / 100.0, 0.20)  # до -20%
         accuracy -= heat_penalty
         if heat >= 80:
             accuracy -= 0.10  # жёсткий оверхит
 
-        # Роль метателя
-        role = self.get_user_role(initiator_id)
-        if role == 'sniper':
-            accuracy += 0.15
-            if heat >= 60:
-                accuracy -= 0.15
-        elif role == 'bombardier':
-            accuracy -= 0.05
-        elif role == 'drunk_sniper':
-            accuracy += 0.20 if heat < 30 else -0.20
-        elif role == 'berserker':
-            accuracy += 0.10
-        elif role == 'trickster':
-            pass
-        elif role == 'magnet':
-            if stacks >= 2:
-                accuracy += 0.12
-        elif role == 'oracle':
-            accuracy += 0.08
-        elif role == 'pyromaniac':
-            if heat >= 20:
-                accuracy += 0.10
-            if heat >= 80:
-                accuracy -= 0.10
-        elif role == 'rocketeer':
-            accuracy -= 0.08
-        elif role == 'snot_sniper':
-            accuracy += 0.12
-        elif role == 'acid_clown':
-            accuracy -= 0.10
-        # counter_guru, collector, teleporter и пр. — отдельно по эффектам ниже
-
-        # Роль цели (усложняем жизнь метателю)
-        if target_id is not None:
-            target_role = self.get_user_role(target_id)
-            if target_role == 'defender':
-                accuracy -= 0.10
-            elif target_role == 'shieldbearer':
-                accuracy -= 0.08
+        # Роль метателя и роль цели (усложняет жизнь метателю)
+        strategy = role_strategy(role)
+        accuracy = strategy.accuracy_rule(accuracy, strategy.accuracy, heat, stacks)
+        accuracy += role_strategy(target_role).target_accuracy
 
         # Ограничения
-        accuracy = self._clamp(accuracy, 0.05, 0.95)
-        logger.debug(f"🎯 Шанс попадания: {accuracy:.2%} (role={role}, heat={heat}, stacks={stacks})")
+        return self._clamp(accuracy, 0.05, 0.95)
+
+    def compute_hit_chance(self,
+                           *,
+                           is_targeted: bool,
+                           initiator_id: int,
+                           target_id: int | None,
+                           chat_id: int,
+                           now: Optional[float] = None) -> float:
+        """Рассчитать шанс прямого попадания с учётом роли, фокуса и жара.
+
+        Возвращает вероятность в диапазоне [0.05, 0.95] из предрасчитанной таблицы.
+        """
+        chat = self.chats.get(chat_id)
+        if target_id is not None and chat is not None:
+            stacks = chat.focus.get(initiator_id, target_id)
+            target = chat.players.get(target_id)
+            target_role_id = target.role_id if target else 0
+        else:
+            stacks = 0
+            target_role_id = 0
+        player = (chat.players.get(initiator_id) if chat else None) or PlayerState()
+        heat = self._heat(player, self.clock.now() if now is None else now)
+
+        accuracy = self.hit_chance_table.lookup_id(is_targeted, player.role_id, target_role_id, heat, stacks)
+        logger.debug("🎯 Шанс попадания: %.2f%% (role=%s, heat=%s, stacks=%s)", accuracy * 100, player.role, heat, stacks)
         return accuracy
 
-    def _pick_miss_text(self, target_username: str, role: str | None) -> str:
-        """Русские фразы промаха по конкретной цели, с учётом роли."""
-        common = [
-            f"😬 Промах по @{target_username}. Говно шмякнулось мимо.",
-            f"💨 Не долетело до @{target_username}. Пыль столбом, толку — ноль.",
-            f"🤏 Чуть‑чуть не хватило до @{target_username}.",
-        ]
-        role_text = None
-        if role == 'drunk_sniper':
-            role_text = f"🥴 Шатнуло прицел — мимо @{target_username}."
-        elif role == 'rocketeer':
-            role_text = f"🚀 Ракета ушла в молоко — промах по @{target_username}."
-        elif role == 'bombardier':
-            role_text = f"💣 Кривой залп — мимо @{target_username}. Осколки разлетелись."
-        elif role == 'snot_sniper':
-            role_text = f"🤧 Сопля размазалась по ветру — мимо @{target_username}."
-        return role_text or random.choice(common)
+    def _pick_miss_text(self, target_username: str, role: str | None, rng: SplitMix64) -> str:
+        """Русские фразы промаха по конкретной цели, с учётом роли (фраза без роли — из потока rng)."""
+        role_text = role_strategy(role).miss_text
+        if role_text:
+            return role_text.format(target=target_username)
+        return self.renderer.phrase(rng, 'targeted_miss', {'target': target_username})
 
     # ---------------------- Новая механика: роли и модификаторы ----------------------
-    def assign_random_role(self, user_id: int) -> str:
-        """Назначает случайную роль пользователю на 1 час"""
-        roles = [
-            'sniper', 'bombardier', 'defender',
-            'drunk_sniper', 'berserker', 'trickster', 'magnet', 'saboteur',
-            'oracle', 'pyromaniac', 'shieldbearer', 'collector', 'teleporter',
-            'rocketeer', 'snot_sniper', 'acid_clown', 'counter_guru'
-        ]
-        role = random.choice(roles)
-        expires_at = datetime.now() + timedelta(seconds=ROLE_DURATION)
-        self.user_roles[user_id] = (role, expires_at)
-        logger.info(f"🎭 Пользователю {user_id} назначена роль {role} до {expires_at}")
+    def assign_random_role(self, user_id: int, now: Optional[float] = None, *, chat_id: int) -> str:
+        """Назначает случайную роль пользователю в чате chat_id на 1 час (роль — из потока этого чата)"""
+        if now is None:
+            now = self.clock.now()
+        chat = self._chat(chat_id, now)
+        strategy = self._chat_rng(chat).choice(ROLE_STRATEGIES[1:])
+        role = strategy.key
+        player = chat.players.touch(user_id, now)
+        player.role = role
+        player.role_id = strategy.role_id
+        player.role_expires = now + ROLE_DURATION
+        self.timers.schedule(player.role_expires, self._expire_role, chat, user_id, player, player.role_expires)
+        logger.info("🎭 Пользователю %s назначена роль %s на %s с", user_id, role, ROLE_DURATION)
         return role
     
-    def get_user_role(self, user_id: int) -> Optional[str]:
-        """Возвращает активную роль пользователя или None"""
-        if user_id not in self.user_roles:
-            return None
-        
-        role, expires_at = self.user_roles[user_id]
-        if datetime.now() > expires_at:
-            del self.user_roles[user_id]
-            return None
-        
-        return role
+    def get_user_role(self, user_id: int, *, chat_id: int) -> Optional[str]:
+        """Возвращает активную роль пользователя в чате chat_id, иначе None
+        (истёкшие снимает колесо таймеров)"""
+        player = self._find_player(user_id, chat_id)
+        return player.role if player else None
+    
+    def get_role_strategy(self, user_id: int, *, chat_id: int):
+        """Стратегия активной роли пользователя в чате chat_id (без роли — NO_ROLE)"""
+        player = self._find_player(user_id, chat_id)
+        return ROLE_STRATEGIES[player.role_id if player else 0]
     
     def apply_role_modifiers(self, base_weights: List[float], role: str) -> List[float]:
-        """Применяет модификаторы роли к базовым весам исхода"""
+        """Применяет модификаторы роли к базовым весам исхода (множители weights её стратегии
+        из реестра roles.py; поправки по жару и фокусу добавляет compute_outcome_weights)"""
         modified_weights = base_weights.copy()
-        
-        if role == 'sniper':
-            # Снайпер: +точность, -разлет
-            modified_weights[0] *= 1.5  # direct_hit
-            modified_weights[2] *= 0.7  # splash
-            logger.debug(f"🎯 Модификатор снайпера применен: точность↑, разлет↓")
-        
-        elif role == 'bombardier':
-            # Бомбардир: +разлет, -точность
-            modified_weights[0] *= 0.8  # direct_hit
-            modified_weights[2] *= 1.8  # splash
-            logger.debug(f"💣 Модификатор бомбардира применен: разлет↑, точность↓")
-        
-        elif role == 'defender':
-            # Оборонец: +шанс отражения
-            # Это будет применено в логике исхода
-            logger.debug(f"🛡️ Модификатор оборонца применен: отражение↑")
-
-        elif role == 'drunk_sniper':
-            modified_weights[0] *= 1.3
-            logger.debug("🍺🎯 Пьяный снайпер: базовая точность↑")
-        elif role == 'berserker':
-            modified_weights[4] *= 1.6  # critical
-            modified_weights[5] *= 1.5  # combo
-            logger.debug("🪓 Берсерк: крит/комбо↑")
-        elif role == 'trickster':
-            modified_weights[3] *= 1.4  # special
-            logger.debug("🃏 Трикстер: special↑")
-        elif role == 'oracle':
-            modified_weights[6] *= 0.5  # legendary↓
-            logger.debug("🔮 Оракул: legendary↓")
-        elif role == 'pyromaniac':
-            modified_weights[4] *= 1.2  # крит немного↑
-            logger.debug("🔥 Пироман: крит слегка↑")
-        elif role == 'rocketeer':
-            modified_weights[2] *= 1.3
-            modified_weights[3] *= 1.2
-            modified_weights[0] *= 0.9
-            logger.debug("🚀 Ракетчик: splash/special↑, точность↓")
-        elif role == 'snot_sniper':
-            modified_weights[1] *= 1.1
-            logger.debug("🤧 Сопля-снайпер: промах слегка↑")
-        
+        for outcome, factor in role_strategy(role).weights:
+            modified_weights[self.outcome_index[outcome]] *= factor
         return modified_weights
     
     def calculate_focus_penalty(self, initiator_id: int, target_id: int, chat_id: int) -> float:
         """Рассчитывает штраф за фокус на одну цель"""
-        key = (initiator_id, target_id, chat_id)
-        stacks = self.focus_stacks.get(key, 0)
+        stacks = self.get_focus_stacks(initiator_id, target_id, chat_id)
         
         if stacks == 0:
             return 1.0
         
         # Каждый повторный удар по одной цели увеличивает штраф
         penalty = 1.0 + (stacks * 0.3)  # +30% за каждый удар
-        logger.debug(f"🎯 Штраф за фокус {initiator_id}->{target_id}: {penalty:.2f}x (stacks: {stacks})")
+        logger.debug("🎯 Штраф за фокус %s->%s: %.2fx (stacks: %s)", initiator_id, target_id, penalty, stacks)
         return penalty
     
-    def calculate_heat_bonus(self, user_id: int) -> float:
-        """Рассчитывает бонус/штраф за репутацию агрессора"""
-        heat = self.user_heat.get(user_id, 0)
+    def calculate_heat_bonus(self, user_id: int, *, chat_id: int) -> float:
+        """Рассчитывает бонус/штраф за репутацию агрессора (по остывшему жару в чате chat_id)"""
+        heat = self.get_user_heat(user_id, chat_id=chat_id)
         
         if heat <= 20:
             return 1.0  # Нейтральная репутация
@@ -227,222 +495,367 @@ class GameLogic:
             return 2.0  # Высокий бонус (но и высокий риск)
     
     def calculate_comeback_bonus(self, user_id: int, chat_id: int) -> float:
-        """Рассчитывает бонус камбэка для отстающих игроков"""
-        # TODO: Реализовать через БД - получить средний счёт в чате
-        # Пока возвращаем базовый множитель
-        return 1.0
-    
-    def check_cooldown(self, user_id: int) -> bool:
-        """Проверяет, не находится ли пользователь в кулдауне"""
-        if user_id not in self.last_throws:
+        """Рассчитывает бонус камбэка для отстающих игроков.
+
+        Счёт игрока сравнивается со средним и порогами квантилей счёта в чате — они
+        ведутся в гистограмме чата (score_stats.py) без запросов к БД, O(1) на вызов.
+        """
+        chat = self.chats.get(chat_id)
+        player = chat.players.get(user_id) if chat else None
+        return 1.0 if player is None else self._comeback_bonus(chat.scores, player.score, user_id)
+
+    def _comeback_bonus(self, scores: ScoreHistogram, score: int, user_id: int) -> float:
+        if scores.count < COMEBACK_SETTINGS['min_players'] or score >= scores.mean:
+            return 1.0  # мало игроков или не отстаёт
+        for i, multiplier in self.comeback_multipliers:
+            if score <= scores.cut(i):
+                logger.debug("📈 Камбэк пользователя %s: %.2fx (счёт %s, среднее %.1f)",
+                             user_id, multiplier, score, scores.mean)
+                return multiplier
+        return COMEBACK_SETTINGS['below_mean']
+    
+    def check_cooldown(self, user_id: int, now: Optional[float] = None, *, chat_id: int) -> bool:
+        """Проверяет, не находится ли пользователь в кулдауне в чате chat_id"""
+        player = self._find_player(user_id, chat_id)
+        if player is None or player.last_throw == NEVER:
             return False
         
-        last_throw = self.last_throws[user_id]
-        time_since = (datetime.now() - last_throw).total_seconds()
+        time_since = (self.clock.now() if now is None else now) - player.last_throw
         # Оракул: кулдаун короче
-        role = self.get_user_role(user_id)
-        effective_cd = MIN_THROW_INTERVAL * (0.6 if role == 'oracle' else 1.0)
+        effective_cd = MIN_THROW_INTERVAL * ROLE_STRATEGIES[player.role_id].cooldown_factor
         if time_since < effective_cd:
-            logger.debug(f"⏰ Пользователь {user_id} в кулдауне: {effective_cd - time_since:.1f}s осталось")
+            logger.debug("⏰ Пользователь %s в кулдауне: %.1fs осталось", user_id, effective_cd - time_since)
             return True
         
         return False
     
-    def update_focus_stacks(self, initiator_id: int, target_id: int, chat_id: int):
-        """Обновляет счётчик фокуса на цель"""
-        key = (initiator_id, target_id, chat_id)
-        self.focus_stacks[key] = self.focus_stacks.get(key, 0) + 1
-        logger.debug(f"🎯 Фокус {initiator_id}->{target_id}: {self.focus_stacks[key]} stacks")
+    def update_focus_stacks(self, initiator_id: int, target_id: int, chat_id: int,
+                            now: Optional[float] = None) -> int:
+        """Обновляет счётчик фокуса на цель; возвращает новое число стаков"""
+        stacks = self.get_chat_focus(chat_id, now).increment(initiator_id, target_id)
+        logger.debug("🎯 Фокус %s->%s: %s stacks", initiator_id, target_id, stacks)
+        return stacks
+    
+    def restore_focus_stacks(self, initiator_id: int, target_id: int, chat_id: int, stacks: int):
+        """Подставляет сохранённый фокус после рестарта, если в памяти его ещё нет"""
+        if stacks > 0:
+            self.get_chat_focus(chat_id).setdefault(initiator_id, target_id, stacks)
+
+    def _keep_dirty_focus(self, chat_id: int, chat: ChatState):
+        for (initiator_id, target_id), stacks in chat.focus.take_dirty().items():
+            self.evicted_focus[(initiator_id, target_id, chat_id)] = stacks
+
+    def take_dirty_focus(self) -> List[Tuple[int, int, int, int, Optional[float]]]:
+        """Пары фокуса, изменённые с прошлого вызова (целевые броски, хуки ролей), для сохранения в БД:
+        (initiator_id, target_id, chat_id, стаки, секунд до конца штрафа или None). Отметки снимаются"""
+        now = self.clock.now()
+        pairs = [(*key, stacks, None) for key, stacks in self.evicted_focus.items()]
+        self.evicted_focus = {}
+        for chat_id, chat in self.chats.items.items():
+            if not chat.focus.dirty:
+                continue
+            penalties = chat.focus_penalties
+            for key, stacks in chat.focus.take_dirty().items():
+                until = penalties.get(key)
+                pairs.append((*key, chat_id, stacks, None if until is None else until - now))
+        return pairs
     
-    def update_user_heat(self, user_id: int, delta: int = 1):
-        """Обновляет heat пользователя (0-100)"""
-        current_heat = self.user_heat.get(user_id, 0)
+    def update_user_heat(self, user_id: int, delta: int = 1, player: Optional[PlayerState] = None,
+                         now: Optional[float] = None, *, chat_id: Optional[int] = None):
+        """Обновляет heat пользователя (0-100) поверх остывшего; player — уже полученная запись
+        (без повторного поиска), иначе — запись в чате chat_id"""
+        if now is None:
+            now = self.clock.now()
+        player = player or self.get_player(user_id, now, chat_id=chat_id)
+        current_heat = self._heat(player, now)
         new_heat = max(0, min(100, current_heat + delta))
-        self.user_heat[user_id] = new_heat
-        logger.debug(f"🔥 Heat пользователя {user_id}: {current_heat} -> {new_heat}")
+        player.heat = new_heat
+        player.heat_at = now
+        logger.debug("🔥 Heat пользователя %s: %s -> %s", user_id, current_heat, new_heat)
     
-    def update_user_score(self, user_id: int, delta: int):
-        """Обновляет счёт пользователя"""
-        current_score = self.user_scores.get(user_id, 0)
-        self.user_scores[user_id] = current_score + delta
-        logger.debug(f"📊 Счёт пользователя {user_id}: {current_score} -> {self.user_scores[user_id]}")
+    def update_user_score(self, user_id: int, delta: int, player: Optional[PlayerState] = None, *,
+                          chat_id: int):
+        """Обновляет счёт пользователя в чате chat_id (и гистограмму счёта чата);
+        player — уже полученная запись этого пользователя в этом чате"""
+        player = player or self.get_player(user_id, chat_id=chat_id)
+        current_score = player.score
+        player.score = current_score + delta
+        self.chats.get(chat_id).scores.move(current_score, player.score)
+        logger.debug("📊 Счёт пользователя %s: %s -> %s", user_id, current_score, player.score)
     
-    def record_throw(self, user_id: int):
-        """Записывает время последнего броска пользователя"""
-        self.last_throws[user_id] = datetime.now()
+    def record_throw(self, user_id: int, now: Optional[float] = None, *, chat_id: int):
+        """Записывает время последнего броска пользователя в чате chat_id"""
+        if now is None:
+            now = self.clock.now()
+        self.get_player(user_id, now, chat_id=chat_id).last_throw = now
     
     # ---------------------- Обновлённая логика исхода ----------------------
-    def determine_outcome(self, user_id: int = None, target_id: Optional[int] = None, chat_id: Optional[int] = None) -> str:
-        """Определение исхода броска на основе вероятностей и комбо"""
-        # Базовые вероятности
+    def compute_outcome_weights(self, role: Optional[str], heat: int, combo_count: int, streak_count: int,
+                                collector_focus: bool = False, snot_double: bool = False) -> List[float]:
+        """Ненормированные веса исходов для состояния игрока (основа предрасчитанных таблиц).
+
+        collector_focus — метатель держит фокус на цели (focus_weights роли),
+        snot_double — ветка удвоенного промаха (double_miss_chance роли).
+        """
         base_weights = self.weights.copy()
         
-        # Если есть пользователь, применяем бонусы за комбо и серии
-        if user_id is not None:
-            # Применяем модификаторы роли
-            role = self.get_user_role(user_id)
-            if role:
-                base_weights = self.apply_role_modifiers(base_weights, role)
-                heat = self.user_heat.get(user_id, 0)
-                if role == 'drunk_sniper':
-                    if heat >= 50:
-                        base_weights[1] *= 2.0  # miss
-                    else:
-                        base_weights[0] *= 1.3
-                if role == 'pyromaniac':
-                    if heat >= 20:
-                        base_weights[4] *= 1.5
-                    if heat >= 80:
-                        base_weights[3] *= 1.5
-                if role == 'collector' and target_id is not None and chat_id is not None:
-                    stacks = self.focus_stacks.get((user_id, target_id, chat_id), 0)
-                    if stacks > 0:
-                        base_weights[0] *= 1.4
-                if role == 'snot_sniper' and random.random() < 0.2:
-                    base_weights[1] *= 2.0
-            
-            combo_count = self.combo_counters.get(user_id, 0)
-            streak_count = self.streak_counters.get(user_id, 0)
-            
-            # Бонус за комбо
-            if combo_count >= 5:
-                # Увеличиваем шанс на critical и combo
-                base_weights[4] *= 2  # critical
-                base_weights[5] *= 3   # combo
-                logger.debug(f"🔄 Бонус комбо x{combo_count} применен для пользователя {user_id}")
-            
-            # Бонус за серию
-            if streak_count >= 10:
-                # Увеличиваем шанс на legendary
-                base_weights[6] *= 4   # legendary
-                logger.debug(f"🔥 Бонус серии x{streak_count} применен для пользователя {user_id}")
-        
-        # Нормализуем веса
-        total_weight = sum(base_weights)
-        base_weights = [w / total_weight for w in base_weights]
-        
-        outcome = random.choices(self.outcomes, weights=base_weights, k=1)[0]
-        logger.debug(f"🎲 Определен исход броска: {outcome}")
+        # Применяем модификаторы роли
+        if role:
+            role_strategy(role).apply_weights(base_weights, self.outcome_index, heat, collector_focus, snot_double)
+        
+        # Бонус за комбо: увеличиваем шанс на critical и combo
+        if combo_count >= 5:
+            base_weights[4] *= 2  # critical
+            base_weights[5] *= 3   # combo
+        
+        # Бонус за серию: увеличиваем шанс на legendary
+        if streak_count >= 10:
+            base_weights[6] *= 4   # legendary
+        
+        return base_weights
+    
+    def build_outcome_tables(self) -> OutcomeTables:
+        """Предрасчёт alias-таблиц исходов по текущим OUTCOME_PROBABILITIES"""
+        self.outcomes = list(OUTCOME_PROBABILITIES.keys())
+        self.weights = list(OUTCOME_PROBABILITIES.values())
+        self.outcome_index = {outcome: i for i, outcome in enumerate(self.outcomes)}
+        tables = OutcomeTables(self.outcomes, [strategy.key for strategy in ROLE_STRATEGIES],
+                               self.compute_outcome_weights,
+                               signature=tuple(OUTCOME_PROBABILITIES.items()))
+        logger.info("🎲 Таблицы исходов построены: %s комбинаций", len(tables.tables))
+        return tables
+    
+    def get_outcome_tables(self) -> OutcomeTables:
+        """Актуальные таблицы исходов; перестраиваются, если OUTCOME_PROBABILITIES изменились"""
+        if self.outcome_tables.signature != tuple(OUTCOME_PROBABILITIES.items()):
+            self.outcome_tables = self.build_outcome_tables()
+        return self.outcome_tables
+    
+    def determine_outcome(self, user_id: int = None, target_id: Optional[int] = None, chat_id: Optional[int] = None,
+                          now: Optional[float] = None) -> str:
+        """Определение исхода броска на основе вероятностей и комбо.
+
+        Состояние игрока и поток случайных чисел — из чата chat_id; без chat_id исход
+        считается как у игрока без состояния, из общего генератора.
+        """
+        tables = self.get_outcome_tables()
+        chat = None if chat_id is None else self._chat(chat_id, now)
+        
+        if user_id is None:
+            table = tables.base
+        else:
+            player = (chat.players.get(user_id) if chat else None) or PlayerState()
+            focus = (target_id is not None and chat is not None
+                     and bool(ROLE_STRATEGIES[player.role_id].focus_weights)
+                     and chat.focus.get(user_id, target_id) > 0)
+            heat = self._heat(player, self.clock.now() if now is None else now)
+            table = tables.lookup_id(player.role_id, heat, player.combo, player.streak, focus)
+        
+        outcome = table.sample(self.rng if chat is None else self._chat_rng(chat))
+        logger.debug("🎲 Определен исход броска: %s", outcome)
         return outcome
     
-    def get_random_message(self, outcome: str, **kwargs) -> str:
-        """Получение случайного сообщения для исхода"""
-        if outcome not in GAME_MESSAGES:
+    # ---------------------- Точное распределение исходов ----------------------
+    def outcome_distribution(self, *,
+                             role: Optional[str] = None,
+                             heat: int = 0,
+                             combo_count: int = 0,
+                             streak_count: int = 0,
+                             targeted: bool = False,
+                             target_role: Optional[str] = None,
+                             focus_stacks: int = 0,
+                             available_targets: int = 1) -> Dict[str, Any]:
+        """Точное распределение исходов и числа целей для гипотетического броска.
+
+        Считается аналитически по тем же таблицам, что и живой бросок:
+        targeted=False — как process_throw, targeted=True — как process_throw_at_target
+        (focus_stacks — стаки до броска, живой путь добавляет один перед расчётом шанса).
+        available_targets — сколько участников, кроме метателя, может задеть бросок.
+
+        Возвращает {'outcomes': {исход: p}, 'target_counts': {n: p},
+        'joint': {(исход, n): p}, 'hit_chance': p или None}.
+        """
+        joint: Dict[Tuple[str, int], float] = {}
+
+        def add(outcome: str, count: int, p: float):
+            if p > 0:
+                joint[(outcome, count)] = joint.get((outcome, count), 0.0) + p
+
+        hit_chance = None
+        if targeted:
+            hit_chance = self.hit_chance_table.lookup(True, role, target_role, heat, focus_stacks + 1)
+            strategy = role_strategy(role)
+            forced = strategy.forced_special_chance
+            to_splash = strategy.miss_to_splash
+            add('special', 1, forced)
+            add('direct_hit', 1, (1 - forced) * hit_chance)
+            add('splash', 1, (1 - forced) * (1 - hit_chance) * to_splash)
+            add('miss', 1, (1 - forced) * (1 - hit_chance) * (1 - to_splash))
+        else:
+            table = self.get_outcome_tables().lookup(role, heat, combo_count, streak_count, False)
+            n = max(0, available_targets)
+
+            def spread(outcome: str, p: float, bounds: Tuple[int, int]):
+                low, high = bounds
+                for k in range(low, high + 1):
+                    add(outcome, min(k, n), p / (high - low + 1))
+
+            for outcome, p in table.as_dict().items():
+                if n == 0:
+                    # Метатель один в чате — он же единственная цель
+                    add(outcome, 1, p)
+                elif outcome == 'splash':
+                    spread(outcome, p, SPLASH_TARGETS)
+                elif outcome == 'combo':
+                    spread(outcome, p, MULTI_TARGETS)
+                elif outcome == 'legendary':
+                    add(outcome, n, p)
+                elif outcome == 'special':
+                    p_effect = p / len(SPECIAL_EFFECTS)
+                    for effect in SPECIAL_EFFECTS:
+                        if effect in ('avalanche', 'rain'):
+                            add(outcome, n, p_effect)
+                        elif effect == 'bomb':
+                            spread(outcome, p_effect, MULTI_TARGETS)
+                        else:
+                            add(outcome, 1, p_effect)
+                else:
+                    add(outcome, 1, p)
+
+        outcomes: Dict[str, float] = {}
+        target_counts: Dict[int, float] = {}
+        for (outcome, count), p in joint.items():
+            outcomes[outcome] = outcomes.get(outcome, 0.0) + p
+            target_counts[count] = target_counts.get(count, 0.0) + p
+        return {
+            'outcomes': outcomes,
+            'target_counts': dict(sorted(target_counts.items())),
+            'joint': joint,
+            'hit_chance': hit_chance,
+        }
+    
+    def get_random_message(self, outcome: str, *, rng: Optional[SplitMix64] = None, **kwargs) -> str:
+        """Получение случайного сообщения для исхода (шаблон — из потока rng, без него — из общего генератора)"""
+        # Выбираем шаблон и подставляем плейсхолдеры только в него
+        formatted_message = self.renderer.message(self.rng if rng is None else rng, outcome, kwargs)
+        if formatted_message is None:
             logger.warning(f"⚠️ Неизвестный исход: {outcome}")
             return "Что-то пошло не так... 💩"
-        
-        messages = GAME_MESSAGES[outcome]
-        message = random.choice(messages)
-        
-        # Заменяем плейсхолдеры
-        formatted_message = message.format(**kwargs)
-        logger.debug(f"💬 Выбрано сообщение для исхода {outcome}: {formatted_message}")
+        logger.debug("💬 Выбрано сообщение для исхода %s: %s", outcome, formatted_message)
         return formatted_message
     
-    def select_targets(self, participants: List[Tuple[int, str]], 
-                      initiator_id: int, outcome: str) -> List[Tuple[int, str]]:
-        """Выбор целей в зависимости от исхода"""
-        if not participants:
+    def select_targets(self, participants: Union[ParticipantIndex, List[Tuple[int, str]]],
+                      initiator_id: int, outcome: str, rng: Optional[SplitMix64] = None) -> List[Tuple[int, str]]:
+        """Выбор целей в зависимости от исхода.
+
+        participants — индекс участников чата (participant_index.py): выбор цели, кроме
+        инициатора, — O(1), нескольких жертв — O(k). Список тоже подходит: в нём за O(n)
+        ищется только позиция инициатора. rng — поток чата броска (без него — общий генератор).
+        """
+        if rng is None:
+            rng = self.rng
+        index = as_index(participants, initiator_id)
+        if not index:
             logger.warning("⚠️ Список участников пуст")
             return []
         
-        # Убираем инициатора из списка возможных целей
-        available_targets = [p for p in participants if p[0] != initiator_id]
+        # Цели — все, кроме инициатора (без сборки отфильтрованного списка)
+        available_count = index.count_excluding(initiator_id)
         
-        if not available_targets:
+        if not available_count:
             # Если инициатор единственный участник, он становится целью
-            logger.info(f"🎯 Инициатор {initiator_id} - единственный участник, становится целью")
-            return [participants[0]]
+            logger.info("🎯 Инициатор %s - единственный участник, становится целью", initiator_id)
+            return [index[0]]
         
         if outcome == 'direct_hit':
             # Прямое попадание - одна случайная цель
-            target = random.choice(available_targets)
-            logger.debug(f"🎯 Прямое попадание: выбрана цель {target[1]} (ID: {target[0]})")
+            target = index.choice_excluding(rng, initiator_id)
+            logger.debug("🎯 Прямое попадание: выбрана цель %s (ID: %s)", target[1], target[0])
             return [target]
         
         elif outcome == 'miss':
             # Промах - инициатор сам себя обосрал
-            initiator = next((p for p in participants if p[0] == initiator_id), None)
+            initiator = index.get(initiator_id)
             if initiator:
-                logger.debug(f"🤡 Промах: инициатор {initiator[1]} (ID: {initiator[0]}) сам себя обосрал")
+                logger.debug("🤡 Промах: инициатор %s (ID: %s) сам себя обосрал", initiator[1], initiator[0])
                 return [initiator]
             else:
                 logger.warning(f"⚠️ Инициатор {initiator_id} не найден в списке участников")
-                return available_targets[:1]
+                return [index[0]]
         
         elif outcome == 'splash':
             # Разлетелось - несколько случайных целей (2-4)
-            num_targets = min(random.randint(2, 4), len(available_targets))
-            targets = random.sample(available_targets, num_targets)
-            target_names = [t[1] for t in targets]
-            logger.debug(f"🤮 Разлетелось: выбрано {num_targets} целей: {target_names}")
+            num_targets = min(rng.randint(*SPLASH_TARGETS), available_count)
+            targets = index.sample_excluding(rng, num_targets, initiator_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🤮 Разлетелось: выбрано %s целей: %s", num_targets, [t[1] for t in targets])
             return targets
         
         elif outcome == 'special':
             # Особые эффекты
-            effect_type = random.choice(['boomerang', 'avalanche', 'brick', 'bomb', 'rain', 'lightning', 'fire', 'ice', 'rainbow', 'theater', 'circus', 'art', 'music', 'movie', 'game'])
-            logger.debug(f"⚡ Особый эффект: {effect_type}")
+            effect_type = rng.choice(SPECIAL_EFFECTS)
+            logger.debug("⚡ Особый эффект: %s", effect_type)
             
             if effect_type == 'boomerang':
                 # Бумеранг - инициатор сам себя обосрал
-                initiator = next((p for p in participants if p[0] == initiator_id), None)
+                initiator = index.get(initiator_id)
                 if initiator:
-                    logger.debug(f"🔄 Бумеранг: инициатор {initiator[1]} (ID: {initiator[0]}) сам себя обосрал")
+                    logger.debug("🔄 Бумеранг: инициатор %s (ID: %s) сам себя обосрал", initiator[1], initiator[0])
                     return [initiator]
                 else:
-                    return available_targets[:1]
+                    return [index[0]]
             
             elif effect_type == 'avalanche':
                 # Лавина - весь чат
-                logger.debug(f"🌪️ Лавина: весь чат ({len(available_targets)} участников) обосран")
-                return available_targets
+                logger.debug("🌪️ Лавина: весь чат (%s участников) обосран", available_count)
+                return index.others(initiator_id)
             
             elif effect_type == 'brick':
                 # Кирпич - случайная цель
-                target = random.choice(available_targets)
-                logger.debug(f"🧱 Кирпич: выбрана цель {target[1]} (ID: {target[0]})")
+                target = index.choice_excluding(rng, initiator_id)
+                logger.debug("🧱 Кирпич: выбрана цель %s (ID: %s)", target[1], target[0])
                 return [target]
             
             elif effect_type == 'bomb':
                 # Говнобомба - несколько случайных целей
-                num_targets = min(random.randint(3, 5), len(available_targets))
-                targets = random.sample(available_targets, num_targets)
-                target_names = [t[1] for t in targets]
-                logger.debug(f"💣 Говнобомба: выбрано {num_targets} целей: {target_names}")
+                num_targets = min(rng.randint(*MULTI_TARGETS), available_count)
+                targets = index.sample_excluding(rng, num_targets, initiator_id)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("💣 Говнобомба: выбрано %s целей: %s", num_targets, [t[1] for t in targets])
                 return targets
             
             elif effect_type == 'rain':
                 # Говнодождь - весь чат
-                logger.debug(f"🌧️ Говнодождь: весь чат ({len(available_targets)} участников) обосран")
-                return available_targets
+                logger.debug("🌧️ Говнодождь: весь чат (%s участников) обосран", available_count)
+                return index.others(initiator_id)
             
             elif effect_type in ['lightning', 'fire', 'ice', 'rainbow', 'theater', 'circus', 'art', 'music', 'movie', 'game']:
                 # Остальные особые эффекты - случайная цель
-                target = random.choice(available_targets)
-                logger.debug(f"🎭 Особый эффект {effect_type}: выбрана цель {target[1]} (ID: {target[0]})")
+                target = index.choice_excluding(rng, initiator_id)
+                logger.debug("🎭 Особый эффект %s: выбрана цель %s (ID: %s)", effect_type, target[1], target[0])
                 return [target]
         
         elif outcome == 'critical':
             # Критическое попадание - одна цель с максимальным уроном
-            target = random.choice(available_targets)
-            logger.debug(f"💥 Критическое попадание: выбрана цель {target[1]} (ID: {target[0]})")
+            target = index.choice_excluding(rng, initiator_id)
+            logger.debug("💥 Критическое попадание: выбрана цель %s (ID: %s)", target[1], target[0])
             return [target]
         
         elif outcome == 'combo':
             # Комбо-эффект - несколько целей (3-5)
-            num_targets = min(random.randint(3, 5), len(available_targets))
-            targets = random.sample(available_targets, num_targets)
-            target_names = [t[1] for t in targets]
-            logger.debug(f"🔄 Комбо: выбрано {num_targets} целей: {target_names}")
+            num_targets = min(rng.randint(*MULTI_TARGETS), available_count)
+            targets = index.sample_excluding(rng, num_targets, initiator_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔄 Комбо: выбрано %s целей: %s", num_targets, [t[1] for t in targets])
             return targets
         
         elif outcome == 'legendary':
             # Легендарный исход - весь чат
-            logger.debug(f"👑 Легендарный исход: весь чат ({len(available_targets)} участников) обосран")
-            return available_targets
+            logger.debug("👑 Легендарный исход: весь чат (%s участников) обосран", available_count)
+            return index.others(initiator_id)
         
-        logger.debug(f"🎯 Возвращаем одну случайную цель")
-        return available_targets[:1]
+        logger.debug("🎯 Возвращаем одну случайную цель")
+        return [next(p for p in index if p[0] != initiator_id)]
     
     def format_targets_text(self, targets: List[Tuple[int, str]]) -> str:
         """Форматирование списка целей в текст"""
@@ -450,139 +863,301 @@ class GameLogic:
             logger.debug("📝 Форматирование целей: список пуст")
             return "никого"
         
+        # Массовый исход: первые render_limit упоминаний и «и ещё N» — сообщение не растёт с чатом
+        limit = MASS_OUTCOME_SETTINGS['render_limit']
+        hidden = len(targets) - limit if len(targets) > limit else 0
         # Добавляем @ к каждому имени пользователя
-        usernames = [f"@{target[1]}" if target[1] else f"@user{target[0]}" for target in targets]
+        usernames = [f"@{target[1]}" if target[1] else f"@user{target[0]}"
+                     for target in (targets[:limit] if hidden else targets)]
         
-        if len(usernames) == 1:
+        if hidden:
+            result = f"{', '.join(usernames)} и ещё {hidden}"
+        elif len(usernames) == 1:
             result = usernames[0]
         elif len(usernames) == 2:
             result = f"{usernames[0]} и {usernames[1]}"
         else:
             result = f"{', '.join(usernames[:-1])} и {usernames[-1]}"
         
-        logger.debug(f"📝 Форматирование целей: {result}")
+        logger.debug("📝 Форматирование целей: %s", result)
+        return result
+    
+    # ---------------------- Броски ----------------------
+    def _outcome_message(self, rng: SplitMix64, render: bool, outcome: str, initiator_username: str,
+                         targets: Optional[List[Tuple[int, str]]] = None) -> Optional[str]:
+        """Сообщение исхода (с целями, если они переданы) из потока чата rng.
+        Без рендера только пропускает выборку шаблона в потоке — дальше поток тот же"""
+        if not render:
+            rng.jump(1)
+            return None
+        if targets is None:
+            return self.get_random_message(outcome, rng=rng, initiator=initiator_username)
+        return self.get_random_message(outcome, rng=rng, initiator=initiator_username,
+                                       targets=self.format_targets_text(targets))
+
+    def _cooldown_record(self, initiator_id: int, initiator_username: str, chat_id: int,
+                         render: bool) -> ThrowRecord:
+        message = (f"⏰ {initiator_username}, подожди ещё немного перед следующим броском!"
+                   if render else None)
+        return ThrowRecord('cooldown', initiator_id, chat_id, [(initiator_id, initiator_username)],
+                           error='cooldown', message=message)
+
+    def _throw(self, initiator_id: int, initiator_username: str,
+               participants: Union[ParticipantIndex, List[Tuple[int, str]]], chat_id: int,
+               now: float, render: bool) -> ThrowRecord:
+        """Случайный бросок: состояние игры, исход и цели одной записью"""
+        # Истёкшие роли и дебаффы снимаются до расчёта
+        self.advance_timers(now)
+        chat = self._chat(chat_id, now)
+        rng_seed, rng_seq = self.rng_streams.load(chat_id, chat.stream)
+        rng = self.rng_streams.rng
+        
+        # Проверяем кулдаун
+        if self.check_cooldown(initiator_id, now, chat_id=chat_id):
+            return self._cooldown_record(initiator_id, initiator_username, chat_id, render)
+        
+        # Назначаем роль, если её нет
+        if not self.get_user_role(initiator_id, chat_id=chat_id):
+            role = self.assign_random_role(initiator_id, now, chat_id=chat_id)
+            logger.info("🎭 Пользователю %s назначена роль: %s", initiator_username, role)
+        
+        # Обновляем время последнего броска
+        self.record_throw(initiator_id, now, chat_id=chat_id)
+        
+        # Определяем исход
+        outcome = self.determine_outcome(initiator_id, chat_id=chat_id, now=now)
+        
+        # Выбираем цели
+        targets = self.select_targets(participants, initiator_id, outcome, rng)
+        # Хук роли после выбора целей (магнит: первый удар по новой цели +1 к фокусу)
+        strategy = self.get_role_strategy(initiator_id, chat_id=chat_id)
+        if strategy.on_throw:
+            strategy.on_throw(self, initiator_id, targets, chat_id, now)
+        
+        # Обновляем счетчики комбо и серий (запись игрока ищется один раз на все счётчики)
+        player = chat.players.touch(initiator_id, now)
+        combo_count = self.update_combo_counter(initiator_id, outcome, player)
+        streak_count = self.update_streak_counter(initiator_id, outcome, player)
+        
+        # Обновляем heat и счёт
+        self.update_user_heat(initiator_id, 2, player, now)  # +2 heat за бросок (поверх остывшего)
+        score_delta = 0
+        if outcome == 'direct_hit':
+            score_delta = 10
+        elif outcome == 'miss':
+            score_delta = -5
+        # Камбэк — по месту в чате до броска, умножает только выигрыш
+        comeback_bonus = self._comeback_bonus(chat.scores, player.score, initiator_id)
+        if score_delta > 0 and self.comeback_enabled:
+            score_delta = round(score_delta * comeback_bonus)
+        self.update_user_score(initiator_id, score_delta, player, chat_id=chat_id)
+        
+        # Получаем текущую роль для публичных сигналов
+        current_role = player.role
+        
+        # Формируем сообщение: промах и бумеранг — без целей в тексте
+        if outcome == 'miss' or (outcome == 'special' and len(targets) == 1 and targets[0][0] == initiator_id):
+            message = self._outcome_message(rng, render, outcome, initiator_username)
+        else:
+            message = self._outcome_message(rng, render, outcome, initiator_username, targets)
+        
+        return ThrowRecord(outcome, initiator_id, chat_id, targets,
+                           role=current_role,
+                           combo_count=combo_count,
+                           streak_count=streak_count,
+                           heat=player.heat,
+                           score_delta=score_delta,
+                           comeback_bonus=comeback_bonus,
+                           rng_seed=rng_seed,
+                           rng_seq=rng_seq,
+                           message=message,
+                           public_signals=self.generate_public_signals(initiator_id, targets, chat_id, current_role,
+                                                                       initiator_username, render=render, now=now))
+    
+    def _throw_at_target(self, initiator_id: int, initiator_username: str,
+                         target_id: int, target_username: str, chat_id: int,
+                         now: float, render: bool, skip_cooldown: bool) -> ThrowRecord:
+        """Целевой бросок: состояние игры, исход и цели одной записью"""
+        # Истёкшие роли и дебаффы снимаются до расчёта
+        self.advance_timers(now)
+        chat = self._chat(chat_id, now)
+        rng_seed, rng_seq = self.rng_streams.load(chat_id, chat.stream)
+        rng = self.rng_streams.rng
+        
+        # Проверяем кулдаун (можно пропустить для внутреннего редиректа)
+        if not skip_cooldown and self.check_cooldown(initiator_id, now, chat_id=chat_id):
+            return self._cooldown_record(initiator_id, initiator_username, chat_id, render)
+        
+        # Проверяем, не является ли цель самим метателем
+        if target_id == initiator_id:
+            message = f"🤡 {initiator_username}, нельзя метать говно в самого себя!" if render else None
+            return ThrowRecord('self_target', initiator_id, chat_id, [(initiator_id, initiator_username)],
+                               error='self_target', message=message)
+        
+        # Назначаем роль, если её нет
+        if not self.get_user_role(initiator_id, chat_id=chat_id):
+            role = self.assign_random_role(initiator_id, now, chat_id=chat_id)
+            logger.info("🎭 Пользователю %s назначена роль: %s", initiator_username, role)
+        
+        # Обновляем время последнего броска (не пишем при внутреннем редиректе)
+        if not skip_cooldown:
+            self.record_throw(initiator_id, now, chat_id=chat_id)
+        
+        # Обновляем фокус на цель; перефокус вешает (продлевает) штраф
+        focus_penalty_started = self.update_focus_stacks(initiator_id, target_id, chat_id, now) > FOCUS_PENALTY_STACKS
+        if focus_penalty_started:
+            self.start_focus_penalty(initiator_id, target_id, chat_id, now)
+        
+        # Рассчитываем шанс прямого попадания (новая логика точности)
+        hit_chance = self.compute_hit_chance(is_targeted=True,
+                                             initiator_id=initiator_id,
+                                             target_id=target_id,
+                                             chat_id=chat_id,
+                                             now=now)
+        roll = rng.random()
+        strategy = self.get_role_strategy(initiator_id, chat_id=chat_id)
+        role_now = strategy.key
+        if strategy.on_targeted_throw:
+            # Саботажник: дебафф промаха на цель
+            strategy.on_targeted_throw(self, initiator_id, target_id, chat_id, now)
+
+        # Спец-эффекты роли до применения исхода (телепортер — кирпич, трикстер — бумеранг)
+        forced_special = (strategy.forced_special is not None
+                          and rng.random() < strategy.forced_special_chance)
+        special_effect = strategy.forced_special if forced_special else None
+
+        # Определяем исход на основе шанса попадания
+        if not forced_special:
+            if roll < hit_chance:
+                outcome = 'direct_hit'
+            else:
+                # Промах может конвертироваться в splash у некоторых ролей
+                if strategy.miss_to_splash and rng.random() < strategy.miss_to_splash:
+                    outcome = 'splash'
+                else:
+                    outcome = 'miss'
+        else:
+            outcome = 'special'
+        
+        # Обновляем счетчики комбо и серий (запись игрока ищется один раз на все счётчики)
+        player = chat.players.touch(initiator_id, now)
+        combo_count = self.update_combo_counter(initiator_id, outcome, player)
+        streak_count = self.update_streak_counter(initiator_id, outcome, player)
+        
+        # Обновляем heat и счёт
+        self.update_user_heat(initiator_id, 3, player, now)  # +3 heat за целевой бросок (поверх остывшего)
+        score_delta = 0
+        if outcome == 'direct_hit':
+            score_delta = 15
+        elif outcome == 'miss':
+            score_delta = -10
+        # Камбэк — по месту в чате до броска, умножает только выигрыш
+        comeback_bonus = self._comeback_bonus(chat.scores, player.score, initiator_id)
+        if score_delta > 0 and self.comeback_enabled:
+            score_delta = round(score_delta * comeback_bonus)
+        self.update_user_score(initiator_id, score_delta, player, chat_id=chat_id)
+        
+        # Получаем текущую роль для публичных сигналов
+        current_role = player.role
+        
+        # Формируем сообщение в зависимости от исхода
+        if outcome == 'miss':
+            targets = [(initiator_id, initiator_username)]
+            # Русское явное сообщение о промахе по цели (фраза без роли — выборка из пула)
+            if render:
+                message = self._pick_miss_text(target_username, role_now, rng)
+            else:
+                message = None
+                if not role_strategy(role_now).miss_text:
+                    rng.jump(1)
+        
+        elif outcome == 'special':
+            # Особые эффекты для целевого броска
+            effect_type = special_effect or rng.choice(TARGETED_SPECIAL_EFFECTS)
+            logger.debug("⚡ Особый эффект для целевого броска: %s", effect_type)
+            
+            if effect_type == 'boomerang':
+                targets = [(initiator_id, initiator_username)]
+                message = self._outcome_message(rng, render, outcome, initiator_username)
+            else:
+                # Лавина, кирпич и бомба целевого броска бьют только по цели
+                targets = [(target_id, target_username)]
+                message = self._outcome_message(rng, render, outcome, initiator_username, targets)
+        
+        else:
+            # Прямое попадание и splash (разлетелось) — по цели
+            targets = [(target_id, target_username)]
+            message = self._outcome_message(rng, render, outcome, initiator_username, targets)
+        
+        return ThrowRecord(outcome, initiator_id, chat_id, targets,
+                           role=current_role,
+                           combo_count=combo_count,
+                           streak_count=streak_count,
+                           heat=player.heat,
+                           focus_stacks=self.get_focus_stacks(initiator_id, target_id, chat_id),
+                           focus_penalty=focus_penalty_started,
+                           score_delta=score_delta,
+                           comeback_bonus=comeback_bonus,
+                           rng_seed=rng_seed,
+                           rng_seq=rng_seq,
+                           message=message,
+                           public_signals=self.generate_public_signals(initiator_id, targets, chat_id, current_role,
+                                                                       initiator_username, render=render, now=now))
+    
+    def _result_dict(self, record: ThrowRecord, targeted: bool) -> Dict:
+        """Результат броска в формате process_throw / process_throw_at_target"""
+        if record.error:
+            return {
+                'outcome': record.outcome,
+                'message': record.message,
+                'targets': record.targets,
+                'initiator_id': record.initiator_id,
+                'chat_id': record.chat_id,
+                'error': record.error
+            }
+        result = {
+            'outcome': record.outcome,
+            'message': record.message,
+            'targets': record.targets,
+            'initiator_id': record.initiator_id,
+            'chat_id': record.chat_id,
+            'combo_count': record.combo_count,
+            'streak_count': record.streak_count,
+            'combo_bonus': self.get_combo_bonus(record.combo_count),
+            'streak_bonus': self.get_streak_bonus(record.streak_count),
+            'comeback_bonus': record.comeback_bonus,
+            # Новые поля для расширенной механики
+            'role_used': record.role,
+            'heat_at_throw': record.heat,
+            'focus_stacks': record.focus_stacks,  # у случайного броска — 0, обновляется в bot.py
+        }
+        if targeted:
+            result['focus_penalty'] = record.focus_penalty
+        result['score_delta'] = record.score_delta
+        result['rng_seed'] = record.rng_seed
+        result['rng_seq'] = record.rng_seq
+        result['public_signals'] = record.public_signals
+        # Флаг для последующего редиректа на случайную цель при промахе
+        if targeted and record.outcome == 'miss':
+            result['redirect_random'] = True
         return result
     
     def process_throw(self, initiator_id: int, initiator_username: str,
-                     participants: List[Tuple[int, str]], chat_id: int) -> Dict:
+                     participants: Union[ParticipantIndex, List[Tuple[int, str]]], chat_id: int) -> Dict:
         """Обработка броска говна"""
         try:
-            logger.info(f"💩 Обработка броска: {initiator_username} (ID: {initiator_id}) в чате {chat_id}")
-            logger.debug(f"👥 Участники чата: {len(participants)}")
-            
-            # Проверяем кулдаун
-            if self.check_cooldown(initiator_id):
-                return {
-                    'outcome': 'cooldown',
-                    'message': f"⏰ {initiator_username}, подожди ещё немного перед следующим броском!",
-                    'targets': [(initiator_id, initiator_username)],
-                    'initiator_id': initiator_id,
-                    'chat_id': chat_id,
-                    'error': 'cooldown'
-                }
-            
-            # Назначаем роль, если её нет
-            if not self.get_user_role(initiator_id):
-                role = self.assign_random_role(initiator_id)
-                logger.info(f"🎭 Пользователю {initiator_username} назначена роль: {role}")
-            
-            # Обновляем время последнего броска
-            self.record_throw(initiator_id)
-            
-            # Определяем исход
-            outcome = self.determine_outcome(initiator_id)
-            
-            # Выбираем цели
-            targets = self.select_targets(participants, initiator_id, outcome)
-            # Магнит: первый удар по новой цели +1 к фокусу, а при stacks>2 шанс прямого попадания выше учли выше
-            role_now = self.get_user_role(initiator_id)
-            if role_now == 'magnet' and targets:
-                t_id = targets[0][0]
-                key = (initiator_id, t_id, chat_id)
-                if self.focus_stacks.get(key, 0) == 0:
-                    self.focus_stacks[key] = 1
-                    logger.debug(f"🧲 Магнит: мгновенно дал 1 stack фокуса на {t_id}")
-            
-            # Обновляем счетчики комбо и серий
-            combo_count = self.update_combo_counter(initiator_id, outcome)
-            streak_count = self.update_streak_counter(initiator_id, outcome)
-            
-            # Обновляем heat и счёт
-            self.update_user_heat(initiator_id, 2)  # +2 heat за бросок
-            score_delta = 0
-            if outcome == 'direct_hit':
-                score_delta = 10
-            elif outcome == 'miss':
-                score_delta = -5
-            self.update_user_score(initiator_id, score_delta)
-            
-            # Получаем текущую роль для публичных сигналов
-            current_role = self.get_user_role(initiator_id)
+            logger.info("💩 Обработка броска: %s (ID: %s) в чате %s", initiator_username, initiator_id, chat_id)
+            logger.debug("👥 Участники чата: %s", len(participants))
             
-            # Формируем сообщение
-            if outcome == 'direct_hit':
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
+            # Часы читаются один раз на бросок
+            record = self._throw(initiator_id, initiator_username, participants, chat_id,
+                                 self.clock.now(), render=True)
+            result = self._result_dict(record, targeted=False)
+            if record.error:
+                return result
             
-            elif outcome == 'miss':
-                message = self.get_random_message(outcome, initiator=initiator_username)
-            
-            elif outcome == 'splash':
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            elif outcome == 'special':
-                if len(targets) == 1 and targets[0][0] == initiator_id:
-                    # Бумеранг или сам себя обосрал
-                    message = self.get_random_message(outcome, initiator=initiator_username)
-                else:
-                    targets_text = self.format_targets_text(targets)
-                    message = self.get_random_message(outcome, 
-                                                   initiator=initiator_username,
-                                                   targets=targets_text)
-            
-            elif outcome == 'critical':
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            elif outcome == 'combo':
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            elif outcome == 'legendary':
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            result = {
-                'outcome': outcome,
-                'message': message,
-                'targets': targets,
-                'initiator_id': initiator_id,
-                'chat_id': chat_id,
-                'combo_count': combo_count,
-                'streak_count': streak_count,
-                'combo_bonus': self.get_combo_bonus(combo_count),
-                'streak_bonus': self.get_streak_bonus(streak_count),
-                # Новые поля для расширенной механики
-                'role_used': current_role,
-                'heat_at_throw': self.user_heat.get(initiator_id, 0),
-                'focus_stacks': 0,  # Будет обновлено в bot.py
-                'score_delta': score_delta,
-                'public_signals': self.generate_public_signals(initiator_id, targets, chat_id, current_role, initiator_username)
-            }
-            
-            logger.info(f"✅ Бросок обработан: {outcome} -> {len(targets)} целей")
-            logger.debug(f"📊 Результат: {result}")
+            logger.info("✅ Бросок обработан: %s -> %s целей", record.outcome, len(record.targets))
+            logger.debug("📊 Результат: %s", result)
             
             return result
             
@@ -601,171 +1176,17 @@ class GameLogic:
                                *, skip_cooldown: bool = False) -> Dict:
         """Обработка броска говна в конкретную цель"""
         try:
-            logger.info(f"💩 Целевой бросок: {initiator_username} (ID: {initiator_id}) -> {target_username} (ID: {target_id}) в чате {chat_id}")
-            
-            # Проверяем кулдаун (можно пропустить для внутреннего редиректа)
-            if not skip_cooldown and self.check_cooldown(initiator_id):
-                return {
-                    'outcome': 'cooldown',
-                    'message': f"⏰ {initiator_username}, подожди ещё немного перед следующим броском!",
-                    'targets': [(initiator_id, initiator_username)],
-                    'initiator_id': initiator_id,
-                    'chat_id': chat_id,
-                    'error': 'cooldown'
-                }
-            
-            # Проверяем, не является ли цель самим метателем
-            if target_id == initiator_id:
-                return {
-                    'outcome': 'self_target',
-                    'message': f"🤡 {initiator_username}, нельзя метать говно в самого себя!",
-                    'targets': [(initiator_id, initiator_username)],
-                    'initiator_id': initiator_id,
-                    'chat_id': chat_id,
-                    'error': 'self_target'
-                }
-            
-            # Назначаем роль, если её нет
-            if not self.get_user_role(initiator_id):
-                role = self.assign_random_role(initiator_id)
-                logger.info(f"🎭 Пользователю {initiator_username} назначена роль: {role}")
+            logger.info("💩 Целевой бросок: %s (ID: %s) -> %s (ID: %s) в чате %s", initiator_username, initiator_id, target_username, target_id, chat_id)
             
-            # Обновляем время последнего броска (не пишем при внутреннем редиректе)
-            if not skip_cooldown:
-                self.record_throw(initiator_id)
+            # Часы читаются один раз на бросок
+            record = self._throw_at_target(initiator_id, initiator_username, target_id, target_username, chat_id,
+                                           self.clock.now(), render=True, skip_cooldown=skip_cooldown)
+            result = self._result_dict(record, targeted=True)
+            if record.error:
+                return result
             
-            # Обновляем фокус на цель
-            self.update_focus_stacks(initiator_id, target_id, chat_id)
-            
-            # Применяем штраф за фокус
-            focus_penalty = self.calculate_focus_penalty(initiator_id, target_id, chat_id)
-            
-            # Рассчитываем шанс прямого попадания (новая логика точности)
-            hit_chance = self.compute_hit_chance(is_targeted=True,
-                                                 initiator_id=initiator_id,
-                                                 target_id=target_id,
-                                                 chat_id=chat_id)
-            roll = random.random()
-            role_now = self.get_user_role(initiator_id)
-            if role_now == 'saboteur':
-                # Вешаем на цель дебафф промаха +30% на один ход
-                self.user_debuffs[target_id] = {
-                    'miss_bonus': 0.3,
-                    'expires_at': datetime.now() + timedelta(seconds=ROLE_DURATION/6)
-                }
-
-            # Спец-эффекты до применения исхода
-            forced_special = False
-            special_effect = None
-            if role_now == 'teleporter' and random.random() < 0.08:
-                forced_special = True
-                special_effect = 'brick'
-            elif role_now == 'trickster' and random.random() < 0.10:
-                forced_special = True
-                special_effect = 'boomerang'
-
-            # Определяем исход на основе шанса попадания
-            if not forced_special:
-                if roll < hit_chance:
-                    outcome = 'direct_hit'
-                else:
-                    # Промах может конвертироваться в splash у некоторых ролей
-                    if role_now in ('bombardier', 'rocketeer') and random.random() < 0.20:
-                        outcome = 'splash'
-                    else:
-                        outcome = 'miss'
-            else:
-                outcome = 'special'
-            
-            # Обновляем счетчики комбо и серий
-            combo_count = self.update_combo_counter(initiator_id, outcome)
-            streak_count = self.update_streak_counter(initiator_id, outcome)
-            
-            # Обновляем heat и счёт
-            self.update_user_heat(initiator_id, 3)  # +3 heat за целевой бросок
-            score_delta = 0
-            if outcome == 'direct_hit':
-                score_delta = 15
-            elif outcome == 'miss':
-                score_delta = -10
-            self.update_user_score(initiator_id, score_delta)
-            
-            # Получаем текущую роль для публичных сигналов
-            current_role = self.get_user_role(initiator_id)
-            
-            # Формируем сообщение в зависимости от исхода
-            if outcome == 'direct_hit':
-                targets = [(target_id, target_username)]
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            elif outcome == 'miss':
-                targets = [(initiator_id, initiator_username)]
-                # Русское явное сообщение о промахе по цели
-                message = self._pick_miss_text(target_username, role_now)
-            
-            elif outcome == 'splash':
-                # Разлетелось - цель + случайные дополнительные
-                targets = [(target_id, target_username)]
-                # Здесь можно добавить логику для дополнительных целей
-                targets_text = self.format_targets_text(targets)
-                message = self.get_random_message(outcome, 
-                                               initiator=initiator_username,
-                                               targets=targets_text)
-            
-            elif outcome == 'special':
-                # Особые эффекты для целевого броска
-                effect_type = special_effect or random.choice(['boomerang', 'avalanche', 'brick', 'bomb'])
-                logger.debug(f"⚡ Особый эффект для целевого броска: {effect_type}")
-                
-                if effect_type == 'boomerang':
-                    targets = [(initiator_id, initiator_username)]
-                    message = self.get_random_message(outcome, initiator=initiator_username)
-                elif effect_type == 'avalanche':
-                    targets = [(target_id, target_username)]
-                    targets_text = self.format_targets_text(targets)
-                    message = self.get_random_message(outcome, 
-                                                   initiator=initiator_username,
-                                                   targets=targets_text)
-                elif effect_type == 'brick':
-                    targets = [(target_id, target_username)]
-                    targets_text = self.format_targets_text(targets)
-                    message = self.get_random_message(outcome, 
-                                                   initiator=initiator_username,
-                                                   targets=targets_text)
-                elif effect_type == 'bomb':
-                    targets = [(target_id, target_username)]
-                    targets_text = self.format_targets_text(targets)
-                    message = self.get_random_message(outcome, 
-                                                   initiator=initiator_username,
-                                                   targets=targets_text)
-            
-            result = {
-                'outcome': outcome,
-                'message': message,
-                'targets': targets,
-                'initiator_id': initiator_id,
-                'chat_id': chat_id,
-                'combo_count': combo_count,
-                'streak_count': streak_count,
-                'combo_bonus': self.get_combo_bonus(combo_count),
-                'streak_bonus': self.get_streak_bonus(streak_count),
-                # Новые поля для расширенной механики
-                'role_used': current_role,
-                'heat_at_throw': self.user_heat.get(initiator_id, 0),
-                'focus_stacks': self.focus_stacks.get((initiator_id, target_id, chat_id), 0),
-                'score_delta': score_delta,
-                'public_signals': self.generate_public_signals(initiator_id, targets, chat_id, current_role, initiator_username)
-            }
-
-            # Флаг для последующего редиректа на случайную цель при промахе
-            if outcome == 'miss':
-                result['redirect_random'] = True
-            
-            logger.info(f"✅ Целевой бросок обработан: {outcome} -> {target_username}")
-            logger.debug(f"📊 Результат: {result}")
+            logger.info("✅ Целевой бросок обработан: %s -> %s", record.outcome, target_username)
+            logger.debug("📊 Результат: %s", result)
             
             return result
             
@@ -779,116 +1200,61 @@ class GameLogic:
                 'chat_id': chat_id
             }
     
+    def process_throws(self, requests: Iterable[ThrowRequest], *, render: bool = False) -> List[ThrowRecord]:
+        """Пакет бросков по порядку — для повторов, симуляций и дозаливки событий.
+
+        Каждый бросок проходит тот же путь, что process_throw / process_throw_at_target,
+        и тратит столько же выборок потока чата, но возвращает компактную ThrowRecord вместо
+        словаря и не пишет лог на каждый бросок. Без render текст сообщений и сигналов
+        не собирается (message и public_signals — None): выборки шаблонов только
+        пропускаются в потоке, так что исходы, цели и состояние те же, что с рендером.
+        request.at (если задан) переводит часы на момент броска — для VirtualClock.
+        Ошибка броска, как и в одиночных вызовах, даёт промах метателя с error='exception'.
+        """
+        clock = self.clock
+        records = []
+        append = records.append
+        for request in requests:
+            if request.at is not None:
+                clock.set(request.at)
+            try:
+                if request.target_id is None:
+                    record = self._throw(request.initiator_id, request.initiator_username, request.participants,
+                                         request.chat_id, clock.now(), render)
+                else:
+                    record = self._throw_at_target(request.initiator_id, request.initiator_username,
+                                                   request.target_id, request.target_username, request.chat_id,
+                                                   clock.now(), render, request.skip_cooldown)
+            except Exception as e:
+                logger.error(f"❌ Ошибка броска в пакете: {e}")
+                record = ThrowRecord('miss', request.initiator_id, request.chat_id,
+                                     [(request.initiator_id, request.initiator_username)], error='exception')
+            append(record)
+        logger.info("📦 Пакет бросков обработан: %s", len(records))
+        return records
+    
     # ---------------------- Публичные сигналы ----------------------
     def generate_public_signals(self, initiator_id: int, targets: List[Tuple[int, str]], 
-                               chat_id: int, role: Optional[str], initiator_username: Optional[str] = None) -> Dict[str, Any]:
-        """Генерирует публичные сигналы после броска"""
-        signals = {
-            'initiator_role': role,
-            'heat_status': self.user_heat.get(initiator_id, 0),
-            'under_fire_candidates': [],
-            'call_to_action': '',
-            'focus_warning': False,
-            'initiator_username': initiator_username or '',
-            'callouts': []
-        }
-        
-        # Определяем кандидата "под прицелом" всегда: 
+                               chat_id: int, role: Optional[str], initiator_username: Optional[str] = None,
+                               *, render: bool = True, now: Optional[float] = None) -> Optional[PublicSignals]:
+        """Публичные сигналы после броска (тексты собираются при первом обращении, см. rendering.PublicSignals).
+        render=False — без сигналов (None), выборки фраз только пропускаются в потоке чата"""
+        chat = self._chat(chat_id, now)
+        heat = self.get_user_heat(initiator_id, chat_id=chat_id, now=now)
+        # Кандидат "под прицелом" всегда: 
         # - если есть жертвы, берём первую НЕ инициатора; 
         # - если только сам метатель пострадал (miss), делаем его кандидатом (позвать на реванш);
-        picked = None
+        victim = None
+        focus_stacks = 0
         if targets:
-            # Найдём первую жертву, отличную от инициатора
-            non_self = [t for t in targets if t[0] != initiator_id]
-            chosen = non_self[0] if non_self else targets[0]
-            target_id = chosen[0]
-            signals['under_fire_candidates'].append({
-                'user_id': target_id,
-                'username': chosen[1],
-                'can_retaliate': True,
-                'focus_stacks': self.focus_stacks.get((initiator_id, target_id, chat_id), 0)
-            })
-            picked = signals['under_fire_candidates'][0]
-            # Предупреждение о фокусе
-            if picked['focus_stacks'] > 2:
-                signals['focus_warning'] = True
-        
-        # Формируем призыв к действию
-        if signals['under_fire_candidates']:
-            target = signals['under_fire_candidates'][0]
-            if target['can_retaliate']:
-                # Предлагаем ответить на инициатора
-                reply_to = signals.get('initiator_username') or 'initiator'
-                stacks = target['focus_stacks']
-                # Пул агрессивных ироничных саркастичных фраз для ответки метателю
-                retaliate_pool = [
-                    f"метай в /go@{reply_to} а ну покажи что ты умеешь, трус!",
-                    f"метай в /go@{reply_to} верни говно обратно, если не боишься!",
-                    f"метай в /go@{reply_to} ты это видел? докажи что ты не тряпка!",
-                    f"метай в /go@{reply_to} месть подана холодной, но ты же не замерзнешь?",
-                    f"метай в /go@{reply_to} пора показать кто тут главный, а не прятаться!",
-                    f"метай в /go@{reply_to} не держи в себе, выплесни всю злость!",
-                    f"метай в /go@{reply_to} проведи воспитательную работу, если хватит смелости!",
-                    f"метай в /go@{reply_to} твоя очередь сиять, или ты предпочитаешь молчать?",
-                    f"метай в /go@{reply_to} джентльмены не промахиваются, а ты кто?",
-                    f"метай в /go@{reply_to} возьми перчатку… и кинь обратно, если не струсишь!",
-                    f"метай в /go@{reply_to} покажи что ты не просто болтун!",
-                    f"метай в /go@{reply_to} докажи что у тебя есть яйца!",
-                    f"метай в /go@{reply_to} не будь тряпкой, ответь как мужчина!",
-                    f"метай в /go@{reply_to} ты же не будешь терпеть такое унижение?",
-                    f"метай в /go@{reply_to} покажи что ты не просто пустозвон!",
-                    f"метай в /go@{reply_to} докажи что ты не трус и не подкаблучник!",
-                    f"метай в /go@{reply_to} не прячься за спинами, ответь!",
-                    f"метай в /go@{reply_to} ты же не будешь молчать как рыба?",
-                    f"метай в /go@{reply_to} покажи что у тебя есть характер!",
-                    f"метай в /go@{reply_to} докажи что ты не просто болтун и хвастун!",
-                ]
-                
-                # Пул всратых фраз вместо "может ответить!"
-                response_phrases = [
-                    "готов к ответке?",
-                    "может дать сдачи?",
-                    "готов к реваншу?",
-                    "может отомстить?",
-                    "готов к контратаке?",
-                    "может дать по рогам?",
-                    "готов к дуэли?",
-                    "может показать кузькину мать?",
-                    "готов к разборкам?",
-                    "может дать по шапке?",
-                    "готов к выяснению отношений?",
-                    "может показать кто тут главный?",
-                    "готов к разбору полетов?",
-                    "может дать по мозгам?",
-                    "готов к выяснению кто прав?",
-                    "может показать мастер-класс?",
-                    "готов к уроку вежливости?",
-                    "может дать по зубам?",
-                    "готов к воспитательному процессу?",
-                    "может показать как надо?",
-                ]
-                # Фразы про фокус
-                if stacks > 2:
-                    signals['focus_warning'] = True
-                    signals['callouts'].append(
-                        f"@{target['username']} под прицелом! Фокус: {stacks}"
-                    )
-                # Heat callouts (порог 20)
-                heat = signals['heat_status']
-                if isinstance(heat, int) and heat >= 20:
-                    heat_pool = [
-                        f"Агрессор перегрелся ({heat}/100). Остуди его: /go@{reply_to}",
-                        f"Воняет от смелости ({heat}/100). Пора умыть: /go@{reply_to}",
-                    ]
-                    signals['callouts'].append(random.choice(heat_pool))
-                # Основной призыв — случайная ответка
-                retaliate_phrase = random.choice(retaliate_pool)
-                response_phrase = random.choice(response_phrases)
-                # Добавляем информацию о том, кто на кого нападал
-                signals['callouts'].append(f"💥 @{signals.get('initiator_username', 'initiator')} атаковал @{target['username']}")
-                signals['call_to_action'] = f"🎯 @{target['username']} {response_phrase} {retaliate_phrase}"
-        
-        return signals
+            victim = next((t for t in targets if t[0] != initiator_id), targets[0])
+        # Выборки фраз пропускаем в потоке чата сейчас, а делаем при сборке из сохранённого состояния
+        rng_state = self._chat_rng(chat).jump(PublicSignals.draws(victim, heat))
+        if not render:
+            return None
+        if victim is not None:
+            focus_stacks = chat.focus.get(initiator_id, victim[0])
+        return PublicSignals(self.renderer, rng_state, role, heat, initiator_username, victim, focus_stacks)
     
     def get_emoji_for_outcome(self, outcome: str) -> str:
         """Получение эмодзи для исхода"""
@@ -904,36 +1270,36 @@ class GameLogic:
             'self_target': '🤡'
         }
         emoji = emojis.get(outcome, '💩')
-        logger.debug(f"😀 Эмодзи для исхода {outcome}: {emoji}")
+        logger.debug("😀 Эмодзи для исхода %s: %s", outcome, emoji)
         return emoji
     
-    def update_combo_counter(self, user_id: int, outcome: str) -> int:
-        """Обновление счетчика комбо для пользователя"""
-        if user_id not in self.combo_counters:
-            self.combo_counters[user_id] = 0
+    def update_combo_counter(self, user_id: int, outcome: str, player: Optional[PlayerState] = None, *,
+                             chat_id: Optional[int] = None) -> int:
+        """Обновление счетчика комбо для пользователя (player — уже полученная запись, иначе — в чате chat_id)"""
+        player = player or self.get_player(user_id, chat_id=chat_id)
         
         if outcome in ['direct_hit', 'critical', 'combo']:
-            self.combo_counters[user_id] += 1
-            logger.debug(f"🔄 Комбо для пользователя {user_id}: {self.combo_counters[user_id]}")
+            player.combo += 1
+            logger.debug("🔄 Комбо для пользователя %s: %s", user_id, player.combo)
         else:
-            self.combo_counters[user_id] = 0
-            logger.debug(f"🔄 Сброс комбо для пользователя {user_id}")
+            player.combo = 0
+            logger.debug("🔄 Сброс комбо для пользователя %s", user_id)
         
-        return self.combo_counters[user_id]
+        return player.combo
     
-    def update_streak_counter(self, user_id: int, outcome: str) -> int:
-        """Обновление счетчика серий для пользователя"""
-        if user_id not in self.streak_counters:
-            self.streak_counters[user_id] = 0
+    def update_streak_counter(self, user_id: int, outcome: str, player: Optional[PlayerState] = None, *,
+                              chat_id: Optional[int] = None) -> int:
+        """Обновление счетчика серий для пользователя (player — уже полученная запись, иначе — в чате chat_id)"""
+        player = player or self.get_player(user_id, chat_id=chat_id)
         
         if outcome in ['direct_hit', 'critical', 'combo', 'legendary']:
-            self.streak_counters[user_id] += 1
-            logger.debug(f"🔥 Серия для пользователя {user_id}: {self.streak_counters[user_id]}")
+            player.streak += 1
+            logger.debug("🔥 Серия для пользователя %s: %s", user_id, player.streak)
         else:
-            self.streak_counters[user_id] = 0
-            logger.debug(f"🔥 Сброс серии для пользователя {user_id}")
+            player.streak = 0
+            logger.debug("🔥 Сброс серии для пользователя %s", user_id)
         
-        return self.streak_counters[user_id]
+        return player.streak
     
     def get_combo_bonus(self, combo_count: int) -> float:
         """Получение бонуса за комбо"""
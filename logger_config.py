@@ -45,7 +45,8 @@ class GovnometLogger:
             filename=self.log_dir / "govnomet.log",
             maxBytes=self.max_size_bytes,
             backupCount=5,  # Храним 5 файлов бэкапа
-            encoding='utf-8'
+            encoding='utf-8',
+            delay=True  # Файл открывается при первой записи
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
@@ -55,7 +56,8 @@ class GovnometLogger:
             filename=self.log_dir / "govnomet_errors.log",
             maxBytes=self.max_size_bytes,
             backupCount=3,  # Храним 3 файла бэкапа для ошибок
-            encoding='utf-8'
+            encoding='utf-8',
+            delay=True
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
@@ -156,6 +158,18 @@ def setup_logging(log_dir: str = "logs", max_size_mb: int = 2):
     govnomet_logger = GovnometLogger(log_dir, max_size_mb)
     return govnomet_logger
 
+def quiet(level: int = logging.WARNING):
+    """Для скриптов (самопроверки, бенчмарки, симулятор): логи ГовноМёт — с уровня level
+    и только в консоль, без записи в ротируемые файлы бота"""
+    root = logging.getLogger('govnomet')
+    for handler in root.handlers[:]:
+        if isinstance(handler, logging.FileHandler):
+            root.removeHandler(handler)
+            handler.close()
+    for name, item in list(logging.root.manager.loggerDict.items()):
+        if (name == 'govnomet' or name.startswith('govnomet.')) and isinstance(item, logging.Logger):
+            item.setLevel(level)
+
 # Пример использования
 if __name__ == "__main__":
     # Настройка логирования
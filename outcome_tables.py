@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Предрасчитанные таблицы исходов ГовноМёт
+
+Вместо пересчёта весов на каждый бросок (копия, модификаторы роли, жар, комбо,
+серия, нормализация, random.choices) все комбинации считаются один раз и
+хранятся как alias-таблицы Уолкера: бросок = один поиск в таблице + O(1) выборка.
+Шанс попадания по цели точно так же сведён в плоский массив HitChanceTable.
+Полная проверка таблиц — tests/test_outcome_tables.py и tests/test_hit_chance_baseline.py.
+"""
+
+import random
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+from roles import role_strategy
+
+# Пороги, на которых меняются веса исходов (см. GameLogic.compute_outcome_weights)
+HEAT_THRESHOLDS = (20, 50, 80)
+HEAT_BUCKET_FLOORS = (0,) + HEAT_THRESHOLDS  # представитель каждой корзины жара
+COMBO_TIER_MIN = 5
+STREAK_TIER_MIN = 10
+MAX_HEAT = 100
+MAX_FOCUS_STACKS = 3  # больше трёх стаков формула шанса попадания не различает
+
+def target_role_classes(roles: Sequence[Optional[str]]) -> Dict[str, int]:
+    """Роли цели, влияющие на шанс попадания (target_accuracy), по классам с 1; остальные — класс 0"""
+    affecting = [role for role in roles if role_strategy(role).target_accuracy]
+    return {role: i for i, role in enumerate(affecting, start=1)}
+
+def heat_bucket(heat: float) -> int:
+    """Номер корзины жара: [0,20), [20,50), [50,80), [80,100]"""
+    if heat < 20:
+        return 0
+    if heat < 50:
+        return 1
+    if heat < 80:
+        return 2
+    return 3
+
+class AliasTable:
+    """Дискретное распределение с выборкой за O(1) (метод alias Уолкера/Воуза)."""
+
+    __slots__ = ('outcomes', 'probabilities', 'prob', 'alias', 'n')
+
+    def __init__(self, outcomes: Sequence[str], weights: Sequence[float]):
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("Сумма весов должна быть положительной")
+        self.outcomes = tuple(outcomes)
+        self.probabilities = tuple(w / total for w in weights)
+        self.n = n = len(self.outcomes)
+
+        scaled = [p * n for p in self.probabilities]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Оставшиеся корзины (погрешность округления) заполнены целиком
+        self.prob = tuple(prob)
+        self.alias = tuple(alias)
+
+    def sample(self, rng: random.Random = random) -> str:
+        """Выборка исхода одним вызовом rng.random()"""
+        u = rng.random() * self.n
+        i = int(u)
+        if u - i >= self.prob[i]:
+            i = self.alias[i]
+        return self.outcomes[i]
+
+    def as_dict(self) -> Dict[str, float]:
+        """Точные вероятности исходов"""
+        return dict(zip(self.outcomes, self.probabilities))
+
+class OutcomeTables:
+    """Alias-таблицы для всех сочетаний (роль, корзина жара, комбо, серия, фокус коллектора).
+
+    weights_fn(role, heat, combo_count, streak_count, collector_focus, snot_double) -> веса
+    должна совпадать с живой логикой; шанс роли удвоить промах (double_miss_chance,
+    у сопли-снайпера 20%) сворачивается в смесь двух распределений, так что выборка остаётся одной.
+    Индекс роли в roles — её role_id, если roles идут в порядке реестра ролей.
+    """
+
+    def __init__(self, outcomes: Sequence[str], roles: Sequence[Optional[str]],
+                 weights_fn: Callable[..., List[float]], signature: tuple = ()):
+        self.outcomes = tuple(outcomes)
+        self.signature = signature
+        self.role_index = {role: i for i, role in enumerate(roles)}
+        self.tables: List[AliasTable] = []
+        for role in roles:
+            for heat in HEAT_BUCKET_FLOORS:
+                for combo in (0, COMBO_TIER_MIN):
+                    for streak in (0, STREAK_TIER_MIN):
+                        for collector_focus in (False, True):
+                            weights = self._mixed_weights(weights_fn, role, heat, combo, streak, collector_focus)
+                            self.tables.append(AliasTable(self.outcomes, weights))
+        self.base = self.lookup_id(0, 0, 0, 0, False)
+
+    @staticmethod
+    def _mixed_weights(weights_fn, role, heat, combo, streak, collector_focus) -> List[float]:
+        weights = weights_fn(role, heat, combo, streak, collector_focus, False)
+        chance = role_strategy(role).double_miss_chance
+        if not chance:
+            return weights
+        doubled = weights_fn(role, heat, combo, streak, collector_focus, True)
+        total, total_doubled = sum(weights), sum(doubled)
+        keep = 1.0 - chance
+        return [keep * w / total + chance * d / total_doubled
+                for w, d in zip(weights, doubled)]
+
+    def lookup(self, role: Optional[str], heat: float, combo_count: int,
+               streak_count: int, collector_focus: bool) -> AliasTable:
+        """Таблица для состояния игрока по имени роли"""
+        return self.lookup_id(self.role_index.get(role, 0), heat, combo_count, streak_count, collector_focus)
+
+    def lookup_id(self, role_id: int, heat: float, combo_count: int,
+                  streak_count: int, collector_focus: bool) -> AliasTable:
+        """Таблица для текущего состояния игрока по role_id (горячий путь)"""
+        index = (((role_id * 4 + heat_bucket(heat)) * 2
+                  + (combo_count >= COMBO_TIER_MIN)) * 2
+                 + (streak_count >= STREAK_TIER_MIN)) * 2 + bool(collector_focus)
+        return self.tables[index]
+
+class HitChanceTable:
+    """Шанс прямого попадания по индексу (целевой?, роль метателя, роль цели, жар, стаки фокуса).
+
+    Значения — результат hit_chance_fn(is_targeted, role, target_role, heat, stacks)
+    для каждой клетки, поэтому поиск побитово совпадает со скалярной формулой.
+    Роли цели сведены в классы (target_role_classes): класс 0 — роли без target_accuracy.
+    """
+
+    def __init__(self, roles: Sequence[Optional[str]], hit_chance_fn: Callable[..., float]):
+        self.role_index = {role: i for i, role in enumerate(roles)}
+        self.n_roles = len(roles)
+        self.target_classes = target_role_classes(roles)
+        self.n_target_classes = len(self.target_classes) + 1
+        self.target_class = [self.target_classes.get(role, 0) for role in roles]  # по индексу роли
+        representatives = (None,) + tuple(self.target_classes)
+        self.values = array('d')
+        for is_targeted in (False, True):
+            for role in roles:
+                for target_role in representatives:
+                    for heat in range(MAX_HEAT + 1):
+                        for stacks in range(MAX_FOCUS_STACKS + 1):
+                            self.values.append(hit_chance_fn(is_targeted, role, target_role, heat, stacks))
+
+    def lookup(self, is_targeted: bool, role: Optional[str], target_role: Optional[str],
+               heat: int, stacks: int) -> float:
+        """Шанс попадания для состояния броска по именам ролей"""
+        return self.lookup_id(is_targeted, self.role_index.get(role, 0), self.role_index.get(target_role, 0),
+                              heat, stacks)
+
+    def lookup_id(self, is_targeted: bool, role_id: int, target_role_id: int, heat: int, stacks: int) -> float:
+        """Шанс попадания по role_id метателя и цели (горячий путь)"""
+        heat = int(heat)
+        if heat < 0:
+            heat = 0
+        elif heat > MAX_HEAT:
+            heat = MAX_HEAT
+        if stacks > MAX_FOCUS_STACKS:
+            stacks = MAX_FOCUS_STACKS
+        index = ((((bool(is_targeted) * self.n_roles + role_id) * self.n_target_classes
+                   + self.target_class[target_role_id]) * (MAX_HEAT + 1) + heat)
+                 * (MAX_FOCUS_STACKS + 1) + stacks)
+        return self.values[index]
+
+def check_hit_chance_table(table: HitChanceTable, roles: Sequence[Optional[str]],
+                           hit_chance_fn: Callable[..., float], max_stacks: int = 10) -> int:
+    """Полный перебор: поиск в таблице против скалярной формулы. Возвращает число проверенных клеток.
+
+    Роль цели перебирается по всем ролям (а не только по представителям классов),
+    стаки — с запасом выше MAX_FOCUS_STACKS, чтобы проверить и зажим.
+    """
+    checked = 0
+    for is_targeted in (False, True):
+        for role in roles:
+            for target_role in roles:
+                for heat in range(MAX_HEAT + 1):
+                    for stacks in range(max_stacks + 1):
+                        expected = hit_chance_fn(is_targeted, role, target_role, heat, stacks)
+                        actual = table.lookup(is_targeted, role, target_role, heat, stacks)
+                        if actual != expected:
+                            raise AssertionError(
+                                f"Расхождение шанса попадания: targeted={is_targeted}, role={role}, "
+                                f"target_role={target_role}, heat={heat}, stacks={stacks}: "
+                                f"{actual!r} != {expected!r}")
+                        checked += 1
+    return checked
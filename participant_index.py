@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Индекс участников чата ГовноМёт: массив плюс карта позиций
+
+Раньше каждый бросок строил available_targets = [p for p in participants if p[0] != initiator_id]
+и уже из него делал choice/sample: на чате в 10 тысяч человек это O(n) аллокаций на клик.
+ParticipantIndex хранит участников в массиве и позицию каждого в словаре:
+
+- добавление и удаление — O(1) (удаление меняет участника местами с последним);
+- случайный участник, кроме метателя, — O(1): индекс тянется из n-1 позиций,
+  а позиция метателя перепрыгивается;
+- k разных жертв (splash, bomb, combo) — O(k): выборка идёт по виртуальному
+  списку «все, кроме метателя» без его сборки.
+
+Выборки повторяют random.choice/random.sample над отфильтрованным списком
+выборка в выборку: на индексе, построенном из того же списка, броски с тем же
+seed дают тех же жертв, что и раньше (tests/test_participant_index.py).
+
+    python participant_index.py  # замер против фильтрации списка
+"""
+
+from math import ceil, log
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+Participant = Tuple[int, str]  # (user_id, имя для упоминания)
+
+class ParticipantIndex:
+    """Участники одного чата с O(1) добавлением, удалением и выборкой «кроме метателя»."""
+
+    __slots__ = ('members', 'positions')
+
+    def __init__(self, participants: Iterable[Participant] = ()):
+        self.members: List[Participant] = []
+        self.positions: Dict[int, int] = {}  # user_id -> позиция в members
+        for user_id, name in participants:
+            self.add(user_id, name)
+
+    # ---------------------- Изменение ----------------------
+    def add(self, user_id: int, name: str) -> bool:
+        """Добавляет участника в конец (или обновляет имя). True — если он новый"""
+        position = self.positions.get(user_id)
+        if position is not None:
+            if self.members[position][1] != name:
+                self.members[position] = (user_id, name)
+            return False
+        self.positions[user_id] = len(self.members)
+        self.members.append((user_id, name))
+        return True
+
+    def remove(self, user_id: int) -> bool:
+        """Удаляет участника: на его место встаёт последний. False — если его не было"""
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return False
+        last = self.members.pop()
+        if position < len(self.members):
+            self.members[position] = last
+            self.positions[last[0]] = position
+        return True
+
+    def sync(self, participants: Iterable[Participant]) -> Tuple[int, int]:
+        """Приводит индекс к свежему списку (API/БД): новых — в конец, пропавших — вон.
+        Оставшиеся сохраняют позиции. Возвращает (добавлено, удалено)"""
+        fresh = {}
+        for user_id, name in participants:
+            fresh.setdefault(user_id, name)
+        removed = [user_id for user_id in self.positions if user_id not in fresh]
+        for user_id in removed:
+            self.remove(user_id)
+        added = 0
+        for user_id, name in fresh.items():
+            added += self.add(user_id, name)
+        return added, len(removed)
+
+    # ---------------------- Чтение ----------------------
+    def get(self, user_id: int) -> Optional[Participant]:
+        """Участник по user_id (None, если его нет)"""
+        position = self.positions.get(user_id)
+        return None if position is None else self.members[position]
+
+    def count_excluding(self, exclude_id: Optional[int]) -> int:
+        """Сколько участников, кроме exclude_id"""
+        return len(self.members) - (exclude_id in self.positions)
+
+    def others(self, exclude_id: Optional[int]) -> List[Participant]:
+        """Все, кроме exclude_id, в порядке индекса — O(n), для исходов на весь чат"""
+        position = self.positions.get(exclude_id)
+        if position is None:
+            return list(self.members)
+        return self.members[:position] + self.members[position + 1:]
+
+    def _at(self, i: int, skip: int) -> Participant:
+        # i — позиция в виртуальном списке без участника на позиции skip
+        return self.members[i + 1 if i >= skip else i]
+
+    # ---------------------- Выборки ----------------------
+    def choice_excluding(self, rng, exclude_id: Optional[int]) -> Optional[Participant]:
+        """Случайный участник, кроме exclude_id, за O(1) (None, если выбирать не из кого).
+        Одна выборка rng — как rng.choice по отфильтрованному списку"""
+        skip = self.positions.get(exclude_id, len(self.members))
+        n = len(self.members) - (skip < len(self.members))
+        if n <= 0:
+            return None
+        return self._at(rng._randbelow(n), skip)
+
+    def sample_excluding(self, rng, k: int, exclude_id: Optional[int]) -> List[Participant]:
+        """k разных участников, кроме exclude_id, за O(k).
+
+        Повторяет алгоритм random.sample выборка в выборку: на маленькой популяции —
+        частичное перемешивание Фишера–Йетса (здесь разреженное: словарь переставленных
+        позиций вместо копии списка), на большой — выборка с отбраковкой повторов.
+        """
+        skip = self.positions.get(exclude_id, len(self.members))
+        n = len(self.members) - (skip < len(self.members))
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative")
+        randbelow = rng._randbelow
+        result = []
+        setsize = 21  # порог random.sample между двумя алгоритмами
+        if k > 5:
+            setsize += 4 ** ceil(log(k * 3, 4))
+        if n <= setsize:
+            moved: Dict[int, int] = {}
+            for i in range(k):
+                j = randbelow(n - i)
+                result.append(self._at(moved.get(j, j), skip))
+                tail = n - i - 1
+                moved[j] = moved.get(tail, tail)
+        else:
+            selected = set()
+            for _ in range(k):
+                j = randbelow(n)
+                while j in selected:
+                    j = randbelow(n)
+                selected.add(j)
+                result.append(self._at(j, skip))
+        return result
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.positions
+
+    def __iter__(self) -> Iterator[Participant]:
+        return iter(self.members)
+
+    def __getitem__(self, position: int) -> Participant:
+        return self.members[position]
+
+    def __repr__(self) -> str:
+        return f"ParticipantIndex({len(self.members)} участников)"
+
+    @classmethod
+    def view(cls, participants: List[Participant], user_id: Optional[int]) -> 'ParticipantIndex':
+        """Представление готового списка без копии — только для чтения на один бросок.
+
+        Полную карту позиций не строит: известна лишь позиция user_id (метателя), а
+        выборкам «кроме метателя» больше и не нужно. Поиск — O(n) на C-скорости, дешевле
+        прежнего фильтра списка. Если метатель в списке не один раз, список индексируется копией.
+        """
+        ids = list(map(itemgetter(0), participants))
+        count = ids.count(user_id)
+        if count > 1:
+            return cls(participants)
+        index = cls.__new__(cls)
+        index.members = participants
+        index.positions = {user_id: ids.index(user_id)} if count else {}
+        return index
+
+def as_index(participants: Union[ParticipantIndex, Iterable[Participant]],
+             user_id: Optional[int] = None) -> ParticipantIndex:
+    """Индекс как есть; список участников (симуляции, фоллбэки бота) — в представление
+    с позицией метателя user_id за O(n)"""
+    if isinstance(participants, ParticipantIndex):
+        return participants
+    if isinstance(participants, list):
+        return ParticipantIndex.view(participants, user_id)
+    return ParticipantIndex(participants)
+
+if __name__ == "__main__":
+    import time
+    from logger_config import quiet
+    from rng_streams import SplitMix64
+
+    quiet()
+    # Замер: выборка на чате в 10 000 участников
+    participants = [(uid, f"u{uid}") for uid in range(1, 10001)]
+    index = ParticipantIndex(participants)
+    rng = SplitMix64(42)
+    rounds = 2000
+    started = time.perf_counter()
+    for step in range(rounds):
+        available = [p for p in participants if p[0] != step + 1]
+        rng.choice(available), rng.sample(available, 4)
+    old = (time.perf_counter() - started) / rounds * 1e6
+    started = time.perf_counter()
+    for step in range(rounds):
+        index.choice_excluding(rng, step + 1), index.sample_excluding(rng, 4, step + 1)
+    new = (time.perf_counter() - started) / rounds * 1e6
+    print(f"Цель + 4 жертвы из 10 000: {old:.1f} мкс (фильтр списка) → {new:.1f} мкс (индекс)")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Состояние игроков ГовноМёт: одна компактная запись на пользователя и фокус по чатам
+
+Раньше GameLogic держал по словарю на каждое поле (роль, жар, счёт, кулдаун, комбо,
+серия, дебафф) и словарь фокуса с ключом-кортежем (initiator_id, target_id, chat_id):
+бросок делал десяток поисков по разным словарям и создавал datetime на каждую роль
+и кулдаун. Здесь всё поле игрока — слоты одного объекта, а время — монотонные секунды.
+"""
+
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+NEVER = float('-inf')  # «ещё не было» для монотонных отметок времени
+
+def cooled_heat(heat: int, elapsed: float, half_life: float) -> int:
+    """Жар через elapsed секунд после последнего изменения: экспоненциальное остывание
+    с периодом полураспада half_life, округлённое до целого (жар в игре и в БД — 0..100)"""
+    if heat <= 0 or elapsed <= 0:
+        return heat
+    return round(heat * 0.5 ** (elapsed / half_life))
+
+class PlayerState:
+    """Всё, что игра помнит о пользователе между бросками.
+
+    heat — жар на момент heat_at: текущий жар остывает от него лениво (cooled_heat)
+    и записывается заново только при изменении.
+    Отметки времени (role_expires, last_throw, debuff_expires, heat_at) — секунды часов GameLogic
+    (clock.py, по умолчанию time.monotonic()):
+    сравнение двух float вместо арифметики datetime и без аллокаций на бросок.
+    """
+
+    __slots__ = ('role', 'role_id', 'role_expires', 'heat', 'heat_at', 'score', 'last_throw', 'combo', 'streak',
+                 'debuff_miss_bonus', 'debuff_expires', 'last_seen')
+
+    def __init__(self):
+        self.role: Optional[str] = None
+        self.role_id = 0  # индекс стратегии роли в roles.ROLE_STRATEGIES (0 — без роли)
+        self.role_expires = NEVER
+        self.heat = 0
+        self.heat_at = NEVER
+        self.score = 0
+        self.last_throw = NEVER
+        self.combo = 0
+        self.streak = 0
+        self.debuff_miss_bonus = 0.0
+        self.debuff_expires = NEVER
+        self.last_seen = NEVER
+
+    def __repr__(self) -> str:
+        return (f"PlayerState(role={self.role!r}, heat={self.heat}, score={self.score}, "
+                f"combo={self.combo}, streak={self.streak})")
+
+class ChatFocus:
+    """Стаки фокуса в одном чате: (initiator_id, target_id) -> stacks.
+
+    Чат ищется один раз на бросок, а ключ пары короче прежнего тройного
+    (initiator_id, target_id, chat_id) — меньше памяти на пару и дешевле хеш.
+    Сверх max_pairs отбрасывается старшая (по первому фокусу) половина пар:
+    O(n) раз в n/2 новых пар, то есть амортизированно O(1).
+    dirty — пары, изменённые с прошлого take_dirty() (со стаками на момент изменения):
+    их сохраняет в БД focus_cache.py, в том числе отброшенные из памяти до сброса.
+    """
+
+    __slots__ = ('stacks', 'max_pairs', 'evictions', 'dirty', 'last_seen')
+
+    def __init__(self, max_pairs: int = 5000, evictions: Optional[Dict[str, int]] = None):
+        self.stacks: Dict[Tuple[int, int], int] = {}
+        self.max_pairs = max_pairs
+        self.evictions = evictions if evictions is not None else {'pairs': 0}
+        self.dirty: Dict[Tuple[int, int], int] = {}
+        self.last_seen = NEVER
+
+    def _insert(self, key: Tuple[int, int], stacks: int):
+        self.stacks[key] = stacks
+        if len(self.stacks) > self.max_pairs:
+            dropped = len(self.stacks) // 2
+            self.stacks = dict(islice(self.stacks.items(), dropped, None))
+            self.evictions['pairs'] += dropped
+
+    def get(self, initiator_id: int, target_id: int) -> int:
+        """Стаки фокуса метателя на цель"""
+        return self.stacks.get((initiator_id, target_id), 0)
+
+    def set(self, initiator_id: int, target_id: int, stacks: int):
+        """Задаёт стаки фокуса"""
+        key = (initiator_id, target_id)
+        if key in self.stacks:
+            self.stacks[key] = stacks
+        else:
+            self._insert(key, stacks)
+        self.dirty[key] = stacks
+
+    def increment(self, initiator_id: int, target_id: int) -> int:
+        """+1 стак фокуса; возвращает новое значение"""
+        key = (initiator_id, target_id)
+        stacks = self.stacks.get(key, 0) + 1
+        self.set(initiator_id, target_id, stacks)
+        return stacks
+
+    def setdefault(self, initiator_id: int, target_id: int, stacks: int) -> int:
+        """Задаёт стаки, только если пары ещё нет; возвращает действующее значение.
+        Для подстановки сохранённого фокуса — пара не помечается изменённой"""
+        key = (initiator_id, target_id)
+        if key in self.stacks:
+            return self.stacks[key]
+        self._insert(key, stacks)
+        return stacks
+
+    def take_dirty(self) -> Dict[Tuple[int, int], int]:
+        """Изменённые пары со стаками; отметки снимаются"""
+        dirty, self.dirty = self.dirty, {}
+        return dirty
+
+    def __len__(self) -> int:
+        return len(self.stacks)
+
+class StateMap:
+    """Записи состояния в порядке последнего обращения с лимитом размера и TTL простоя.
+
+    Самая давняя запись всегда в голове OrderedDict, поэтому вытеснение — popitem
+    с головы за O(1): по размеру не больше одной записи на вставку, по TTL — не больше
+    двух на вставку (амортизированно O(1)), полный проход — expire() без лимита.
+    Значения — объекты со слотом last_seen (PlayerState, ChatState).
+    """
+
+    def __init__(self, factory: Callable[[], object], max_size: int, ttl: float):
+        self.items: OrderedDict = OrderedDict()
+        self.factory = factory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = {'size': 0, 'ttl': 0}
+        self.on_evict: Optional[Callable[[object, object], None]] = None  # (ключ, запись) при вытеснении
+
+    def get(self, key) -> Optional[object]:
+        """Запись без продления (None, если её нет)"""
+        return self.items.get(key)
+
+    def touch(self, key, now: float):
+        """Запись с отметкой обращения; создаётся, если её нет"""
+        items = self.items
+        value = items.get(key)
+        if value is None:
+            value = items[key] = self.factory()
+            value.last_seen = now
+            if len(items) > self.max_size:
+                evicted = items.popitem(last=False)
+                self.evictions['size'] += 1
+                if self.on_evict is not None:
+                    self.on_evict(*evicted)
+            # Растёт карта только на вставках — здесь же и подчищаем простаивающих
+            self.expire(now, limit=2)
+        else:
+            items.move_to_end(key)
+            value.last_seen = now
+        return value
+
+    def put(self, key, value, now: float):
+        """Кладёт готовую запись (замещая прежнюю) как самую свежую — для переданного состояния"""
+        items = self.items
+        items.pop(key, None)
+        items[key] = value
+        value.last_seen = now
+        if len(items) > self.max_size:
+            evicted = items.popitem(last=False)
+            self.evictions['size'] += 1
+            if self.on_evict is not None:
+                self.on_evict(*evicted)
+
+    def expire(self, now: float, limit: Optional[int] = None) -> int:
+        """Вытесняет записи, простаивающие дольше ttl (не больше limit). Возвращает их число."""
+        items = self.items
+        cutoff = now - self.ttl
+        removed = 0
+        while items and (limit is None or removed < limit):
+            key = next(iter(items))
+            value = items[key]
+            if value.last_seen >= cutoff:
+                break
+            del items[key]
+            removed += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+        self.evictions['ttl'] += removed
+        return removed
+
+    def values(self) -> Iterator:
+        return iter(self.items.values())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, key) -> bool:
+        return key in self.items
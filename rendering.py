@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Рендер сообщений броска ГовноМёт: шаблоны и пулы фраз, скомпилированные один раз
+
+Раньше каждый бросок собирал два списка по 20 f-строк (ответка и «готов к...»),
+чтобы взять из каждого по одной, а сообщение исхода форматировал str.format с
+разбором шаблона на каждый вызов. Здесь GAME_MESSAGES и PUBLIC_SIGNAL_PHRASES
+разбираются при старте: у шаблона известен набор плейсхолдеров, а сам он сведён
+к %-строке (подстановка по словарю без повторного разбора). Пул сначала выбирает
+индекс — тем же одним rng.choice, что и раньше, — и форматирует только выбранный.
+
+Публичные сигналы (callouts и призыв к ответке) собирает PublicSignals при первом
+обращении: результат, который перебросили или так и не показали, не тратит на них
+ни строк, ни списков. Сверка со str.format и с прежним выбором — tests/test_rendering.py.
+
+    python rendering.py  # стоимость рендера по исходам
+"""
+
+import string
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+from config import GAME_MESSAGES, PUBLIC_SIGNAL_PHRASES
+from rng_streams import SplitMix64
+
+_formatter = string.Formatter()
+
+class Template:
+    """Шаблон str.format, разобранный заранее.
+
+    Простые плейсхолдеры ({name} без формата и конверсии) превращаются в %(name)s,
+    и render — одна операция % над словарём значений. Шаблоны с форматом, атрибутами
+    или индексами рендерятся через str.format_map — результат тот же, что у format.
+    """
+
+    __slots__ = ('source', 'fields', 'pattern')
+
+    def __init__(self, source: str):
+        self.source = source
+        fields = []
+        pattern = []
+        simple = True
+        for literal, name, spec, conversion in _formatter.parse(source):
+            pattern.append(literal.replace('%', '%%'))
+            if name is None:
+                continue
+            if not name.isidentifier() or spec or conversion:
+                simple = False
+            if name not in fields:
+                fields.append(name)
+            pattern.append(f"%({name})s")
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.pattern: Optional[str] = ''.join(pattern) if simple else None
+
+    def render(self, values: Mapping[str, object]) -> str:
+        """Подставляет значения; недостающий плейсхолдер — KeyError, как у str.format"""
+        if self.pattern is None:
+            return self.source.format_map(values)
+        return self.pattern % values
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+class TemplatePool:
+    """Пул равновероятных шаблонов: выбор индекса, затем рендер одного выбранного."""
+
+    __slots__ = ('templates', 'fields')
+
+    def __init__(self, sources: Iterable[str]):
+        self.templates: Tuple[Template, ...] = tuple(Template(source) for source in sources)
+        if not self.templates:
+            raise ValueError("Пул шаблонов пуст")
+        fields = []
+        for template in self.templates:
+            fields.extend(name for name in template.fields if name not in fields)
+        self.fields: Tuple[str, ...] = tuple(fields)  # плейсхолдеры всех шаблонов пула
+
+    def render(self, rng, values: Mapping[str, object]) -> str:
+        """Случайный шаблон (ровно один rng.choice — как выбор из списка строк) с подстановкой"""
+        return rng.choice(self.templates).render(values)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+class MessageRenderer:
+    """Скомпилированные сообщения исходов (GAME_MESSAGES) и пулы фраз сигналов."""
+
+    def __init__(self, messages: Optional[Mapping[str, Sequence[str]]] = None,
+                 phrases: Optional[Mapping[str, Sequence[str]]] = None):
+        messages = GAME_MESSAGES if messages is None else messages
+        phrases = PUBLIC_SIGNAL_PHRASES if phrases is None else phrases
+        self.messages: Dict[str, TemplatePool] = {outcome: TemplatePool(texts)
+                                                  for outcome, texts in messages.items()}
+        self.phrases: Dict[str, TemplatePool] = {name: TemplatePool(texts) for name, texts in phrases.items()}
+
+    def message(self, rng, outcome: str, values: Mapping[str, object]) -> Optional[str]:
+        """Случайное сообщение исхода (None для неизвестного исхода)"""
+        pool = self.messages.get(outcome)
+        if pool is None:
+            return None
+        return pool.render(rng, values)
+
+    def phrase(self, rng, name: str, values: Mapping[str, object]) -> str:
+        """Случайная фраза из пула name"""
+        return self.phrases[name].render(rng, values)
+
+class PublicSignals(Mapping):
+    """Публичные сигналы броска, собираемые при первом обращении к ключу.
+
+    Хранит только входы на момент броска (роль, жар, жертва и её стаки фокуса) и
+    состояние SplitMix64 перед выборками фраз: GameLogic пропускает эти выборки в
+    потоке чата сразу (SplitMix64.jump), а PublicSignals делает их позже из копии —
+    текст и дальнейший поток те же, что при немедленной сборке. Снаружи — обычный
+    словарь: get, [], len и repr как у прежнего dict.
+    """
+
+    __slots__ = ('renderer', 'rng_state', 'role', 'heat', 'initiator_username', 'victim', 'focus_stacks',
+                 '_signals')
+
+    KEYS = ('initiator_role', 'heat_status', 'under_fire_candidates', 'call_to_action', 'focus_warning',
+            'initiator_username', 'callouts')
+
+    def __init__(self, renderer: MessageRenderer, rng_state: int, role: Optional[str], heat: Any,
+                 initiator_username: Optional[str], victim: Optional[Tuple[int, str]], focus_stacks: int):
+        self.renderer = renderer
+        self.rng_state = rng_state
+        self.role = role
+        self.heat = heat
+        self.initiator_username = initiator_username
+        self.victim = victim
+        self.focus_stacks = focus_stacks
+        self._signals: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def draws(victim: Optional[Tuple[int, str]], heat: Any) -> int:
+        """Сколько случайных выборок потратит сборка: фраза жара (от 20), ответка и «готов к...»"""
+        if victim is None:
+            return 0
+        return 3 if isinstance(heat, int) and heat >= 20 else 2
+
+    def build(self) -> Dict[str, Any]:
+        """Собирает сигналы (один раз) и возвращает их словарь"""
+        if self._signals is not None:
+            return self._signals
+        signals = {
+            'initiator_role': self.role,
+            'heat_status': self.heat,
+            'under_fire_candidates': [],
+            'call_to_action': '',
+            'focus_warning': False,
+            'initiator_username': self.initiator_username or '',
+            'callouts': []
+        }
+        if self.victim is not None:
+            user_id, username = self.victim
+            stacks = self.focus_stacks
+            signals['under_fire_candidates'].append({
+                'user_id': user_id,
+                'username': username,
+                'can_retaliate': True,
+                'focus_stacks': stacks
+            })
+            # Предлагаем ответить на инициатора
+            reply_to = signals['initiator_username'] or 'initiator'
+            # Фразы про фокус
+            if stacks > 2:
+                signals['focus_warning'] = True
+                signals['callouts'].append(f"@{username} под прицелом! Фокус: {stacks}")
+            rng = SplitMix64(self.rng_state)
+            values = {'reply_to': reply_to, 'heat': self.heat}
+            # Heat callouts (порог 20)
+            if isinstance(self.heat, int) and self.heat >= 20:
+                signals['callouts'].append(self.renderer.phrase(rng, 'heat', values))
+            # Основной призыв — случайная ответка
+            retaliate_phrase = self.renderer.phrase(rng, 'retaliate', values)
+            response_phrase = self.renderer.phrase(rng, 'response', values)
+            # Добавляем информацию о том, кто на кого нападал
+            signals['callouts'].append(f"💥 @{signals['initiator_username']} атаковал @{username}")
+            signals['call_to_action'] = f"🎯 @{username} {response_phrase} {retaliate_phrase}"
+        self._signals = signals
+        return signals
+
+    @property
+    def built(self) -> bool:
+        return self._signals is not None
+
+    def __getitem__(self, key: str) -> Any:
+        return self.build()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return repr(self.build())
+
+def measure_render_cost(renderer: MessageRenderer, rng, values: Mapping[str, object],
+                        rounds: int = 20000) -> Dict[str, float]:
+    """Средняя стоимость рендера сообщения каждого исхода и каждого пула фраз, мкс"""
+    import time
+
+    costs = {}
+    pools = [(outcome, pool) for outcome, pool in renderer.messages.items()]
+    pools += [(f"фразы:{name}", pool) for name, pool in renderer.phrases.items()]
+    for name, pool in pools:
+        render = pool.render
+        started = time.perf_counter()
+        for _ in range(rounds):
+            render(rng, values)
+        costs[name] = (time.perf_counter() - started) / rounds * 1e6
+    return costs
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    renderer = MessageRenderer()
+    values = {'initiator': 'metatel_100%', 'targets': '@vasya, @petya', 'reply_to': 'metatel',
+              'heat': 42, 'target': 'vasya'}
+
+    rng = random.Random(42)
+    rounds = 20000
+    old_costs = {}
+    for outcome, texts in GAME_MESSAGES.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            rng.choice(texts).format(**values)
+        old_costs[outcome] = (time.perf_counter() - started) / rounds * 1e6
+    costs = measure_render_cost(renderer, rng, values, rounds)
+    print(f"{'Исход/пул':<22}{'str.format, мкс':>16}{'шаблон, мкс':>14}")
+    for name, cost in costs.items():
+        old = old_costs.get(name)
+        print(f"{name:<22}{(f'{old:.2f}' if old is not None else '—'):>16}{cost:>14.2f}")
+
+    # Призыв к ответке: раньше — сборка двух списков по 20 f-строк на бросок
+    reply_to = values['reply_to']
+    tails = [text.split('}', 1)[1] for text in PUBLIC_SIGNAL_PHRASES['retaliate']]
+    responses = PUBLIC_SIGNAL_PHRASES['response']
+    started = time.perf_counter()
+    for _ in range(rounds):
+        retaliate_pool = [f"метай в /go@{reply_to}{tail}" for tail in tails]
+        response_phrases = list(responses)
+        rng.choice(retaliate_pool), rng.choice(response_phrases)
+    old_cta = (time.perf_counter() - started) / rounds * 1e6
+    started = time.perf_counter()
+    for _ in range(rounds):
+        renderer.phrase(rng, 'retaliate', values), renderer.phrase(rng, 'response', values)
+    new_cta = (time.perf_counter() - started) / rounds * 1e6
+    print(f"Призыв к ответке: {old_cta:.2f} мкс (списки f-строк) → {new_cta:.2f} мкс (пулы шаблонов)")
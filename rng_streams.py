@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Потоки случайных чисел по чатам ГовноМёт
+
+У каждого чата свой поток SplitMix64: состояние — seed + позиция * GAMMA, поэтому
+любую точку потока можно восстановить по паре (seed, позиция) за O(1), не прогоняя
+предыдущие выборки. Событие броска хранит rng_seed и rng_seq на начало броска —
+этого достаточно, чтобы повторить бросок побитово (при том же состоянии игроков).
+
+На чат хранятся два целых в слотах ChatStream, а генератор один на GameLogic:
+перед использованием в него загружается состояние нужного чата. Mersenne Twister
+на каждый чат занял бы ~2.5 КБ, а его пересев на каждый бросок стоит ~8 мкс.
+Независимость потоков и повтор броска проверяет tests/test_rng_streams.py.
+"""
+
+import os
+import random
+from typing import Optional, Tuple
+
+MASK64 = (1 << 64) - 1
+GAMMA = 0x9E3779B97F4A7C15           # шаг SplitMix64 (нечётный — обратим по модулю 2^64)
+GAMMA_INV = pow(GAMMA, -1, 1 << 64)  # позиция = (state - seed) * GAMMA_INV
+DOUBLE_UNIT = 1.0 / (1 << 53)
+
+def mix64(z: int) -> int:
+    """Финализатор SplitMix64"""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+class SplitMix64(random.Random):
+    """random.Random на SplitMix64: choice/sample/randint работают как обычно,
+    а состояние — одно целое, которое можно сохранить и загрузить без копий."""
+
+    def __init__(self, state: int = 0):
+        self.state = state & MASK64
+
+    def seed(self, a=None, version=2):
+        self.state = (a or 0) & MASK64
+
+    def getstate(self):
+        return self.state
+
+    def setstate(self, state):
+        self.state = state
+
+    def random(self) -> float:
+        self.state = z = (self.state + GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return ((z ^ (z >> 31)) >> 11) * DOUBLE_UNIT
+
+    def getrandbits(self, k: int) -> int:
+        if k <= 64:
+            self.state = z = (self.state + GAMMA) & MASK64
+            z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+            z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+            return (z ^ (z >> 31)) >> (64 - k)
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self.getrandbits(min(64, k - shift)) << shift
+        return bits
+
+    def jump(self, draws: int) -> int:
+        """Пропускает draws выборок за O(1); возвращает состояние до пропуска.
+        SplitMix64(состояние) потом выдаст пропущенные выборки — так их можно отложить."""
+        state = self.state
+        self.state = (state + draws * GAMMA) & MASK64
+        return state
+
+    def _randbelow(self, n: int) -> int:
+        # choice/sample/randint: одна выборка умножением вместо отбраковки по битам
+        # (смещение ≤ n/2^64 — для списков участников чата пренебрежимо)
+        self.state = z = (self.state + GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return ((z ^ (z >> 31)) * n) >> 64
+
+class ChatStream:
+    """Поток чата: seed и текущее состояние SplitMix64 (позиция выводится из них)."""
+
+    __slots__ = ('seed', 'state')
+
+    def __init__(self):
+        self.seed: Optional[int] = None  # задаёт RngStreams.load при первой загрузке
+        self.state = 0
+
+    @property
+    def seq(self) -> int:
+        """Число выборок, сделанных из потока"""
+        return ((self.state - self.seed) * GAMMA_INV) & MASK64
+
+    def seek(self, seed: int, seq: int):
+        """Ставит поток в точку (seed, позиция)"""
+        self.seed = seed
+        self.state = (seed + seq * GAMMA) & MASK64
+
+class RngStreams:
+    """Потоки чатов поверх одного генератора SplitMix64.
+
+    С master_seed seed чата выводится из (master_seed, chat_id), и одинаковая нагрузка
+    даёт одинаковые броски независимо от трафика других чатов. Без master_seed seed
+    каждого нового потока берётся из os.urandom. Сами потоки хранятся в разделах чатов
+    (chat_state.ChatState), здесь — только генератор и поток, загруженный в него.
+    """
+
+    def __init__(self, master_seed: Optional[int]):
+        self.master_seed = master_seed
+        self.rng = SplitMix64()
+        self.active: Optional[ChatStream] = None
+
+    def chat_seed(self, chat_id: int) -> int:
+        """Seed нового потока чата (63 бита — влезает в INTEGER SQLite)"""
+        if self.master_seed is None:
+            return int.from_bytes(os.urandom(8), 'little') >> 1
+        return mix64((self.master_seed * GAMMA + chat_id) & MASK64) >> 1
+
+    def load(self, chat_id: int, stream: ChatStream) -> Tuple[int, int]:
+        """Загружает в генератор поток чата (seed нового потока выводится из chat_id);
+        возвращает (seed, позиция) на этот момент"""
+        self.release()
+        if stream.seed is None:
+            stream.seed = stream.state = self.chat_seed(chat_id)
+        self.rng.state = stream.state
+        self.active = stream
+        return stream.seed, stream.seq
+
+    def release(self):
+        """Сохраняет позицию загруженного потока"""
+        if self.active is not None:
+            self.active.state = self.rng.state
+            self.active = None
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Роли ГовноМёт: реестр стратегий вместо цепочек if role == ...
+
+Каждая роль — объект RoleStrategy с данными (множители весов исходов, поправки
+точности, кулдаун, спецэффекты целевого броска) и необязательными хуками живого
+броска. Роль получает маленький целый role_id — индекс в ROLE_STRATEGIES, — по которому
+горячий путь находит стратегию и строку предрасчитанных таблиц без сравнения строк.
+Новую роль достаточно зарегистрировать до создания GameLogic:
+
+    register_role(RoleStrategy('sprinter', accuracy=0.05, cooldown_factor=0.5))
+
+Пороги жара в heat_weights должны совпадать с outcome_tables.HEAT_THRESHOLDS:
+таблицы исходов строятся по корзинам жара.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from logger_config import get_logger
+
+logger = get_logger('game')
+
+# Правило жара для весов: (жар от, жар до (не включая; None — без верха), исход, множитель)
+HeatRule = Tuple[int, Optional[int], str, float]
+
+def flat_accuracy(accuracy: float, delta: float, heat: int, stacks: int) -> float:
+    """Поправка точности без условий"""
+    return accuracy + delta
+
+class RoleStrategy:
+    """Поведение роли: данные для таблиц исходов/шансов и хуки броска.
+
+    weights — множители весов исходов, heat_weights — множители по жару,
+    focus_weights — множители при фокусе на цели (таблица с флагом фокуса),
+    double_miss_chance — шанс удвоить вес промаха (смесь двух распределений).
+    accuracy_rule(accuracy, delta, heat, stacks) применяет поправку точности метателя,
+    target_accuracy — поправка точности тому, кто метит в эту роль.
+    forced_special/forced_special_chance — спецэффект целевого броска вместо исхода,
+    miss_to_splash — шанс, что промах целевого броска станет splash.
+    on_throw(game, initiator_id, targets, chat_id, now) — после выбора целей случайного броска,
+    on_targeted_throw(game, initiator_id, target_id, chat_id, now) — до исхода целевого.
+    """
+
+    __slots__ = ('key', 'role_id', 'weights', 'heat_weights', 'focus_weights', 'double_miss_chance',
+                 'accuracy', 'accuracy_rule', 'target_accuracy', 'cooldown_factor',
+                 'forced_special', 'forced_special_chance', 'miss_to_splash', 'miss_text',
+                 'on_throw', 'on_targeted_throw')
+
+    def __init__(self, key: Optional[str], *,
+                 weights: Tuple[Tuple[str, float], ...] = (),
+                 heat_weights: Tuple[HeatRule, ...] = (),
+                 focus_weights: Tuple[Tuple[str, float], ...] = (),
+                 double_miss_chance: float = 0.0,
+                 accuracy: float = 0.0,
+                 accuracy_rule: Callable[[float, float, int, int], float] = flat_accuracy,
+                 target_accuracy: float = 0.0,
+                 cooldown_factor: float = 1.0,
+                 forced_special: Optional[str] = None,
+                 forced_special_chance: float = 0.0,
+                 miss_to_splash: float = 0.0,
+                 miss_text: Optional[str] = None,
+                 on_throw: Optional[Callable] = None,
+                 on_targeted_throw: Optional[Callable] = None):
+        self.key = key
+        self.role_id = 0  # назначает register_role
+        self.weights = weights
+        self.heat_weights = heat_weights
+        self.focus_weights = focus_weights
+        self.double_miss_chance = double_miss_chance
+        self.accuracy = accuracy
+        self.accuracy_rule = accuracy_rule
+        self.target_accuracy = target_accuracy
+        self.cooldown_factor = cooldown_factor
+        self.forced_special = forced_special
+        self.forced_special_chance = forced_special_chance if forced_special else 0.0
+        self.miss_to_splash = miss_to_splash
+        self.miss_text = miss_text
+        self.on_throw = on_throw
+        self.on_targeted_throw = on_targeted_throw
+
+    def apply_weights(self, weights: List[float], index: Dict[str, int], heat: int,
+                      focus: bool, double_miss: bool):
+        """Множители роли поверх весов исходов (на месте): базовые, по жару, фокус, двойной промах"""
+        for outcome, factor in self.weights:
+            weights[index[outcome]] *= factor
+        for low, high, outcome, factor in self.heat_weights:
+            if heat >= low and (high is None or heat < high):
+                weights[index[outcome]] *= factor
+        if focus:
+            for outcome, factor in self.focus_weights:
+                weights[index[outcome]] *= factor
+        if double_miss:
+            weights[index['miss']] *= 2.0
+
+    def __repr__(self) -> str:
+        return f"RoleStrategy({self.key!r}, role_id={self.role_id})"
+
+NO_ROLE = RoleStrategy(None)
+ROLE_STRATEGIES: List[RoleStrategy] = [NO_ROLE]  # role_id -> стратегия
+ROLE_BY_KEY: Dict[Optional[str], RoleStrategy] = {None: NO_ROLE}
+
+def register_role(strategy: RoleStrategy) -> RoleStrategy:
+    """Добавляет роль в реестр и выдаёт ей следующий role_id"""
+    if strategy.key in ROLE_BY_KEY:
+        raise ValueError(f"Роль {strategy.key} уже зарегистрирована")
+    strategy.role_id = len(ROLE_STRATEGIES)
+    ROLE_STRATEGIES.append(strategy)
+    ROLE_BY_KEY[strategy.key] = strategy
+    return strategy
+
+def role_strategy(key: Optional[str]) -> RoleStrategy:
+    """Стратегия по имени роли (неизвестная роль и None — без роли)"""
+    return ROLE_BY_KEY.get(key, NO_ROLE)
+
+# ---------------------- Условные поправки точности ----------------------
+def sniper_accuracy(accuracy: float, delta: float, heat: int, stacks: int) -> float:
+    """Снайпер теряет бонус на жаре от 60"""
+    accuracy += delta
+    if heat >= 60:
+        accuracy -= delta
+    return accuracy
+
+def drunk_accuracy(accuracy: float, delta: float, heat: int, stacks: int) -> float:
+    """Пьяный снайпер: трезвым (жар < 30) — бонус, разгорячённым — такой же штраф"""
+    return accuracy + (delta if heat < 30 else -delta)
+
+def magnet_accuracy(accuracy: float, delta: float, heat: int, stacks: int) -> float:
+    """Магнит: бонус от двух стаков фокуса"""
+    return accuracy + delta if stacks >= 2 else accuracy
+
+def pyromaniac_accuracy(accuracy: float, delta: float, heat: int, stacks: int) -> float:
+    """Пироман: бонус на жаре от 20, на оверхите от 80 — снова без бонуса"""
+    if heat >= 20:
+        accuracy += delta
+    if heat >= 80:
+        accuracy -= delta
+    return accuracy
+
+# ---------------------- Хуки броска ----------------------
+def magnet_on_throw(game, initiator_id: int, targets: List[Tuple[int, str]], chat_id: int, now: float):
+    """Магнит: первый удар по новой цели сразу даёт стак фокуса"""
+    if not targets:
+        return
+    target_id = targets[0][0]
+    focus = game.get_chat_focus(chat_id, now)
+    if focus.get(initiator_id, target_id) == 0:
+        focus.set(initiator_id, target_id, 1)
+        logger.debug("🧲 Магнит: мгновенно дал 1 stack фокуса на %s", target_id)
+
+SABOTEUR_MISS_BONUS = 0.3
+SABOTEUR_DEBUFF_DURATION = 600  # ROLE_DURATION / 6
+
+def saboteur_on_targeted_throw(game, initiator_id: int, target_id: int, chat_id: int, now: float):
+    """Саботажник: вешает на цель дебафф промаха"""
+    game.apply_miss_debuff(target_id, SABOTEUR_MISS_BONUS, SABOTEUR_DEBUFF_DURATION, now, chat_id=chat_id)
+
+# ---------------------- Роли игры ----------------------
+# Порядок регистрации задаёт role_id (и порядок строк предрасчитанных таблиц)
+for _strategy in (
+    RoleStrategy('sniper', weights=(('direct_hit', 1.5), ('splash', 0.7)),
+                 accuracy=0.15, accuracy_rule=sniper_accuracy),
+    RoleStrategy('bombardier', weights=(('direct_hit', 0.8), ('splash', 1.8)),
+                 accuracy=-0.05, miss_to_splash=0.20,
+                 miss_text="💣 Кривой залп — мимо @{target}. Осколки разлетелись."),
+    RoleStrategy('defender', target_accuracy=-0.10),
+    RoleStrategy('drunk_sniper', weights=(('direct_hit', 1.3),),
+                 heat_weights=((50, None, 'miss', 2.0), (0, 50, 'direct_hit', 1.3)),
+                 accuracy=0.20, accuracy_rule=drunk_accuracy,
+                 miss_text="🥴 Шатнуло прицел — мимо @{target}."),
+    RoleStrategy('berserker', weights=(('critical', 1.6), ('combo', 1.5)), accuracy=0.10),
+    RoleStrategy('trickster', weights=(('special', 1.4),),
+                 forced_special='boomerang', forced_special_chance=0.10),
+    RoleStrategy('magnet', accuracy=0.12, accuracy_rule=magnet_accuracy, on_throw=magnet_on_throw),
+    RoleStrategy('saboteur', on_targeted_throw=saboteur_on_targeted_throw),
+    RoleStrategy('oracle', weights=(('legendary', 0.5),), accuracy=0.08, cooldown_factor=0.6),
+    RoleStrategy('pyromaniac', weights=(('critical', 1.2),),
+                 heat_weights=((20, None, 'critical', 1.5), (80, None, 'special', 1.5)),
+                 accuracy=0.10, accuracy_rule=pyromaniac_accuracy),
+    RoleStrategy('shieldbearer', target_accuracy=-0.08),
+    RoleStrategy('collector', focus_weights=(('direct_hit', 1.4),)),
+    RoleStrategy('teleporter', forced_special='brick', forced_special_chance=0.08),
+    RoleStrategy('rocketeer', weights=(('splash', 1.3), ('special', 1.2), ('direct_hit', 0.9)),
+                 accuracy=-0.08, miss_to_splash=0.20,
+                 miss_text="🚀 Ракета ушла в молоко — промах по @{target}."),
+    RoleStrategy('snot_sniper', weights=(('miss', 1.1),), double_miss_chance=0.2, accuracy=0.12,
+                 miss_text="🤧 Сопля размазалась по ветру — мимо @{target}."),
+    RoleStrategy('acid_clown', accuracy=-0.10),
+    RoleStrategy('counter_guru'),
+):
+    register_role(_strategy)
+del _strategy
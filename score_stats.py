@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Распределение счёта игроков чата ГовноМёт: среднее и квантили без запросов к БД
+
+Бонус камбэка сравнивает счёт игрока со счётом остальных в чате. Считать среднее
+и квантили агрегатом по БД на каждом броске — лишний запрос на горячем пути.
+ScoreHistogram ведётся вместе с записями игроков чата: изменение счёта — две
+операции над словарём «счёт -> сколько игроков», среднее — сумма/число за O(1).
+Квантили (пороги счёта нижних 10%, 25% и т.п.) хранятся готовыми и пересчитываются
+по гистограмме раз в refresh изменений: между пересчётами порог отстаёт не больше
+чем на refresh бросков, а пересчёт — сортировка различных значений счёта (их
+немного: дельты кратны пяти), амортизированно O(1) на бросок. Сверка с точными
+квантилями — tests/test_score_stats.py.
+
+    python score_stats.py  # замер против пересчёта на бросок
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class ScoreHistogram:
+    """Гистограмма счёта игроков чата с готовыми порогами квантилей.
+
+    cut(i) — наименьший счёт s, при котором у доли не меньше quantiles[i] игроков счёт ≤ s.
+    stale — изменений с последнего пересчёта порогов (часть состояния: при передаче чата
+    пороги и счётчик переезжают как есть, и бонусы после переезда те же).
+    """
+
+    __slots__ = ('counts', 'total', 'count', 'quantiles', 'refresh', 'cuts', 'stale')
+
+    def __init__(self, quantiles: Tuple[float, ...], refresh: int = 64):
+        self.counts: Dict[int, int] = {}  # счёт -> игроков с таким счётом
+        self.total = 0
+        self.count = 0
+        self.quantiles = quantiles
+        self.refresh = refresh
+        self.cuts: Optional[List[int]] = None  # пороги квантилей (None — ещё не считались)
+        self.stale = 0
+
+    def add(self, score: int):
+        """Новый игрок со счётом score"""
+        counts = self.counts
+        counts[score] = counts.get(score, 0) + 1
+        self.total += score
+        self.count += 1
+        self.stale += 1
+
+    def remove(self, score: int):
+        """Игрок со счётом score ушёл (вытеснен)"""
+        counts = self.counts
+        left = counts[score] - 1
+        if left:
+            counts[score] = left
+        else:
+            del counts[score]
+        self.total -= score
+        self.count -= 1
+        self.stale += 1
+
+    def move(self, old: int, new: int):
+        """Счёт игрока изменился с old на new"""
+        if old == new:
+            return
+        counts = self.counts
+        left = counts[old] - 1
+        if left:
+            counts[old] = left
+        else:
+            del counts[old]
+        counts[new] = counts.get(new, 0) + 1
+        self.total += new - old
+        self.stale += 1
+
+    def reset(self, scores: Iterable[int]):
+        """Строит гистограмму заново по счёту всех игроков"""
+        self.counts = {}
+        self.total = self.count = 0
+        for score in scores:
+            self.add(score)
+        self.cuts = None
+
+    @property
+    def mean(self) -> float:
+        """Средний счёт (0 — без игроков)"""
+        return self.total / self.count if self.count else 0.0
+
+    def _recompute(self) -> List[int]:
+        cuts = []
+        count = self.count
+        pending = iter(self.quantiles)
+        quantile = next(pending, None)
+        seen = 0
+        for score in sorted(self.counts):
+            seen += self.counts[score]
+            while quantile is not None and seen >= quantile * count:
+                cuts.append(score)
+                quantile = next(pending, None)
+            if quantile is None:
+                break
+        while len(cuts) < len(self.quantiles):
+            cuts.append(cuts[-1] if cuts else 0)
+        self.cuts = cuts
+        self.stale = 0
+        return cuts
+
+    def cut(self, i: int) -> int:
+        """Порог квантиля quantiles[i]; пересчитывается, если устарел больше чем на refresh изменений"""
+        cuts = self.cuts
+        if cuts is None or self.stale >= self.refresh:
+            cuts = self._recompute()
+        return cuts[i]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"ScoreHistogram(игроков={self.count}, среднее={self.mean:.1f}, пороги={self.cuts})"
+
+if __name__ == "__main__":
+    import random
+    import time
+    from logger_config import quiet
+
+    quiet()
+
+    quantiles = (0.10, 0.25)
+
+    def exact_cuts(scores: List[int]) -> List[int]:
+        ordered = sorted(scores)
+        return [next(s for i, s in enumerate(ordered) if i + 1 >= q * len(ordered)) for q in quantiles]
+
+    # Замер: порог нижней четверти на бросок в чате из 2000 игроков
+    rng = random.Random(1)
+    scores = {uid: rng.choice(range(-500, 1500, 5)) for uid in range(2000)}
+    rounds = 5000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        uid = rng.randrange(2000)
+        scores[uid] += 10
+        exact_cuts(list(scores.values()))
+    old = (time.perf_counter() - started) / rounds * 1e6
+    histogram = ScoreHistogram(quantiles)
+    histogram.reset(scores.values())
+    started = time.perf_counter()
+    for _ in range(rounds):
+        uid = rng.randrange(2000)
+        histogram.move(scores[uid], scores[uid] + 10)
+        scores[uid] += 10
+        histogram.cut(1)
+    new = (time.perf_counter() - started) / rounds * 1e6
+    print(f"Порог квантиля на бросок, 2000 игроков: {old:.1f} мкс (сортировка счёта) → {new:.2f} мкс (гистограмма)")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк профилей хранения SQLite для ГовноМёт
+
+Прогоняет синтетическую нагрузку бросков (те же записи в БД, что делает бот
+на каждое нажатие кнопки) на каждом профиле из STORAGE_PROFILES и печатает
+бросков в секунду и задержки p50/p99.
+
+    python storage_benchmark.py --throws 2000 --users 50
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from config import OUTCOME_PROBABILITIES, STORAGE_PROFILES
+from database import Database
+from logger_config import quiet
+
+# Сколько целей задевает исход (для «весь чат» берём всех пользователей)
+TARGETS_PER_OUTCOME = {
+    'direct_hit': (1, 1),
+    'miss': (1, 1),
+    'splash': (2, 4),
+    'special': (1, 1),
+    'critical': (1, 1),
+    'combo': (3, 5),
+    'legendary': (None, None),
+}
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def _throw(db: Database, rng: random.Random, users: list[int], chat_id: int):
+    """Одна синтетическая «кнопка»: пользователь и запись броска со всеми целями."""
+    initiator = rng.choice(users)
+    outcome = rng.choices(list(OUTCOME_PROBABILITIES), weights=list(OUTCOME_PROBABILITIES.values()))[0]
+    others = [u for u in users if u != initiator]
+    low, high = TARGETS_PER_OUTCOME[outcome]
+    if outcome == 'miss':
+        targets = [initiator]
+    elif low is None:
+        targets = others
+    else:
+        targets = rng.sample(others, min(rng.randint(low, high), len(others)))
+
+    await db.add_user(initiator, f"user{initiator}")
+    await db.add_throw(initiator_id=initiator, target_ids=targets, outcome=outcome, chat_id=chat_id)
+
+async def run_profile(profile: str, throws: int, users: int, seed: int) -> dict:
+    """Прогон одного профиля на свежей БД во временной директории."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"), storage_profile=profile)
+        rng = random.Random(seed)
+        user_ids = list(range(1, users + 1))
+        for user_id in user_ids:
+            await db.add_user(user_id, f"user{user_id}")
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(throws):
+            t0 = time.perf_counter()
+            await _throw(db, rng, user_ids, chat_id=-100)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        db.close()
+
+    return {
+        'profile': profile,
+        'throws_per_sec': throws / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк профилей хранения SQLite")
+    parser.add_argument('--throws', type=int, default=2000, help="Бросков на профиль")
+    parser.add_argument('--users', type=int, default=50, help="Пользователей в синтетическом чате")
+    parser.add_argument('--seed', type=int, default=42, help="Seed генератора нагрузки")
+    parser.add_argument('--profiles', nargs='*', default=list(STORAGE_PROFILES), help="Какие профили сравнить")
+    args = parser.parse_args()
+
+    quiet()  # INFO-логи на каждое событие исказят замер
+
+    print(f"{'профиль':<12} {'бросков/с':>10} {'p50, мс':>9} {'p99, мс':>9}")
+    for profile in args.profiles:
+        result = await run_profile(profile, args.throws, args.users, args.seed)
+        print(f"{result['profile']:<12} {result['throws_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,10 @@
+"""Общие настройки тестов ГовноМёт: модули лежат в корне репозитория (pythonpath в pytest.ini)"""
+
+import pytest
+from logger_config import quiet
+
+
+@pytest.fixture(autouse=True, scope='session')
+def quiet_logs():
+    """Тесты не пишут в logs/ и не шумят в выводе (логгеры модулей уже созданы при сборе тестов)"""
+    quiet()
@@ -0,0 +1,19 @@
+"""Симулятор баланса: паритет с живым GameLogic на фиксированном seed (нужен numpy)"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from balance_sim import check_parity, simulate
+
+def test_parity_with_game_logic():
+    """Таблица шансов побитово, доли исходов, win rate ролей и доля камбэка — в пределах 4.5σ"""
+    result = check_parity(throws=40_000, seed=42)
+    assert result['slow']['throws'] == 40_000
+    assert result['fast']['throws'] == 400_000
+
+def test_same_seed_same_run():
+    first = simulate(throws=50_000, chats=20, players_per_chat=10, seed=7)
+    second = simulate(throws=50_000, chats=20, players_per_chat=10, seed=7)
+    for key in ('outcome_mix', 'score_drift', 'comeback_share', 'roles'):
+        assert first[key] == second[key]
@@ -0,0 +1,76 @@
+"""Разделы чатов: передача чата другому процессу и раскладка чатов по воркерам"""
+
+import json
+import random
+import pytest
+from chat_state import ChatRouter
+from clock import VirtualClock
+from game_logic import GameLogic, ThrowRequest
+
+def outcomes(records):
+    return [(record.chat_id, record.outcome, record.targets, record.heat, record.comeback_bonus, record.rng_seq)
+            for record in records]
+
+def test_handoff_between_workers_keeps_the_game():
+    """На середине нагрузки чаты переезжают к владельцам по ChatRouter — ход игры тот же, что в одном процессе"""
+    # Нагрузка: 6 чатов, часть игроков играет сразу в нескольких
+    rng = random.Random(42)
+    chats = [11, 12, 13, 14, 15, 16]
+    rosters = {chat: [(uid, f"u{uid}") for uid in rng.sample(range(1, 40), 12)] for chat in chats}
+    requests = []
+    moment = 0.0
+    for _ in range(24000):
+        chat = rng.choice(chats)
+        uid, name = rng.choice(rosters[chat])
+        moment += rng.expovariate(1.0)
+        if rng.random() < 0.4:
+            target_id, target_name = rng.choice([p for p in rosters[chat] if p[0] != uid])
+            requests.append(ThrowRequest(uid, name, chat, target_id=target_id, target_username=target_name,
+                                         at=moment))
+        else:
+            requests.append(ThrowRequest(uid, name, chat, rosters[chat], at=moment))
+
+    whole = GameLogic(clock=VirtualClock(), seed=7)
+    expected = outcomes(whole.process_throws(requests))
+
+    # У второго воркера свои часы со сдвигом — снимок переносит времена относительно «сейчас»
+    router = ChatRouter(2)
+    half = len(requests) // 2
+    first = GameLogic(clock=VirtualClock(), seed=7)
+    got = outcomes(first.process_throws(requests[:half]))
+    offset = 100000.0
+    second = GameLogic(clock=VirtualClock(start=offset), seed=7)
+    moved = [chat for chat in chats if router.owner(chat) == 1]
+    second.clock.set(first.clock.now() + offset)
+    for chat in moved:
+        snapshot = json.loads(json.dumps(first.export_chat(chat)))  # как по сети
+        second.import_chat(snapshot)
+    workers = [first, second]
+    for request in requests[half:]:
+        worker = workers[router.owner(request.chat_id)]
+        if worker is second:
+            request.at += offset
+        got += outcomes(worker.process_throws([request]))
+    assert moved and len(moved) < len(chats), "Оба воркера должны получить чаты"
+    assert got == expected
+
+def test_unsaved_focus_travels_with_the_chat():
+    first = GameLogic(clock=VirtualClock(), seed=7)
+    first.process_throw_at_target(1, 'u1', 2, 'u2', 5)
+    second = GameLogic(clock=VirtualClock(), seed=7)
+    second.import_chat(json.loads(json.dumps(first.export_chat(5))))
+    assert first.take_dirty_focus() == []
+    assert [pair[:4] for pair in second.take_dirty_focus()] == [(1, 2, 5, 1)]
+    assert second.take_dirty_focus() == []
+
+@pytest.mark.parametrize('workers', (4, 8))
+def test_router_adding_worker_moves_only_its_share(workers):
+    chat_ids = range(1, 20001)
+    router = ChatRouter(workers)
+    load = [0] * workers
+    for chat_id in chat_ids:
+        load[router.owner(chat_id)] += 1
+    assert max(load) < 1.1 * len(chat_ids) / workers
+    moves = router.handoffs(chat_ids, ChatRouter(workers + 1))
+    assert all(new == workers for _, new in moves.values()), "Чаты переехали не к новому воркеру"
+    assert len(moves) / len(chat_ids) == pytest.approx(1 / (workers + 1), abs=0.02)
@@ -0,0 +1,39 @@
+"""Игра на виртуальных часах: кулдаун, истечение ролей и остывание жара"""
+
+import random
+from clock import VirtualClock
+from config import HEAT_SETTINGS
+from game_logic import GameLogic, MIN_THROW_INTERVAL
+
+def test_day_of_play_on_virtual_clock():
+    """Сутки игры чата из 20 человек за доли секунды реального времени"""
+    rng = random.Random(42)
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=42)
+    players = [(uid, f"u{uid}") for uid in range(1, 21)]
+    cooldowns = 0
+    roles_seen = {}
+    while clock.now() < 24 * 3600:
+        uid, name = rng.choice(players)
+        result = game.process_throw(uid, name, players, chat_id=1)
+        cooldowns += result['outcome'] == 'cooldown'
+        if result['outcome'] != 'cooldown':
+            roles_seen.setdefault(uid, set()).add(result['role_used'])
+        clock.advance(rng.expovariate(1 / 2.0))
+
+    assert cooldowns, "На плотном потоке бросков кулдаун должен срабатывать"
+    # За сутки роль сменилась у каждого хотя бы раз (истекает через ROLE_DURATION)
+    assert all(len(roles) > 1 for roles in roles_seen.values())
+
+def test_cooldown_and_heat_decay():
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=42)
+    game.get_player(1, chat_id=1).last_throw = clock.now()
+    assert game.check_cooldown(1, chat_id=1)
+    clock.advance(MIN_THROW_INTERVAL)
+    assert not game.check_cooldown(1, chat_id=1)
+    # Жар остывает без бросков: через два периода полураспада — вчетверо
+    player = game.get_player(1, chat_id=1)
+    player.heat, player.heat_at = 100, clock.now()
+    clock.advance(2 * HEAT_SETTINGS['half_life'])
+    assert game.get_user_heat(1, chat_id=1) == 25
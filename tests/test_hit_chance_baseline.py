@@ -0,0 +1,142 @@
+"""Шанс попадания против замороженной исходной формулы.
+
+baseline_hit_chance — копия GameLogic.compute_hit_chance до предрасчёта таблиц и реестра
+ролей (if-цепочка по именам ролей, состояние в словарях). Её нельзя править вслед за кодом:
+она задаёт поведение, которое таблица и живой путь должны сохранять побитово.
+"""
+
+import random
+import pytest
+from clock import VirtualClock
+from game_logic import GameLogic
+from outcome_tables import MAX_FOCUS_STACKS, MAX_HEAT
+from roles import ROLE_STRATEGIES, role_strategy
+
+ROLE_KEYS = [strategy.key for strategy in ROLE_STRATEGIES]  # None — без роли
+
+def baseline_hit_chance(*, is_targeted: bool, initiator_id: int, target_id, chat_id: int,
+                        focus_stacks: dict, user_heat: dict, user_roles: dict) -> float:
+    """Исходный compute_hit_chance (состояние игры — аргументами)"""
+    # База
+    accuracy = 0.55 if is_targeted else 0.45
+
+    # Фокус (бонус метателю за накапливание прицела на цели)
+    if target_id is not None:
+        stacks = focus_stacks.get((initiator_id, target_id, chat_id), 0)
+        focus_bonus = min(stacks, 3) * 0.08  # до +24%
+        accuracy += focus_bonus
+    else:
+        stacks = 0
+
+    # Жар метателя
+    heat = user_heat.get(initiator_id, 0)
+    heat_penalty = min(int(heat / 5) / 100.0, 0.20)  # до -20%
+    accuracy -= heat_penalty
+    if heat >= 80:
+        accuracy -= 0.10  # жёсткий оверхит
+
+    # Роль метателя
+    role = user_roles.get(initiator_id)
+    if role == 'sniper':
+        accuracy += 0.15
+        if heat >= 60:
+            accuracy -= 0.15
+    elif role == 'bombardier':
+        accuracy -= 0.05
+    elif role == 'drunk_sniper':
+        accuracy += 0.20 if heat < 30 else -0.20
+    elif role == 'berserker':
+        accuracy += 0.10
+    elif role == 'trickster':
+        pass
+    elif role == 'magnet':
+        if stacks >= 2:
+            accuracy += 0.12
+    elif role == 'oracle':
+        accuracy += 0.08
+    elif role == 'pyromaniac':
+        if heat >= 20:
+            accuracy += 0.10
+        if heat >= 80:
+            accuracy -= 0.10
+    elif role == 'rocketeer':
+        accuracy -= 0.08
+    elif role == 'snot_sniper':
+        accuracy += 0.12
+    elif role == 'acid_clown':
+        accuracy -= 0.10
+    # counter_guru, collector, teleporter и пр. — отдельно по эффектам ниже
+
+    # Роль цели (усложняем жизнь метателю)
+    if target_id is not None:
+        target_role = user_roles.get(target_id)
+        if target_role == 'defender':
+            accuracy -= 0.10
+        elif target_role == 'shieldbearer':
+            accuracy -= 0.08
+
+    # Ограничения
+    return max(0.05, min(0.95, accuracy))
+
+@pytest.fixture(scope='module')
+def game():
+    return GameLogic(clock=VirtualClock(), seed=1)
+
+def test_table_matches_baseline_in_every_cell(game):
+    """Все клетки (targeted, роль, роль цели, жар, стаки) — и стаки выше MAX_FOCUS_STACKS (зажим)"""
+    table = game.hit_chance_table
+    checked = 0
+    for is_targeted in (False, True):
+        for role in ROLE_KEYS:
+            for target_role in ROLE_KEYS:
+                roles = {1: role, 2: target_role}
+                for heat in range(MAX_HEAT + 1):
+                    user_heat = {1: heat}
+                    for stacks in range(MAX_FOCUS_STACKS + 4):
+                        expected = baseline_hit_chance(is_targeted=is_targeted, initiator_id=1, target_id=2,
+                                                       chat_id=7, focus_stacks={(1, 2, 7): stacks},
+                                                       user_heat=user_heat, user_roles=roles)
+                        actual = table.lookup(is_targeted, role, target_role, heat, stacks)
+                        assert actual == expected, (is_targeted, role, target_role, heat, stacks)
+                        checked += 1
+    assert checked == 2 * len(ROLE_KEYS) ** 2 * (MAX_HEAT + 1) * (MAX_FOCUS_STACKS + 4)
+
+def test_table_without_target_matches_baseline(game):
+    """Бросок без цели: ни фокуса, ни роли цели"""
+    for is_targeted in (False, True):
+        for role in ROLE_KEYS:
+            for heat in range(MAX_HEAT + 1):
+                expected = baseline_hit_chance(is_targeted=is_targeted, initiator_id=1, target_id=None, chat_id=7,
+                                               focus_stacks={}, user_heat={1: heat}, user_roles={1: role})
+                assert game.hit_chance_table.lookup(is_targeted, role, None, heat, 0) == expected
+
+def test_live_hit_chance_matches_baseline():
+    """Живой compute_hit_chance по состоянию чата (роль, жар, фокус) — как исходный по тем же словарям"""
+    game = GameLogic(clock=VirtualClock(), seed=1)
+    rng = random.Random(5)
+    chat_id = 7
+    users = range(1, 13)
+    for _ in range(3000):
+        initiator_id, target_id = rng.sample(users, 2)
+        for user_id in (initiator_id, target_id):
+            strategy = role_strategy(rng.choice(ROLE_KEYS))
+            player = game.get_player(user_id, chat_id=chat_id)
+            player.role, player.role_id = strategy.key, strategy.role_id
+        player = game.get_player(initiator_id, chat_id=chat_id)
+        player.heat, player.heat_at = rng.randint(0, 100), game.clock.now()  # без остывания
+        stacks = rng.randint(0, 6)
+        game.get_chat_focus(chat_id).set(initiator_id, target_id, stacks)
+
+        state = {
+            'focus_stacks': {(initiator_id, target_id, chat_id): stacks},
+            'user_heat': {initiator_id: player.heat},
+            'user_roles': {user_id: game.get_user_role(user_id, chat_id=chat_id)
+                           for user_id in (initiator_id, target_id)},
+        }
+        for is_targeted in (False, True):
+            for target in (target_id, None):
+                expected = baseline_hit_chance(is_targeted=is_targeted, initiator_id=initiator_id,
+                                               target_id=target, chat_id=chat_id, **state)
+                actual = game.compute_hit_chance(is_targeted=is_targeted, initiator_id=initiator_id,
+                                                 target_id=target, chat_id=chat_id)
+                assert actual == expected
@@ -0,0 +1,26 @@
+"""Предрасчитанные таблицы: шанс попадания против скалярной формулы, нормировка распределений"""
+
+import pytest
+from game_logic import GameLogic
+from outcome_tables import check_hit_chance_table, MAX_FOCUS_STACKS, MAX_HEAT
+from roles import ROLE_STRATEGIES
+
+ROLE_KEYS = [strategy.key for strategy in ROLE_STRATEGIES]
+
+@pytest.fixture(scope='module')
+def game():
+    return GameLogic(seed=1)
+
+def test_hit_chance_table_matches_formula(game):
+    # Сверка с замороженной исходной формулой — tests/test_hit_chance_baseline.py
+    checked = check_hit_chance_table(game.hit_chance_table, ROLE_KEYS, game.hit_chance_formula)
+    assert checked == 2 * len(ROLE_KEYS) ** 2 * (MAX_HEAT + 1) * 11
+
+def test_outcome_tables_are_normalized(game):
+    for table in game.get_outcome_tables().tables:
+        assert sum(table.probabilities) == pytest.approx(1.0, abs=1e-12)
+
+def test_hit_chance_table_clamps_stacks(game):
+    table = game.hit_chance_table
+    assert table.lookup(True, 'magnet', None, 0, MAX_FOCUS_STACKS + 5) == table.lookup(True, 'magnet', None, 0,
+                                                                                     MAX_FOCUS_STACKS)
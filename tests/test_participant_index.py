@@ -0,0 +1,42 @@
+"""Индекс участников: выборки как random.choice/sample по отфильтрованным спискам, согласованность"""
+
+import random
+import pytest
+from participant_index import ParticipantIndex, as_index
+from rng_streams import SplitMix64
+
+@pytest.mark.parametrize('rng_class', (random.Random, SplitMix64))
+@pytest.mark.parametrize('size', (1, 2, 3, 7, 22, 23, 60, 500))
+def test_samples_match_filtered_list(size, rng_class):
+    """Обе ветки sample; метатель иногда не из чата"""
+    participants = [(uid, f"u{uid}") for uid in range(1, size + 1)]
+    index = ParticipantIndex(participants)
+    old_rng, new_rng = rng_class(size), rng_class(size)
+    for step in range(300):
+        initiator = (step * 7) % (size + 1) + 1
+        available = [p for p in participants if p[0] != initiator]
+        if not available:
+            assert index.choice_excluding(new_rng, initiator) is None
+            continue
+        assert index.choice_excluding(new_rng, initiator) == old_rng.choice(available)
+        k = min(step % 9, len(available))
+        assert index.sample_excluding(new_rng, k, initiator) == old_rng.sample(available, k)
+        assert index.others(initiator) == available
+        view = as_index(participants, initiator)
+        assert view.choice_excluding(old_rng, initiator) == view.choice_excluding(new_rng, initiator)
+
+def test_incremental_changes_keep_positions_consistent():
+    rng = random.Random(1)
+    index = ParticipantIndex()
+    alive = {}
+    for _ in range(20000):
+        uid = rng.randrange(300)
+        if rng.random() < 0.6:
+            assert index.add(uid, f"u{uid}") == (uid not in alive)
+            alive[uid] = f"u{uid}"
+        else:
+            assert index.remove(uid) == (alive.pop(uid, None) is not None)
+    assert sorted(index) == sorted(alive.items())
+    assert all(index.members[position][0] == uid for uid, position in index.positions.items())
+    index.sync([(uid, f"u{uid}") for uid in range(0, 300, 2)])
+    assert sorted(index) == [(uid, f"u{uid}") for uid in range(0, 300, 2)]
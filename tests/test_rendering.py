@@ -0,0 +1,42 @@
+"""Рендер сообщений: шаблоны как str.format, выбор из пулов как choice, ленивые сигналы"""
+
+import random
+from config import GAME_MESSAGES
+from game_logic import GameLogic
+from rendering import MessageRenderer
+
+VALUES = {'initiator': 'metatel_100%', 'targets': '@vasya, @petya', 'reply_to': 'metatel',
+          'heat': 42, 'target': 'vasya'}
+
+def test_templates_render_like_str_format():
+    renderer = MessageRenderer()
+    for pools in (renderer.messages, renderer.phrases):
+        for pool in pools.values():
+            for template in pool.templates:
+                assert template.render(VALUES) == template.source.format(**VALUES), template
+
+def test_pool_choice_matches_choice_over_strings():
+    """Выбор из пула тратит столько же случайных чисел, что и choice по списку строк"""
+    renderer = MessageRenderer()
+    old_rng, new_rng = random.Random(7), random.Random(7)
+    for outcome, texts in GAME_MESSAGES.items():
+        for _ in range(200):
+            assert renderer.message(new_rng, outcome, VALUES) == old_rng.choice(texts).format(**VALUES)
+
+def test_lazy_signals_match_eager():
+    """Сигналы, собранные после всех бросков, совпадают с собранными сразу"""
+    def play(eager: bool):
+        game = GameLogic(seed=42)
+        players = [(uid, f"u{uid}") for uid in range(1, 9)]
+        log = []
+        for step in range(2000):
+            uid, name = players[step % 8]
+            target_id, target_name = players[(step * 5 + 3) % 8]
+            result = game.process_throw_at_target(uid, name, target_id, target_name, 1, skip_cooldown=True)
+            signals = result.get('public_signals')
+            log.append((result['message'], dict(signals) if eager and signals is not None else signals))
+        return log
+
+    eager_log, lazy_log = play(eager=True), play(eager=False)
+    assert [message for message, _ in eager_log] == [message for message, _ in lazy_log]
+    assert [signals for _, signals in eager_log] == [signals for _, signals in lazy_log]
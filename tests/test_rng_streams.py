@@ -0,0 +1,57 @@
+"""Потоки чатов: независимость от трафика других чатов и повтор броска по (seed, позиция)"""
+
+import copy
+from clock import VirtualClock
+from game_logic import GameLogic
+
+def throw(game, chat, step):
+    """Игроки чата по кругу мечут друг в друга; запись броска для сравнения"""
+    players = [(chat * 100 + i, f"u{chat}_{i}") for i in range(8)]
+    uid, name = players[step % 8]
+    if step % 3:
+        target_id, target_name = game.choose_target(chat, [p for p in players if p[0] != uid])
+        result = game.process_throw_at_target(uid, name, target_id, target_name, chat)
+    else:
+        result = game.process_throw(uid, name, players, chat)
+    return (result['rng_seed'], result['rng_seq'], result['outcome'],
+            tuple(result['targets']), result['message'])
+
+def run(chats, steps=600, seed=42):
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=seed)
+    log = {chat: [] for chat in chats}
+    for step in range(steps):
+        for chat in chats:
+            log[chat].append(throw(game, chat, step))
+        clock.advance(10)
+    return game, log
+
+def test_chat_stream_does_not_depend_on_other_chats():
+    _, together = run([1, 2, 3, 7])
+    _, alone = run([7])
+    assert together[7] == alone[7]
+    _, other_seed = run([7], seed=43)
+    assert other_seed[7] != alone[7], "Другой seed дал ту же игру"
+
+def test_throw_replays_from_seed_and_position():
+    """Повтор броска по записанным (seed, позиция) после того, как поток ушёл вперёд"""
+    game, _ = run([7], steps=599)
+    replay = copy.deepcopy(game)
+    players = [(700 + i, f"u7_{i}") for i in range(8)]
+    original = game.process_throw_at_target(*players[599 % 8], *players[0], 7)
+    replay.choose_target(7, players)  # сбиваем поток копии
+    replay.seek_chat_rng(7, original['rng_seed'], original['rng_seq'])
+    repeated = replay.process_throw_at_target(*players[599 % 8], *players[0], 7)
+    assert repeated == original
+
+def test_accessors_read_the_chat_they_are_given():
+    """Чтение одного чата сразу после броска в другом видит состояние своего чата"""
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=1)
+    game.update_user_heat(1, 90, chat_id=1)
+    game.process_throw(1, 'u1', [(1, 'u1'), (2, 'u2')], 2)
+    hot = game.compute_hit_chance(is_targeted=True, initiator_id=1, target_id=None, chat_id=1)
+    assert hot == game.hit_chance_table.lookup(True, game.get_user_role(1, chat_id=1), None,
+                                               game.get_user_heat(1, chat_id=1), 0)
+    assert game.get_user_heat(1, chat_id=1) == 90
+    assert game.get_user_heat(1, chat_id=2) == 2
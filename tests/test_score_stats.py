@@ -0,0 +1,32 @@
+"""Гистограмма счёта: среднее и пороги квантилей против точного расчёта"""
+
+import random
+import statistics
+import pytest
+from score_stats import ScoreHistogram
+
+QUANTILES = (0.10, 0.25)
+
+def exact_cuts(scores):
+    ordered = sorted(scores)
+    return [next(s for i, s in enumerate(ordered) if i + 1 >= q * len(ordered)) for q in QUANTILES]
+
+def test_mean_and_cuts_match_exact():
+    """Среднее точно всегда, пороги — точно сразу после пересчёта (refresh=1)"""
+    rng = random.Random(1)
+    scores = {uid: 0 for uid in range(200)}
+    histogram = ScoreHistogram(QUANTILES, refresh=1)
+    histogram.reset(scores.values())
+    for _ in range(20000):
+        uid = rng.randrange(300)
+        if uid not in scores:
+            scores[uid] = 0
+            histogram.add(0)
+        elif rng.random() < 0.02:
+            histogram.remove(scores.pop(uid))
+        else:
+            new = scores[uid] + rng.choice((10, 15, -5, -10, 0))
+            histogram.move(scores[uid], new)
+            scores[uid] = new
+        assert histogram.mean == pytest.approx(statistics.fmean(scores.values()), abs=1e-6)
+        assert [histogram.cut(i) for i in range(len(QUANTILES))] == exact_cuts(scores.values())
@@ -0,0 +1,35 @@
+"""Колесо таймеров: срабатывание точно на своём тике, отмена"""
+
+import bisect
+import math
+import random
+from timer_wheel import TimerWheel
+
+def test_timers_fire_on_their_tick_and_cancelled_do_not():
+    rng = random.Random(42)
+    wheel = TimerWheel(resolution=1.0, slots=8, levels=3)  # маленькое колесо — больше каскадов и overflow
+    fired_at = {}
+    deadlines = {}
+    advances = []
+    now = 0.0
+    for _ in range(20000):
+        for _ in range(rng.randint(0, 3)):
+            timer_id = len(deadlines)
+            deadline = now + rng.choice((rng.uniform(0, 10), rng.uniform(0, 600), rng.uniform(0, 5000)))
+            deadlines[timer_id] = deadline
+            timer = wheel.schedule(deadline, lambda i: fired_at.__setitem__(i, now), timer_id)
+            if rng.random() < 0.05:
+                timer.cancel()
+                deadlines[timer_id] = None
+        now += rng.choice((0.3, 1.0, 2.5, 17.0))
+        advances.append(now)
+        wheel.advance(now)
+
+    for timer_id, deadline in deadlines.items():
+        if deadline is None:
+            assert timer_id not in fired_at, f"Отменённый таймер {timer_id} сработал"
+            continue
+        # Должен сработать ровно на первом advance, чей тик дошёл до срока
+        i = bisect.bisect_left(advances, math.ceil(deadline))
+        expected = advances[i] if i < len(advances) else None
+        assert fired_at.get(timer_id) == expected, f"Таймер {timer_id} ({deadline:.2f})"
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк CPU на бросок для ГовноМёт
+
+Гоняет GameLogic на виртуальном времени (случайные и целевые броски в одном чате)
+и печатает процессорное время на бросок при разных уровнях логирования. Логи
+форматируются тем же форматтером, что и в боте, но пишутся в /dev/null — замер
+показывает цену самих сообщений, а не диска. Отладочные сообщения горячего пути
+форматируются лениво (%-аргументы логгера), поэтому на INFO и выше их не видно.
+
+С --batch сравнивает одиночные вызовы с пакетным process_throws (с рендером и без)
+на одной и той же нагрузке и проверяет, что исходы и цели совпадают.
+
+    python throw_benchmark.py --throws 20000 --levels WARNING INFO DEBUG
+    python throw_benchmark.py --batch --throws 100000
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+
+from clock import VirtualClock
+from game_logic import GameLogic, ThrowRequest, MIN_THROW_INTERVAL
+from logger_config import quiet
+from participant_index import ParticipantIndex
+
+def _route_logs(level: str):
+    """Все логи govnomet — в /dev/null с форматтером бота, на уровне level"""
+    sink = logging.StreamHandler(open(os.devnull, 'w', encoding='utf-8'))
+    sink.setFormatter(logging.Formatter(
+        fmt='%(asctime)s | %(levelname)-8s | %(name)-15s | %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+    logging.getLogger('govnomet').handlers = [sink]
+    quiet(level)
+
+def run(level: str, throws: int, players: int, targeted_share: float, seed: int) -> dict:
+    """Прогон на свежем GameLogic; CPU на бросок в микросекундах"""
+    _route_logs(level)
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=seed)
+    rng = random.Random(seed)
+    participants = ParticipantIndex((uid, f"user{uid}") for uid in range(1, players + 1))  # как в боте
+    # Разогрев: роли назначены, фокус и жар накоплены
+    for uid, name in participants:
+        game.process_throw(uid, name, participants, chat_id=1)
+    clock.advance(MIN_THROW_INTERVAL)
+
+    cpu = {'random': 0.0, 'targeted': 0.0}
+    counts = {'random': 0, 'targeted': 0}
+    for _ in range(throws):
+        uid, name = rng.choice(participants)
+        targeted = rng.random() < targeted_share
+        if targeted:
+            target_id, target_name = participants.choice_excluding(rng, uid)
+            started = time.process_time()
+            game.process_throw_at_target(uid, name, target_id, target_name, 1, skip_cooldown=True)
+        else:
+            started = time.process_time()
+            game.process_throw(uid, name, participants, chat_id=1)
+        kind = 'targeted' if targeted else 'random'
+        cpu[kind] += time.process_time() - started
+        counts[kind] += 1
+        clock.advance(MIN_THROW_INTERVAL)
+
+    return {
+        'level': level,
+        'random_us': cpu['random'] / max(counts['random'], 1) * 1e6,
+        'targeted_us': cpu['targeted'] / max(counts['targeted'], 1) * 1e6,
+        'total_us': (cpu['random'] + cpu['targeted']) / throws * 1e6,
+    }
+
+def make_requests(throws: int, players: int, targeted_share: float, seed: int):
+    """Нагрузка для пакета: броски со своими моментами времени (виртуальные часы)"""
+    rng = random.Random(seed)
+    participants = ParticipantIndex((uid, f"user{uid}") for uid in range(1, players + 1))
+    requests = []
+    moment = 0.0
+    for _ in range(throws):
+        uid, name = rng.choice(participants.members)
+        moment += rng.expovariate(1 / MIN_THROW_INTERVAL) / 4
+        if rng.random() < targeted_share:
+            target_id, target_name = participants.choice_excluding(rng, uid)
+            requests.append(ThrowRequest(uid, name, 1, target_id=target_id, target_username=target_name, at=moment))
+        else:
+            requests.append(ThrowRequest(uid, name, 1, participants, at=moment))
+    return requests
+
+def run_batch(throws: int, players: int, targeted_share: float, seed: int) -> dict:
+    """Броски в секунду: одиночные вызовы, пакет с рендером и пакет без рендера"""
+    _route_logs('WARNING')
+    requests = make_requests(throws, players, targeted_share, seed)
+
+    clock = VirtualClock()
+    game = GameLogic(clock=clock, seed=seed)
+    started = time.process_time()
+    single = []
+    for request in requests:
+        clock.set(request.at)
+        if request.target_id is None:
+            result = game.process_throw(request.initiator_id, request.initiator_username,
+                                        request.participants, request.chat_id)
+        else:
+            result = game.process_throw_at_target(request.initiator_id, request.initiator_username,
+                                                  request.target_id, request.target_username, request.chat_id)
+        single.append((result['outcome'], result['targets']))
+    rates = {'single': throws / (time.process_time() - started)}
+
+    for render in (True, False):
+        game = GameLogic(clock=VirtualClock(), seed=seed)
+        started = time.process_time()
+        records = game.process_throws(requests, render=render)
+        rates['batch_render' if render else 'batch'] = throws / (time.process_time() - started)
+        if [(record.outcome, record.targets) for record in records] != single:
+            raise AssertionError(f"Пакет (render={render}) разошёлся с одиночными бросками")
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк CPU на бросок")
+    parser.add_argument('--throws', type=int, default=20000, help="Бросков на уровень логирования")
+    parser.add_argument('--players', type=int, default=20, help="Участников чата")
+    parser.add_argument('--targeted-share', type=float, default=0.3, help="Доля целевых бросков")
+    parser.add_argument('--seed', type=int, default=42, help="Seed нагрузки и игры")
+    parser.add_argument('--levels', nargs='*', default=['WARNING', 'INFO', 'DEBUG'],
+                        help="Уровни логирования для сравнения")
+    parser.add_argument('--batch', action='store_true', help="Сравнить одиночные броски с process_throws")
+    args = parser.parse_args()
+
+    if args.batch:
+        rates = run_batch(args.throws, args.players, args.targeted_share, args.seed)
+        print(f"✅ Пакет совпал с одиночными бросками: {args.throws} бросков")
+        print(f"{'одиночные вызовы':<28}{rates['single']:>12,.0f} бросков/с")
+        print(f"{'process_throws':<28}{rates['batch_render']:>12,.0f} бросков/с")
+        print(f"{'process_throws без рендера':<28}{rates['batch']:>12,.0f} бросков/с")
+        return
+
+    print(f"{'уровень':<10} {'случайный, мкс':>15} {'целевой, мкс':>13} {'в среднем, мкс':>15}")
+    for level in args.levels:
+        result = run(level, args.throws, args.players, args.targeted_share, args.seed)
+        print(f"{result['level']:<10} {result['random_us']:>15.1f} "
+              f"{result['targeted_us']:>13.1f} {result['total_us']:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Иерархическое колесо таймеров ГовноМёт
+
+Истечения (роль, дебафф саботажника, штраф за фокус) планируются за O(1) в слот
+колеса и срабатывают пачкой, когда время доходит до слота. Уровней несколько:
+нулевой — slots тиков по resolution секунд, каждый следующий в slots раз грубее;
+таймеры верхних уровней опускаются вниз («каскад»), когда нижний делает оборот.
+Таймер, дальше всех уровней, ждёт в overflow до оборота верхнего уровня.
+Проверка на случайном расписании с отменами — tests/test_timer_wheel.py.
+"""
+
+import math
+from typing import Callable, List
+from logger_config import get_logger
+
+logger = get_logger('timers')
+
+class Timer:
+    """Запланированный вызов; cancel() снимает его без поиска по колесу."""
+
+    __slots__ = ('expires_tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, expires_tick: int, callback: Callable, args: tuple):
+        self.expires_tick = expires_tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerWheel:
+    """Колесо таймеров: schedule/cancel за O(1), advance срабатывает пачкой по тикам.
+
+    Таймер срабатывает на первом advance(now), где now дошло до тика срока
+    (deadline, округлённый вверх до resolution). Время — любое монотонное число секунд.
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 64, levels: int = 4, now: float = 0.0):
+        if slots & (slots - 1):
+            raise ValueError("Число слотов должно быть степенью двойки")
+        self.resolution = resolution
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.levels = levels
+        self.origin = now
+        self.tick = 0  # последний обработанный тик
+        self.wheels: List[List[List[Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.overflow: List[Timer] = []
+        self.pending = 0
+        self.fired = 0
+
+    def schedule(self, deadline: float, callback: Callable, *args) -> Timer:
+        """Планирует callback(*args) на момент deadline"""
+        expires_tick = math.ceil((deadline - self.origin) / self.resolution)
+        timer = Timer(max(expires_tick, self.tick + 1), callback, args)
+        self._place(timer)
+        self.pending += 1
+        return timer
+
+    def _place(self, timer: Timer):
+        delta = timer.expires_tick - self.tick
+        for level in range(self.levels):
+            if delta < 1 << (self.bits * (level + 1)):
+                self.wheels[level][(timer.expires_tick >> (self.bits * level)) & self.mask].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def _cascade(self, level: int, tick: int):
+        """Опускает таймеры текущего слота уровня level на нижние уровни"""
+        if level >= self.levels:
+            overflow, self.overflow = self.overflow, []
+            for timer in overflow:
+                self._place(timer)
+            return
+        index = (tick >> (self.bits * level)) & self.mask
+        if index == 0:
+            # Сначала верхний уровень — его таймеры могут попасть в этот же слот
+            self._cascade(level + 1, tick)
+        slot = self.wheels[level][index]
+        if slot:
+            self.wheels[level][index] = []
+            for timer in slot:
+                self._place(timer)
+
+    def advance(self, now: float) -> int:
+        """Доводит колесо до момента now и вызывает истёкшие таймеры. Возвращает их число."""
+        target = int((now - self.origin) // self.resolution)
+        if self.pending == 0:
+            # Пустое колесо — тики перебирать незачем
+            self.tick = max(self.tick, target)
+            return 0
+
+        fired = 0
+        while self.tick < target:
+            self.tick += 1
+            tick = self.tick
+            index = tick & self.mask
+            if index == 0:
+                self._cascade(1, tick)
+            slot = self.wheels[0][index]
+            if not slot:
+                continue
+            self.wheels[0][index] = []
+            self.pending -= len(slot)
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                fired += 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка в таймере {getattr(timer.callback, '__name__', timer.callback)}: {e}")
+            if self.pending == 0:
+                self.tick = max(self.tick, target)
+                break
+        self.fired += fired
+        return fired
+
+    def __len__(self) -> int:
+        """Запланировано таймеров (включая отменённые, ещё не снятые с колеса)"""
+        return self.pending